@@ -60,7 +60,11 @@ echo Configuring project with CMake...
 echo Board: mipe_ev1/nrf54l15/cpuapp
 echo.
 
-cmake -B build -G Ninja -DBOARD=mipe_ev1/nrf54l15/cpuapp
+:: Active AI fix overlays (fix_overlays\, e.g. CONFIG_SPI=y); -U drops stale cached ones
+set OVERLAY_ARGS=
+for /f "delims=" %%a in ('python scripts\fix_overlays.py --cmake-args') do set OVERLAY_ARGS=%%a
+
+cmake -B build -G Ninja -DBOARD=mipe_ev1/nrf54l15/cpuapp %OVERLAY_ARGS%
 
 if %errorlevel% neq 0 (
     echo.
@@ -17,7 +17,11 @@ cd /d "%~dp0"
 
 :: Configure with CMake
 echo Configuring project with CMake...
-cmake -B build -G Ninja -DBOARD=mipe_ev1/nrf54l15/cpuapp
+:: Active AI fix overlays (fix_overlays\, e.g. CONFIG_SPI=y); -U drops stale cached ones
+set OVERLAY_ARGS=
+for /f "delims=" %%a in ('python scripts\fix_overlays.py --cmake-args') do set OVERLAY_ARGS=%%a
+
+cmake -B build -G Ninja -DBOARD=mipe_ev1/nrf54l15/cpuapp %OVERLAY_ARGS%
 
 if %errorlevel% neq 0 (
     echo.
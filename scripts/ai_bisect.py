@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+"""
+MIPE_EV1 AI Iteration Bisect
+Binary search over AI iterations - the snapshots the fix loop records, or
+"AI Fix Iteration #N" commits - for the first one that broke the hardware
+verdict, reusing cached builds per input-tree hash
+"""
+
+import argparse
+import hashlib
+import shutil
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from build_cache import BuildCache, cache_key, directory_input_hash, git_input_hash
+from fix_overlays import CLEAR_CACHED_ARGS, OVERLAY_DIR, OverlayStore, overlay_cmake_args
+from iteration_snapshots import SnapshotStore
+from tracing import tracer
+
+AI_COMMIT_PREFIX = "AI Fix Iteration #"
+DEFAULT_BOARD = "mipe_ev1_nrf54l15_cpuapp"
+
+
+def _git(repo, *args):
+    return subprocess.run(["git", *args], cwd=repo, capture_output=True, text=True, check=True).stdout
+
+
+def ai_commits(repo, good, bad="HEAD"):
+    """(sha, subject) of AI iteration commits in good..bad, oldest first"""
+    log = _git(repo, "log", "--reverse", "--format=%H%x09%s", f"{good}..{bad}")
+    commits = []
+    for line in log.splitlines():
+        sha, subject = line.split("\t", 1)
+        if subject.startswith(AI_COMMIT_PREFIX):
+            commits.append((sha, subject))
+    return commits
+
+
+def ai_snapshots(store, good, bad):
+    """(id, label) of the iteration snapshots in good..bad (ids), oldest first"""
+    return [(snapshot_id, store.manifest(snapshot_id)["label"])
+            for snapshot_id in store.snapshots() if good < snapshot_id <= bad]
+
+
+def bisect(count, test):
+    """
+    First bad index in 0..count-1, where index -1 is known good and count-1 is
+    known bad (locate() verifies both first). test(i) returns True (good),
+    False (bad) or None (untestable, e.g. the build failed); untestable points
+    are stepped around like `git bisect skip`. Returns (first_bad_index, candidates) where candidates
+    lists every index that may be the culprit when skips leave it ambiguous.
+    """
+    lo, hi = -1, count - 1
+    skipped = set()
+    while hi - lo > 1:
+        untested = [i for i in range(lo + 1, hi) if i not in skipped]
+        if not untested:
+            break
+        middle = (lo + hi) // 2
+        index = min(untested, key=lambda i: (abs(i - middle), i))
+        verdict = test(index)
+        if verdict is None:
+            skipped.add(index)
+        elif verdict:
+            lo = index
+        else:
+            hi = index
+    return hi, list(range(lo + 1, hi + 1))
+
+
+class CommitBuilder:
+    """Builds commits in a private worktree; artifacts are shared through the build cache"""
+
+    def __init__(self, repo, cache, board=DEFAULT_BOARD, worktree=None):
+        self.repo = Path(repo)
+        self.cache = cache
+        self.board = board
+        self.worktree = Path(worktree or tempfile.mkdtemp(prefix="ai_bisect_"))
+        self._worktree_ready = False
+
+    def _checkout(self, sha):
+        if not self._worktree_ready:
+            shutil.rmtree(self.worktree, ignore_errors=True)
+            _git(self.repo, "worktree", "add", "--detach", str(self.worktree), sha)
+            self._worktree_ready = True
+        else:
+            _git(self.worktree, "checkout", "--detach", "--force", sha)
+
+    def artifacts(self, sha):
+        """Cache entry with zephyr.hex for sha, building only on a miss; None if the build fails"""
+        key = cache_key(git_input_hash(self.repo, sha), self.board)
+        entry = self.cache.lookup(key)
+        if entry is not None:
+            print(f"   ♻️  Build cache hit for {sha[:10]}")
+            return entry
+
+        self._checkout(sha)
+        build_dir = self.worktree / "build"
+        result = tracer.run(["west", "build", "-b", self.board, "-d", str(build_dir),
+                             "-p", "auto", str(self.worktree)],
+                            name="bisect_build", cwd=self.worktree, capture_output=True, text=True)
+        if result.returncode != 0:
+            print(f"   ⚠️  {sha[:10]} does not build - skipping")
+            return None
+        return self.cache.store(key, build_dir, commit=sha, board=self.board)
+
+    def close(self):
+        if self._worktree_ready:
+            subprocess.run(["git", "worktree", "remove", "--force", str(self.worktree)],
+                           cwd=self.repo, capture_output=True)
+            self._worktree_ready = False
+
+
+class SnapshotBuilder:
+    """Builds iteration snapshots in a private tree; artifacts are shared through the build cache"""
+
+    def __init__(self, project_dir, cache, board=DEFAULT_BOARD, worktree=None):
+        self.store = SnapshotStore(project_dir)
+        self.cache = cache
+        self.board = board
+        self.worktree = Path(worktree or tempfile.mkdtemp(prefix="ai_bisect_"))
+
+    def artifacts(self, snapshot_id):
+        """Cache entry with zephyr.hex for a snapshot, building only on a miss; None if the build fails"""
+        self.store.checkout(snapshot_id, self.worktree)
+        overlays = OverlayStore(self.worktree / OVERLAY_DIR).active_files()
+        key = cache_key(directory_input_hash(self.worktree), self.board,
+                        [hashlib.sha256(p.read_bytes()).hexdigest() for p in overlays])
+        entry = self.cache.lookup(key)
+        if entry is not None:
+            print(f"   ♻️  Build cache hit for snapshot {snapshot_id}")
+            return entry
+
+        build_dir = self.worktree / "build"
+        result = tracer.run(["west", "build", "-b", self.board, "-d", str(build_dir), "-p", "auto",
+                             str(self.worktree), "--", *CLEAR_CACHED_ARGS, *overlay_cmake_args(overlays)],
+                            name="bisect_build", cwd=self.worktree, capture_output=True, text=True)
+        if result.returncode != 0:
+            print(f"   ⚠️  Snapshot {snapshot_id} does not build - skipping")
+            return None
+        return self.cache.store(key, build_dir, snapshot=snapshot_id, board=self.board)
+
+    def close(self):
+        shutil.rmtree(self.worktree, ignore_errors=True)
+
+
+def _verdict_from_capture(capture_file):
+    from analyzer_automation import check_lsm6_rows
+    from logic_capture import decode_spi_file, spi_annotations
+
+    capture, transactions = decode_spi_file(capture_file)
+    results = check_lsm6_rows(spi_annotations(transactions, capture.samplerate))
+    return results["spi_activity"] and results["who_am_i_found"]
+
+
+class HardwareVerdict:
+    """Flash the cached image and judge a fresh capture"""
+
+    def __init__(self, builder, project_dir, probe_serial=None):
+        from analyzer_automation import AnalyzerAutomation
+
+        self.builder = builder
+        self.automation = AnalyzerAutomation(project_dir=project_dir, decoder="native")
+        self.probe_serial = probe_serial
+        self.runs = 0
+
+    def __call__(self, point):
+        entry = self.builder.artifacts(point)
+        if entry is None:
+            return None
+        cmd = ["nrfjprog", "--program", str(entry / "zephyr.hex"), "--sectorerase", "--verify", "--reset"]
+        if self.probe_serial:
+            cmd[1:1] = ["--snr", str(self.probe_serial)]
+        if tracer.run(cmd, name="bisect_flash", capture_output=True).returncode != 0:
+            raise RuntimeError(f"Flashing {str(point)[:10]} failed - check the probe")
+        self.runs += 1
+        capture_file = self.automation.capture_spi_signals()
+        if capture_file is None:
+            raise RuntimeError("Capture failed - check the analyzer")
+        return _verdict_from_capture(capture_file)
+
+
+class ReplayVerdict:
+    """Judge each commit by the .sr capture it recorded (no build, no hardware)"""
+
+    def __init__(self, repo):
+        self.repo = Path(repo)
+        self.runs = 0
+
+    def __call__(self, sha):
+        changed = _git(self.repo, "diff-tree", "--no-commit-id", "--name-only", "-r", "--root", sha)
+        captures = [p for p in changed.splitlines() if p.startswith("analyzer_captures/") and p.endswith(".sr")]
+        if not captures:
+            print(f"   ⚠️  {sha[:10]} recorded no capture - skipping")
+            return None
+        with tempfile.TemporaryDirectory() as tmp:
+            capture_file = Path(tmp) / "replay.sr"
+            blob = subprocess.run(["git", "show", f"{sha}:{captures[-1]}"], cwd=self.repo,
+                                  capture_output=True, check=True).stdout
+            capture_file.write_bytes(blob)
+            self.runs += 1
+            return _verdict_from_capture(capture_file)
+
+
+class SnapshotReplayVerdict:
+    """Judge each snapshot by the first capture taken after it (no build, no hardware)"""
+
+    def __init__(self, project_dir):
+        self.store = SnapshotStore(project_dir)
+        self.captures_dir = Path(project_dir) / "analyzer_captures"
+        self.runs = 0
+
+    def __call__(self, snapshot_id):
+        start = self.store.manifest(snapshot_id)["time"]
+        later = [i for i in self.store.snapshots() if i > snapshot_id]
+        end = self.store.manifest(later[0])["time"] if later else float("inf")
+        captures = sorted((p for pattern in ("*.sr", "*.vcd") for p in self.captures_dir.glob(pattern)
+                           if start <= p.stat().st_mtime < end), key=lambda p: p.stat().st_mtime)
+        if not captures:
+            print(f"   ⚠️  No capture after snapshot {snapshot_id} - skipping")
+            return None
+        self.runs += 1
+        return _verdict_from_capture(captures[0])
+
+
+def locate(points, verdict, good, bad):
+    """
+    Find the first bad point among points [(key, label)], oldest first, with
+    verdict(key). The good and bad endpoints are verified before trusting the
+    bisect, and the last point is tested when it is not the bad endpoint
+    itself: if it passes, the regression came in after every point.
+    """
+    verdicts = {}
+
+    def test(point):
+        key, label = point
+        if key not in verdicts:
+            with tracer.span("bisect_step", point=str(key)[:10]) as step:
+                verdicts[key] = verdict(key)
+                step.set(verdict=verdicts[key])
+            outcome = {True: "good ✅", False: "bad ❌", None: "skip ⏭️"}[verdicts[key]]
+            print(f"   {str(key)[:10]} {label}: {outcome}")
+        return verdicts[key]
+
+    result = {"first_bad": None, "candidates": [], "commits": len(points), "error": None}
+    bad_verdict = test(bad)
+    if bad_verdict is True:
+        return dict(result, error=f"{bad[1]} passes - nothing to bisect", runs=verdict.runs)
+    if test(good) is False:
+        return dict(result, error=f"{good[1]} fails - pick an older good revision", runs=verdict.runs)
+    if bad_verdict is None:
+        print(f"   ⚠️  {bad[1]} could not be tested - assuming it is bad")
+    if points[-1][0] != bad[0] and test(points[-1]) is True:
+        # Every AI change passes; something after the last one broke it
+        return dict(result, runs=verdict.runs)
+
+    first_bad, candidates = bisect(len(points), lambda index: test(points[index]))
+    return dict(result, first_bad=points[first_bad], candidates=[points[i] for i in candidates],
+                runs=verdict.runs)
+
+
+def run_bisect(repo, good, bad, verdict):
+    commits = ai_commits(repo, good, bad)
+    if not commits:
+        print(f"❌ No '{AI_COMMIT_PREFIX}' commits in {good}..{bad}")
+        return None
+
+    print(f"🔎 Bisecting {len(commits)} AI commit(s) between {good} and {bad}")
+    good_sha, bad_sha = (_git(repo, "rev-parse", rev).strip() for rev in (good, bad))
+    return locate(commits, verdict, (good_sha, f"{good} (good)"), (bad_sha, f"{bad} (bad)"))
+
+
+def run_snapshot_bisect(project_dir, good, bad, verdict):
+    store = SnapshotStore(project_dir)
+    ids = store.snapshots()
+    if not ids:
+        print(f"❌ No iteration snapshots in {store.root}")
+        return None
+    # The first snapshot is the fix loop's baseline, taken before any AI change
+    good = ids[0] if good is None else int(good)
+    bad = ids[-1] if bad is None else int(bad)
+    snapshots = ai_snapshots(store, good, bad)
+    if not snapshots:
+        print(f"❌ No snapshots after {good} up to {bad}")
+        return None
+
+    print(f"🔎 Bisecting {len(snapshots)} AI iteration snapshot(s) between {good} and {bad}")
+    return locate(snapshots, verdict, (good, f"snapshot {good} (good)"), (bad, f"snapshot {bad} (bad)"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find the AI iteration that broke the hardware verdict")
+    parser.add_argument("--source", choices=["snapshots", "commits"], default="snapshots",
+                        help="Bisect the fix loop's snapshots or 'AI Fix Iteration' commits")
+    parser.add_argument("--good", help="Last known good snapshot id (default: the baseline) or revision")
+    parser.add_argument("--bad", help="Known bad snapshot id (default: the latest) or revision (default: HEAD)")
+    parser.add_argument("--repo", default=str(Path(__file__).resolve().parent.parent))
+    parser.add_argument("--mode", choices=["hardware", "replay"], default="hardware")
+    parser.add_argument("--board", default=DEFAULT_BOARD)
+    parser.add_argument("--probe", help="nrfjprog serial number")
+    parser.add_argument("--cache-dir", help="Build cache directory (default: <repo>/build_cache)")
+    args = parser.parse_args()
+
+    snapshots = args.source == "snapshots"
+    builder = None
+    if args.mode == "hardware":
+        cache = BuildCache(args.cache_dir or Path(args.repo) / "build_cache")
+        builder = (SnapshotBuilder if snapshots else CommitBuilder)(args.repo, cache, args.board)
+        verdict = HardwareVerdict(builder, args.repo, args.probe)
+    else:
+        verdict = SnapshotReplayVerdict(args.repo) if snapshots else ReplayVerdict(args.repo)
+
+    try:
+        if snapshots:
+            result = run_snapshot_bisect(args.repo, args.good, args.bad, verdict)
+        elif args.good is None:
+            parser.error("--good is required with --source commits")
+        else:
+            result = run_bisect(args.repo, args.good, args.bad or "HEAD", verdict)
+    finally:
+        if builder is not None:
+            builder.close()
+    if result is None:
+        return 1
+    if result["error"]:
+        print(f"\n❌ {result['error']}")
+        return 1
+
+    kind = "snapshot" if snapshots else "commit"
+    if result["first_bad"] is None:
+        print(f"\n🎯 Not caused by an AI {kind}: the last AI {kind} passes, the regression came later")
+    elif len(result["candidates"]) > 1:
+        print(f"\n⚠️  Skipped {kind}s leave {len(result['candidates'])} candidates:")
+        for candidate, candidate_label in result["candidates"]:
+            print(f"   {str(candidate)[:10]} {candidate_label}")
+    else:
+        point, label = result["first_bad"]
+        print(f"\n🎯 First bad {kind}: {str(point)[:10]} {label}")
+    print(f"📊 {result['runs']} verdict run(s) for {result['commits']} {kind}(s)")
+    if builder is not None:
+        print(f"♻️  Build cache: {builder.cache.stats}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -11,11 +11,23 @@ from pathlib import Path
 from datetime import datetime
 import re
 
+from fix_overlays import OVERLAY_DIR, OverlayStore
+from fix_ranking import (FIXES_PER_ITERATION, HISTORY_FILE, FixHistory, FixRanker, PendingFixes,
+                         capture_features, issue_signature)
+from kconfig_resolver import resolve_config
+
 class AICodeGenerator:
     def __init__(self):
         self.project_root = Path("C:/Development/MIPE_EV1")
         self.captures_dir = self.project_root / "analyzer_captures"
         self.src_dir = self.project_root / "src"
+        self.board = "mipe_ev1"
+
+        # Learned fix ordering from earlier iterations
+        self.fix_history = FixHistory(self.project_root / HISTORY_FILE)
+        self.ranker = FixRanker(self.fix_history)
+        self.pending_fixes = PendingFixes(self.captures_dir / "pending_fixes.json")
+        self.overlays = OverlayStore(self.project_root / OVERLAY_DIR)
         
         # AI Knowledge Base for SPI Development
         self.spi_fixes = {
@@ -59,7 +71,13 @@ class AICodeGenerator:
             
         if results.get('valid_responses', 0) == 0:
             analysis["issues_detected"].append("no_valid_responses")
-            
+
+        # The previous iteration's fixes are judged by this result
+        resolved = self.pending_fixes.resolve(self.fix_history, analysis["success"])
+        if resolved:
+            verdict = "worked" if analysis["success"] else "did not resolve the issue"
+            print(f"📚 Fixes {resolved['fixes']} {verdict}")
+
         # Save analysis
         analysis_file = self.captures_dir / f"ai_analysis_{self._timestamp()}.json"
         with open(analysis_file, 'w') as f:
@@ -75,14 +93,33 @@ class AICodeGenerator:
             return True
             
         print("🔧 AI generating code fixes...")
-        
-        for issue in analysis.get("issues_detected", []):
-            if issue in self.spi_fixes:
-                print(f"   Fixing: {issue}")
-                self.spi_fixes[issue](analysis)
-            else:
+
+        issues = analysis.get("issues_detected", [])
+        for issue in issues:
+            if issue not in self.spi_fixes:
                 print(f"   Unknown issue: {issue}")
-                
+
+        # Only the best fix by expected success per round trip is built, so
+        # its verdict is its own; fixes known to fail for this signature are
+        # not retried
+        features = capture_features(analysis.get("raw_results", {}))
+        signature = issue_signature(issues, features)
+        candidates = [issue for issue in issues if issue in self.spi_fixes]
+        ranked = self.ranker.rank(signature, candidates)
+        skipped = set(candidates) - {entry["fix"] for entry in ranked}
+        for fix in sorted(skipped):
+            print(f"   Skipping: {fix} (already failed for this signature)")
+
+        chosen, deferred = ranked[:FIXES_PER_ITERATION], ranked[FIXES_PER_ITERATION:]
+        for entry in chosen:
+            print(f"   Fixing: {entry['fix']} (p={entry['success']:.2f}, ~{entry['cost_s']:.0f}s)")
+            self.spi_fixes[entry["fix"]](analysis)
+        for entry in deferred:
+            print(f"   Deferred: {entry['fix']} (p={entry['success']:.2f})")
+
+        if chosen:
+            self.pending_fixes.save(signature, [entry["fix"] for entry in chosen], issues, features)
+
         # Update configuration if needed
         self._update_configurations(analysis)
         
@@ -203,19 +240,17 @@ int main(void)
         """Update configuration files based on analysis"""
         print("   🔧 Updating configurations...")
         
-        # Update prj.conf to enable SPI
-        prj_conf = self.project_root / "prj.conf"
-        if prj_conf.exists():
-            with open(prj_conf, 'r') as f:
-                content = f.read()
-                
-            if "CONFIG_SPI=y" not in content:
-                content += "\n# AI Added: Enable SPI\nCONFIG_SPI=y\n"
-                
-                with open(prj_conf, 'w') as f:
-                    f.write(content)
-                    
-                print("   ✅ Added SPI config to prj.conf")
+        # Enable SPI with an EXTRA_CONF_FILE fragment unless the merged board + app config
+        # already does; extra fragments merge last, so it also overrides a board .conf
+        config = resolve_config(self.project_root, self.board, self.overlays.active_files("conf"))
+        if not config.is_enabled("SPI"):
+            source = config.source("SPI")
+            if source:
+                print(f"   CONFIG_SPI={source[2]} set by {Path(source[0]).name}:{source[1]} - overriding")
+            overlay = self.overlays.put("# AI Added: Enable SPI\nCONFIG_SPI=y", "conf")
+            self.overlays.activate("conf_spi", overlay)
+            print(f"   ✅ Layered SPI config as {OVERLAY_DIR}/{overlay.name}")
+        print(f"::set-output name=cmake_args::{' '.join(self.overlays.cmake_args())}")
         
     def _get_iteration_count(self):
         """Get current iteration number"""
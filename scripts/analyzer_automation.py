@@ -10,20 +10,73 @@ import csv
 import json
 import os
 import time
+import zipfile
 import psutil
 from pathlib import Path
 
+from analyzer_session import AnalyzerError, AnalyzerSession, create_backend
+from capture_planner import DEFAULT_SAMPLE_RATE, plan_capture
+from capture_trigger import DEFAULT_TRIGGER, hardware_trigger_command, stream_software_trigger
+from logic_capture import parse_samplerate, spi_annotations
+from lsm6_decoder import analyze_lsm6
+from parallel_decode import decode_spi_with_timing_parallel
+from spi_timing import decode_spi_with_timing
+from tracing import tracer
+
 # Configuration
 SIGROK_CLI = r"C:\Program Files\sigrok\sigrok-cli\sigrok-cli.exe"
 LOGIC2_PATH = r"C:\Users\{}\AppData\Local\Programs\Logic\Logic.exe"
-SAMPLE_RATE = "25M"
+SAMPLE_RATE = DEFAULT_SAMPLE_RATE  # fx2lafw tops out at 24 MHz
 CAPTURE_DURATION = "5s"  # 5 seconds of capture for fast Actions
+ANALYZER_DEVICE = "fx2lafw:conn=3.22"  # Specify your exact device
+
+# Bump when the detection rules in check_lsm6_rows, lsm6_decoder or spi_timing
+# change so stored batch results are recomputed (see batch_reanalysis.py)
+ANALYZER_VERSION = "3"
+
+def check_lsm6_rows(spi_data):
+    """
+    LSM6DSO32 detection rules over decoded SPI rows
+    Look for WHO_AM_I register response (0x6C)
+    """
+    validation_results = {
+        'spi_activity': len(spi_data) > 0,
+        'who_am_i_found': False,
+        'valid_responses': 0,
+        'raw_data': spi_data
+    }
+    
+    for entry in spi_data:
+        if 'miso' in entry['type'].lower():
+            # Look for WHO_AM_I response (0x6C = 108 decimal)
+            data = entry['data'].replace('0x', '').replace(' ', '')
+            if '6C' in data.upper() or '108' in data:
+                validation_results['who_am_i_found'] = True
+            validation_results['valid_responses'] += 1
+    
+    return validation_results
 
 class AnalyzerAutomation:
-    def __init__(self):
-        self.project_dir = Path(r"C:\Development\MIPE_EV1")
+    def __init__(self, project_dir=None, decoder="sigrok", decode_workers=1, session=None):
+        self.project_dir = Path(project_dir) if project_dir else Path(r"C:\Development\MIPE_EV1")
         self.captures_dir = self.project_dir / "analyzer_captures"
         self.captures_dir.mkdir(exist_ok=True)
+        # "sigrok" shells out to sigrok-cli, "native" decodes in-process
+        self.decoder = decoder
+        # >1 splits large captures at CS-idle gaps across worker processes
+        self.decode_workers = decode_workers
+        # Optional long-lived AnalyzerSession; without one every run rescans
+        self.session = session
+        # Set by arm_trigger(); None records the fixed capture_duration window
+        self.trigger = None
+        # Module defaults until apply_capture_plan() derives them from the board
+        self.samplerate = SAMPLE_RATE
+        self.capture_duration = CAPTURE_DURATION
+        # (transactions, samplerate) from the last native decode, for the
+        # register-level analysis; the sigrok-cli path only yields rows
+        self.spi_transactions = None
+        # Measured bus timing (spi_timing.py) from the last native decode
+        self.spi_timing = None
         
     def check_logic2_running(self):
         """Check if Logic 2 software is running"""
@@ -81,17 +134,35 @@ class AnalyzerAutomation:
         print("Please ensure Logic 2 is installed or start it manually")
         return False
         
+    def open_session(self, backend="sigrok", replay_source=None, scan_ttl=None):
+        """Attach a persistent analyzer session so repeated runs skip scan/reopen"""
+        self.session = AnalyzerSession(
+            create_backend(backend, replay_source=replay_source, sigrok_cli=SIGROK_CLI),
+            scan_ttl=scan_ttl
+        )
+        return self.session
+    
     def scan_devices(self):
         """Scan for available logic analyzers"""
+        if self.session is not None:
+            # Cached until the session is invalidated by an error or hotplug
+            try:
+                return bool(self.session.devices())
+            except AnalyzerError as e:
+                print(f"Error scanning devices: {e}")
+                return False
+        
         print("Scanning for logic analyzers...")
         
         # First ensure Logic 2 is running
-        if not self.start_logic2():
+        with tracer.span("logic2_startup"):
+            logic2_ready = self.start_logic2()
+        if not logic2_ready:
             print("Warning: Logic 2 not available - continuing with sigrok")
         
         try:
-            result = subprocess.run([SIGROK_CLI, "--scan"],
-                                    capture_output=True, text=True, check=True)
+            result = tracer.run([SIGROK_CLI, "--scan"], name="sigrok_scan",
+                                capture_output=True, text=True, check=True)
             print(result.stdout)
             # Look for fx2lafw device (your Cypress FX2 analyzer)
             has_fx2lafw = "fx2lafw" in result.stdout
@@ -101,6 +172,62 @@ class AnalyzerAutomation:
             print(f"Error scanning devices: {e}")
             return False
     
+    def apply_capture_plan(self, board="mipe_ev1"):
+        """Use the minimum sample rate / duration the board configuration needs"""
+        plan = plan_capture(self.project_dir, board, SAMPLE_RATE, CAPTURE_DURATION)
+        self.samplerate = plan["samplerate"]
+        self.capture_duration = plan["duration"]
+        print(f"📐 Capture plan: {self.samplerate} for {self.capture_duration}")
+        for reason in plan["reasons"]:
+            print(f"   - {reason}")
+        return plan
+    
+    def arm_trigger(self, spec=DEFAULT_TRIGGER, pre_ms=1.0, post_ms=10.0, software=False, max_windows=None):
+        """
+        Capture only around activity: `spec` is a sigrok trigger (default CS
+        falling edge). software=True streams samples and cuts windows on the
+        host when the analyzer's own trigger is unusable.
+        """
+        rate = parse_samplerate(self.samplerate)
+        self.trigger = {
+            "spec": spec,
+            "pre_samples": int(rate * pre_ms / 1000),
+            "post_samples": int(rate * post_ms / 1000),
+            "software": software,
+            "max_windows": max_windows,
+        }
+        return self.trigger
+    
+    def capture_triggered(self):
+        """Trigger-armed capture using the settings from arm_trigger()"""
+        trigger = self.trigger
+        capture_file = self.captures_dir / f"spi_trigger_{self._timestamp()}.sr"
+        mode = "software" if trigger["software"] else "hardware"
+        print(f"📡 Armed {mode} trigger {trigger['spec']} "
+              f"({trigger['pre_samples']} pre / {trigger['post_samples']} post samples)...")
+        
+        try:
+            if trigger["software"]:
+                capture_file = stream_software_trigger(
+                    SIGROK_CLI, ANALYZER_DEVICE, self.samplerate, self.capture_duration, capture_file,
+                    trigger["spec"], trigger["pre_samples"], trigger["post_samples"],
+                    trigger["max_windows"]
+                )
+                if capture_file is None:
+                    print(f"❌ No trigger within {self.capture_duration}")
+                    return None
+            else:
+                cmd = hardware_trigger_command(
+                    SIGROK_CLI, ANALYZER_DEVICE, self.samplerate, capture_file,
+                    trigger["spec"], trigger["pre_samples"], trigger["post_samples"]
+                )
+                tracer.run(cmd, name="sigrok_trigger_capture", check=True)
+            print(f"✅ Capture saved to: {capture_file}")
+            return capture_file
+        except (OSError, subprocess.CalledProcessError) as e:
+            print(f"❌ Capture failed: {e}")
+            return None
+    
     def capture_spi_signals(self, channel_map=None):
         """
         Capture SPI signals using the logic analyzer
@@ -113,21 +240,33 @@ class AnalyzerAutomation:
         if channel_map is None:
             channel_map = {"clk": 0, "mosi": 1, "miso": 2, "cs": 3}
         
-        print(f"📡 Capturing SPI signals for {CAPTURE_DURATION}...")
+        if self.trigger is not None:
+            return self.capture_triggered()
+        
+        print(f"📡 Capturing SPI signals for {self.capture_duration}...")
         
         capture_file = self.captures_dir / f"spi_capture_{self._timestamp()}.sr"
         
+        if self.session is not None:
+            try:
+                capture_file = self.session.capture(capture_file, self.samplerate, self.capture_duration)
+                print(f"✅ Capture saved to: {capture_file}")
+                return capture_file
+            except AnalyzerError as e:
+                print(f"❌ Capture failed: {e}")
+                return None
+        
         # Basic signal capture with specific device selection
         cmd = [
             SIGROK_CLI,
-            "-d", "fx2lafw:conn=3.22",  # Specify your exact device
-            "-c", f"samplerate={SAMPLE_RATE}",
-            "-t", f"time={CAPTURE_DURATION}",
+            "-d", ANALYZER_DEVICE,
+            "-c", f"samplerate={self.samplerate}",
+            "-t", f"time={self.capture_duration}",
             "-o", str(capture_file)
         ]
         
         try:
-            subprocess.run(cmd, check=True)
+            tracer.run(cmd, name="sigrok_capture", check=True)
             print(f"✅ Capture saved to: {capture_file}")
             return capture_file
         except subprocess.CalledProcessError as e:
@@ -141,6 +280,9 @@ class AnalyzerAutomation:
         
         print("🔍 Decoding SPI protocol...")
         
+        if self.decoder == "native":
+            return self._decode_spi_native(capture_file, channel_map)
+        
         csv_file = capture_file.with_suffix('.csv')
         
         # Protocol decode command
@@ -155,13 +297,28 @@ class AnalyzerAutomation:
         ]
         
         try:
-            subprocess.run(cmd, check=True)
+            tracer.run(cmd, name="sigrok_decode", check=True)
             print(f"✅ SPI decode saved to: {csv_file}")
             return self._parse_spi_csv(csv_file)
         except subprocess.CalledProcessError as e:
             print(f"❌ SPI decode failed: {e}")
             return None
     
+    def _decode_spi_native(self, capture_file, channel_map):
+        """Decode SPI in-process from the .sr samples (no sigrok-cli pass)"""
+        try:
+            if self.decode_workers > 1:
+                capture, transactions, self.spi_timing = decode_spi_with_timing_parallel(
+                    capture_file, channel_map, workers=self.decode_workers)
+            else:
+                capture, transactions, self.spi_timing = decode_spi_with_timing(capture_file, channel_map)
+        except (OSError, KeyError, ValueError, zipfile.BadZipFile) as e:
+            print(f"❌ SPI decode failed: {e}")
+            return None
+        print(f"✅ Decoded {len(transactions)} SPI transactions in-process")
+        self.spi_transactions = (transactions, capture.samplerate)
+        return spi_annotations(transactions, capture.samplerate)
+    
     def _parse_spi_csv(self, csv_file):
         """Parse decoded SPI CSV file"""
         spi_data = []
@@ -187,22 +344,7 @@ class AnalyzerAutomation:
         """
         print("🔍 Validating LSM6DSO32 communication...")
         
-        validation_results = {
-            'spi_activity': len(spi_data) > 0,
-            'who_am_i_found': False,
-            'valid_responses': 0,
-            'raw_data': spi_data
-        }
-        
-        for entry in spi_data:
-            if 'miso' in entry['type'].lower():
-                # Look for WHO_AM_I response (0x6C = 108 decimal)
-                data = entry['data'].replace('0x', '').replace(' ', '')
-                if '6C' in data.upper() or '108' in data:
-                    validation_results['who_am_i_found'] = True
-                validation_results['valid_responses'] += 1
-        
-        return validation_results
+        return check_lsm6_rows(spi_data)
     
     def _timestamp(self):
         """Generate timestamp for file naming"""
@@ -214,31 +356,58 @@ class AnalyzerAutomation:
         print("🚀 Starting MIPE_EV1 SPI Automation Test")
         print("=" * 50)
         
+        with tracer.span("analyzer_test") as test_span:
+            passed = self._run_automated_test_steps()
+            test_span.set(passed=passed)
+        return passed
+    
+    def _run_automated_test_steps(self):
         # Step 1: Verify analyzer connection
-        if not self.scan_devices():
+        with tracer.span("scan_devices"):
+            device_found = self.scan_devices()
+        if not device_found:
             print("❌ No supported analyzer found!")
             return False
         
         # Step 2: Capture SPI signals
-        capture_file = self.capture_spi_signals()
+        with tracer.span("capture", samplerate=self.samplerate, duration=self.capture_duration):
+            capture_file = self.capture_spi_signals()
         if not capture_file:
             print("❌ Signal capture failed!")
             return False
         
         # Step 3: Decode SPI protocol
-        spi_data = self.decode_spi_capture(capture_file)
+        with tracer.span("decode", decoder=self.decoder) as decode_span:
+            spi_data = self.decode_spi_capture(capture_file)
+            decode_span.set(rows=len(spi_data) if spi_data is not None else None)
         if spi_data is None:
             print("❌ SPI decode failed!")
             return False
         
         # Step 4: Validate communication
-        results = self.validate_lsm6_communication(spi_data)
+        with tracer.span("validate"):
+            results = self.validate_lsm6_communication(spi_data)
+        if self.spi_transactions:
+            with tracer.span("lsm6_semantic") as semantic_span:
+                results['lsm6'] = analyze_lsm6(*self.spi_transactions)
+                semantic_span.set(who_am_i=results['lsm6']['who_am_i'])
+        if self.spi_timing:
+            results['spi_timing'] = self.spi_timing
         
         # Step 5: Report results
         print("\n📊 Test Results:")
         print(f"   SPI Activity Detected: {'✅' if results['spi_activity'] else '❌'}")
         print(f"   LSM6 WHO_AM_I Found: {'✅' if results['who_am_i_found'] else '❌'}")
         print(f"   Valid Responses: {results['valid_responses']}")
+        for rate in results.get('lsm6', {}).get('data_rates', []):
+            achieved = rate['achieved_odr_hz']
+            print(f"   {rate['sensor'].title()} ODR: {achieved if achieved is not None else '?'} Hz achieved / "
+                  f"{rate['configured_odr_hz']} Hz configured, {rate['missed_samples']} missed, "
+                  f"{rate['duplicate_reads']} duplicate reads")
+        clock = results.get('spi_timing', {}).get('clock')
+        if clock and clock['measured_hz']:
+            print(f"   SCLK: {clock['measured_hz']} Hz measured, suggested {clock['suggested_hz'] or '?'} Hz "
+                  f"({clock['limited_by'] or 'no MISO activity'})")
         
         # Save results for CI/CD
         results_file = self.captures_dir / f"test_results_{self._timestamp()}.json"
@@ -252,7 +421,16 @@ class AnalyzerAutomation:
 if __name__ == "__main__":
     import sys
     
-    automation = AnalyzerAutomation()
+    # "--decoder native" decodes in-process, which also measures spi_timing
+    decoder = "sigrok"
+    if "--decoder" in sys.argv:
+        at = sys.argv.index("--decoder")
+        decoder = sys.argv[at + 1] if at + 1 < len(sys.argv) else ""
+        if decoder not in ("sigrok", "native"):
+            print(f"Unknown decoder {decoder!r}: use sigrok or native")
+            exit(2)
+        del sys.argv[at:at + 2]
+    automation = AnalyzerAutomation(decoder=decoder)
     
     # Check for test argument
     if len(sys.argv) > 1 and sys.argv[1] == "--test":
@@ -279,10 +457,30 @@ if __name__ == "__main__":
         else:
             print("Logic Analyzer automation: NOT READY")
             exit(1)
+    elif len(sys.argv) > 1 and sys.argv[1] == "--planned":
+        # Sample rate and duration derived from the board DTS and main.c
+        automation.apply_capture_plan()
+        exit(0 if automation.run_automated_test() else 1)
+    elif len(sys.argv) > 1 and sys.argv[1] in ("--triggered", "--soft-trigger"):
+        # Record only the windows around CS activity instead of a fixed 5s
+        automation.arm_trigger(software=sys.argv[1] == "--soft-trigger")
+        exit(0 if automation.run_automated_test() else 1)
+    elif len(sys.argv) > 2 and sys.argv[1] == "--loop":
+        # Back-to-back runs on one persistent session: scan once, capture many
+        runs = int(sys.argv[2])
+        automation.open_session()
+        passed = sum(1 for _ in range(runs) if automation.run_automated_test())
+        print(f"\n📊 {passed}/{runs} runs passed ({automation.session.stats})")
+        exit(0 if passed == runs else 1)
     else:
         # Run full automation test
         success = automation.run_automated_test()
         
+        if "--trace" in sys.argv:
+            tracer.print_summary()
+            trace_file, _ = tracer.export(automation.project_dir / "traces", "analyzer")
+            print(f"📄 Trace saved to: {trace_file}")
+        
         if success:
             print("\n🎉 Automated SPI test PASSED!")
             exit(0)
@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""
+MIPE_EV1 Analyzer Session Manager
+Long-lived logic analyzer session that scans once, keeps the device open
+and serves back-to-back captures through pluggable backends
+"""
+
+import csv
+import itertools
+import shutil
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+from tracing import tracer
+
+LOGIC2_PORT = 10430  # Logic 2 automation server default
+
+
+class AnalyzerError(Exception):
+    """Raised by a backend when the device is gone or a capture fails"""
+
+
+class AnalyzerBackend:
+    """Interface every analyzer backend implements"""
+
+    name = "base"
+
+    def scan(self):
+        """Return a list of {'id', 'description'} dicts for attached devices"""
+        raise NotImplementedError
+
+    def open(self, device):
+        """Claim the device for subsequent captures"""
+
+    def capture(self, output_file, samplerate, duration):
+        """Record one capture to output_file and return its path"""
+        raise NotImplementedError
+
+    def close(self):
+        """Release the device"""
+
+
+class SigrokCliBackend(AnalyzerBackend):
+    """
+    sigrok-cli backend. sigrok-cli cannot hold the USB device across
+    invocations, so the session value here is skipping --scan and the
+    Logic 2 process sweep on every capture.
+    """
+
+    name = "sigrok"
+
+    def __init__(self, sigrok_cli="sigrok-cli", preferred=("fx2lafw", "saleae")):
+        self.sigrok_cli = sigrok_cli
+        self.preferred = preferred
+        self.device = None
+
+    def scan(self):
+        try:
+            result = tracer.run([self.sigrok_cli, "--scan"], name="sigrok_scan",
+                                capture_output=True, text=True, check=True)
+        except (OSError, subprocess.CalledProcessError) as e:
+            raise AnalyzerError(f"sigrok scan failed: {e}")
+
+        devices = []
+        for line in result.stdout.splitlines():
+            if " - " not in line:
+                continue
+            device_id, description = line.split(" - ", 1)
+            if any(p in line.lower() for p in self.preferred):
+                devices.append({"id": device_id.strip(), "description": description.strip()})
+        return devices
+
+    def open(self, device):
+        self.device = device
+
+    def capture(self, output_file, samplerate, duration):
+        cmd = [
+            self.sigrok_cli,
+            "-d", self.device["id"],
+            "-c", f"samplerate={samplerate}",
+            "-t", f"time={duration}",
+            "-o", str(output_file),
+        ]
+        try:
+            tracer.run(cmd, name="sigrok_capture", check=True, capture_output=True, text=True)
+        except (OSError, subprocess.CalledProcessError) as e:
+            raise AnalyzerError(f"sigrok capture failed: {e}")
+        return Path(output_file)
+
+    def close(self):
+        self.device = None
+
+
+class Logic2Backend(AnalyzerBackend):
+    """
+    Saleae Logic 2 automation backend (logic2-automation package).
+    Keeps one automation connection and device id open for the whole session.
+    The digital data is exported and converted to .vcd, which the decoders
+    read through open_capture; the .sal is kept alongside for the Logic 2 GUI.
+    """
+
+    name = "logic2"
+
+    def __init__(self, port=LOGIC2_PORT, channels=(0, 1, 2, 3)):
+        self.port = port
+        self.channels = list(channels)
+        self.manager = None
+        self.device = None
+
+    def _connect(self):
+        if self.manager is None:
+            try:
+                from saleae import automation
+            except ImportError:
+                raise AnalyzerError("logic2-automation is not installed (pip install logic2-automation)")
+            try:
+                self.manager = automation.Manager.connect(port=self.port)
+            except Exception as e:
+                raise AnalyzerError(f"Cannot reach Logic 2 automation server on port {self.port}: {e}")
+        return self.manager
+
+    def scan(self):
+        manager = self._connect()
+        try:
+            return [{"id": d.device_id, "description": str(d.device_type)} for d in manager.get_devices()]
+        except Exception as e:
+            raise AnalyzerError(f"Logic 2 device query failed: {e}")
+
+    def open(self, device):
+        self.device = device
+
+    def capture(self, output_file, samplerate, duration):
+        from saleae import automation
+        from logic_capture import parse_samplerate
+
+        device_config = automation.LogicDeviceConfiguration(
+            enabled_digital_channels=self.channels,
+            digital_sample_rate=parse_samplerate(samplerate),
+        )
+        capture_config = automation.CaptureConfiguration(
+            capture_mode=automation.TimedCaptureMode(duration_seconds=_duration_seconds(duration))
+        )
+        try:
+            with self._connect().start_capture(device_id=self.device["id"],
+                                               device_configuration=device_config,
+                                               capture_configuration=capture_config) as capture:
+                capture.wait()
+                output_file = Path(output_file)
+                capture.save_capture(filepath=str(output_file.with_suffix(".sal")))
+                with tempfile.TemporaryDirectory(prefix="logic2_export_") as export_dir:
+                    capture.export_raw_data_csv(directory=export_dir, digital_channels=self.channels)
+                    return logic2_csv_to_vcd(Path(export_dir) / "digital.csv", output_file.with_suffix(".vcd"),
+                                             samplerate, self.channels, _duration_seconds(duration))
+        except Exception as e:
+            raise AnalyzerError(f"Logic 2 capture failed: {e}")
+
+    def close(self):
+        if self.manager is not None:
+            try:
+                self.manager.close()
+            finally:
+                self.manager = None
+        self.device = None
+
+
+class ReplayBackend(AnalyzerBackend):
+    """File-replay stand-in: serves recorded .sr captures in rotation (no hardware)"""
+
+    name = "replay"
+
+    def __init__(self, source):
+        source = Path(source)
+        self.files = sorted(source.glob("*.sr")) if source.is_dir() else [source]
+        self._cycle = itertools.cycle(self.files) if self.files else None
+
+    def scan(self):
+        if not self.files:
+            return []
+        return [{"id": "replay", "description": f"Replay of {len(self.files)} capture(s)"}]
+
+    def capture(self, output_file, samplerate, duration):
+        if self._cycle is None:
+            raise AnalyzerError("No captures available to replay")
+        source = next(self._cycle)
+        shutil.copyfile(source, output_file)
+        return Path(output_file)
+
+
+def iter_logic2_csv(path, samplerate, channels):
+    """
+    (sample_index, value) transitions from a Logic 2 digital.csv export
+    (Time [s], then one 0/1 column per exported channel, one row per change);
+    column i sets bit channels[i]
+    """
+    from logic_capture import parse_samplerate
+
+    rate = parse_samplerate(samplerate)
+    bits = [1 << channel for channel in channels]
+    with open(path, "r", newline="") as f:
+        reader = csv.reader(f)
+        next(reader, None)
+        for row in reader:
+            if not row:
+                continue
+            value = 0
+            for bit, level in zip(bits, row[1:]):
+                if level.strip() == "1":
+                    value |= bit
+            yield max(0, int(round(float(row[0]) * rate))), value
+
+
+def logic2_csv_to_vcd(csv_path, vcd_path, samplerate, channels, duration_s=None):
+    """Convert a Logic 2 digital.csv export to a .vcd capture; returns the .vcd path"""
+    from logic_capture import parse_samplerate
+    from vcd_capture import write_vcd_transitions
+
+    csv_path = Path(csv_path)
+    if not csv_path.exists():
+        raise AnalyzerError(f"Logic 2 export produced no digital data ({csv_path.name})")
+    rate = parse_samplerate(samplerate)
+    end_sample = int(round(duration_s * rate)) if duration_s else None
+    write_vcd_transitions(vcd_path, iter_logic2_csv(csv_path, rate, channels), rate, end_sample,
+                          channels=max(channels) + 1)
+    return Path(vcd_path)
+
+
+def _duration_seconds(duration):
+    """'5s' / '500ms' / 5 -> seconds"""
+    text = str(duration).strip().lower()
+    if text.endswith("ms"):
+        return float(text[:-2]) / 1000
+    return float(text.rstrip("s"))
+
+
+class AnalyzerSession:
+    """
+    Keeps scan results and the opened device across captures.
+    The scan cache is dropped only on error, explicit invalidate() (e.g. a
+    USB hotplug notification) or after scan_ttl seconds if one is given.
+    """
+
+    def __init__(self, backend, scan_ttl=None, retries=1):
+        self.backend = backend
+        self.scan_ttl = scan_ttl
+        self.retries = retries
+        self._devices = None
+        self._scanned_at = 0.0
+        self.device = None
+        self.stats = {"scans": 0, "opens": 0, "captures": 0, "invalidations": 0}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def devices(self, refresh=False):
+        """Cached device list; rescans only when invalidated, expired or asked to"""
+        expired = self.scan_ttl is not None and time.monotonic() - self._scanned_at > self.scan_ttl
+        if refresh or expired or self._devices is None:
+            with tracer.span("analyzer_scan", backend=self.backend.name):
+                self._devices = self.backend.scan()
+            self._scanned_at = time.monotonic()
+            self.stats["scans"] += 1
+        return self._devices
+
+    def invalidate(self, reason="manual"):
+        """Forget scan results and the open device (hotplug, error, ...)"""
+        print(f"🔄 Analyzer session invalidated: {reason}")
+        self.stats["invalidations"] += 1
+        self._devices = None
+        if self.device is not None:
+            try:
+                self.backend.close()
+            except Exception:
+                pass
+            self.device = None
+
+    def ensure_open(self):
+        if self.device is None:
+            devices = self.devices()
+            if not devices:
+                raise AnalyzerError(f"No analyzer found by {self.backend.name} backend")
+            with tracer.span("analyzer_open", device=devices[0]["id"]):
+                self.backend.open(devices[0])
+            self.device = devices[0]
+            self.stats["opens"] += 1
+        return self.device
+
+    def capture(self, output_file, samplerate, duration):
+        """Capture on the open device, reopening once if the device went away"""
+        for attempt in range(self.retries + 1):
+            try:
+                self.ensure_open()
+                with tracer.span("analyzer_capture", backend=self.backend.name, attempt=attempt):
+                    result = self.backend.capture(output_file, samplerate, duration)
+                self.stats["captures"] += 1
+                return result
+            except AnalyzerError as e:
+                self.invalidate(str(e))
+                if attempt == self.retries:
+                    raise
+
+    def captures(self, output_dir, count, samplerate, duration, prefix="spi_capture"):
+        """Serve `count` back-to-back captures from the same open device"""
+        output_dir = Path(output_dir)
+        for index in range(count):
+            yield self.capture(output_dir / f"{prefix}_{index:05d}.sr", samplerate, duration)
+
+    def close(self):
+        if self.device is not None:
+            self.backend.close()
+            self.device = None
+
+
+def create_backend(kind, replay_source=None, sigrok_cli="sigrok-cli"):
+    """Build a backend by name: 'sigrok', 'logic2' or 'replay'"""
+    if kind == "sigrok":
+        return SigrokCliBackend(sigrok_cli)
+    if kind == "logic2":
+        return Logic2Backend()
+    if kind == "replay":
+        if replay_source is None:
+            raise ValueError("replay backend needs a capture file or directory")
+        return ReplayBackend(replay_source)
+    raise ValueError(f"Unknown analyzer backend: {kind}")
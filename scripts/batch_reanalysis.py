@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+MIPE_EV1 Batch Reanalysis
+Re-runs capture and RTT detection rules over every historical file on a
+process pool, with resumable content-addressed result storage
+"""
+
+import argparse
+import concurrent.futures
+import hashlib
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+PROJECT_DIR = Path(r"C:\Development\MIPE_EV1")
+
+HASH_BLOCK = 4 * 1024 * 1024
+
+# Corpus layout: (kind, sub-directory, glob)
+CORPUS = [
+    ("capture", "analyzer_captures", "*.sr"),
+    ("capture", "analyzer_captures", "*.vcd"),
+    ("rtt", "rtt_logs", "rtt_capture_*.txt"),
+]
+
+
+def analyzer_versions():
+    """Current rule version per kind; a bump invalidates stored results"""
+    from analyzer_automation import ANALYZER_VERSION as CAPTURE_VERSION
+    from rtt_monitor import ANALYZER_VERSION as RTT_VERSION
+    return {"capture": CAPTURE_VERSION, "rtt": RTT_VERSION}
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def result_key(sha256, kind, version):
+    return f"{sha256}:{kind}:{version}"
+
+
+def discover_corpus(project_dir):
+    """List (kind, path) for every capture and RTT log, largest first for load balancing"""
+    files = []
+    for kind, subdir, pattern in CORPUS:
+        directory = Path(project_dir) / subdir
+        if directory.exists():
+            files.extend((kind, path) for path in directory.glob(pattern))
+    files.sort(key=lambda item: item[1].stat().st_size, reverse=True)
+    return files
+
+
+def analyze_capture(path):
+    """Native SPI decode + timing + LSM6DSO32 rules for one .sr or .vcd capture"""
+    from analyzer_automation import check_lsm6_rows
+    from logic_capture import spi_annotations
+    from lsm6_decoder import analyze_lsm6
+    from spi_timing import decode_spi_with_timing
+
+    capture, transactions, timing = decode_spi_with_timing(path)
+    rows = spi_annotations(transactions, capture.samplerate)
+    results = check_lsm6_rows(rows)
+    results.pop("raw_data")
+    results["transactions"] = len(transactions)
+    results["samples"] = capture.total_samples
+    lsm6 = analyze_lsm6(transactions, capture.samplerate)
+    # Per-register access counts stay out of the stored record
+    lsm6.pop("registers")
+    results["lsm6"] = lsm6
+    results["spi_timing"] = timing
+    results["passed"] = results["spi_activity"] and results["who_am_i_found"]
+    return results
+
+
+def analyze_rtt(path):
+    """GPIO activity rules for one RTT log, streamed line by line"""
+    from rtt_monitor import summarize_rtt_log
+
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        summary = summarize_rtt_log(f)
+    summary["passed"] = summary["hardware_status"] == "ACTIVE"
+    return summary
+
+
+ANALYZERS = {"capture": analyze_capture, "rtt": analyze_rtt}
+
+# Keys already stored, installed once per worker by the pool initializer
+_known_keys = frozenset()
+
+
+def _init_worker(known_keys):
+    global _known_keys
+    _known_keys = known_keys
+
+
+def _reanalyze_file(kind, path, version):
+    """Worker task: hash, skip if already stored for this version, else analyze"""
+    stat = os.stat(path)
+    sha256 = file_sha256(path)
+    key = result_key(sha256, kind, version)
+    record = {
+        "key": key,
+        "kind": kind,
+        "path": str(path),
+        "sha256": sha256,
+        "analyzer_version": version,
+        "size": stat.st_size,
+        "mtime": stat.st_mtime,
+    }
+    if key in _known_keys:
+        record["skipped"] = True
+        return record
+
+    start = time.perf_counter()
+    try:
+        record["result"] = ANALYZERS[kind](path)
+    except Exception as e:
+        record["error"] = f"{type(e).__name__}: {e}"
+    record["elapsed_s"] = round(time.perf_counter() - start, 6)
+    return record
+
+
+class ResultStore:
+    """Append-only JSONL store of per-file results, keyed by (content hash, kind, version)"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.records = {}
+        self.by_path = {}
+        if self.path.exists():
+            with open(self.path, "r") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # torn final line from an interrupted run
+                    self._index(record)
+
+    def _index(self, record):
+        self.records[record["key"]] = record
+        self.by_path[record["path"]] = record
+
+    def unchanged(self, path, kind, version):
+        """Stored record for path if size/mtime still match (avoids rehashing)"""
+        record = self.by_path.get(str(path))
+        if not record or record["kind"] != kind or record["analyzer_version"] != version:
+            return None
+        stat = path.stat()
+        if record["size"] == stat.st_size and record["mtime"] == stat.st_mtime:
+            return record
+        return None
+
+    def append(self, record):
+        with open(self.path, "a") as f:
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+        self._index(record)
+
+
+def aggregate(records):
+    """Roll per-file results up into a corpus-level report"""
+    report = {
+        "generated": datetime.now().isoformat(),
+        "files": len(records),
+        "kinds": {},
+        "failures": [],
+        "errors": [],
+    }
+    for record in records:
+        kind = report["kinds"].setdefault(record["kind"], {"files": 0, "passed": 0, "failed": 0})
+        kind["files"] += 1
+        if "error" in record:
+            report["errors"].append({"path": record["path"], "error": record["error"]})
+            kind["failed"] += 1
+        elif record["result"].get("passed"):
+            kind["passed"] += 1
+        else:
+            kind["failed"] += 1
+            report["failures"].append(record["path"])
+
+        result = record.get("result", {})
+        if record["kind"] == "capture":
+            kind["transactions"] = kind.get("transactions", 0) + result.get("transactions", 0)
+            kind["who_am_i_found"] = kind.get("who_am_i_found", 0) + int(result.get("who_am_i_found", False))
+        else:
+            kind["gpio_cycles"] = kind.get("gpio_cycles", 0) + result.get("gpio_cycles_detected", 0)
+            kind["timing_events"] = kind.get("timing_events", 0) + result.get("timing_events", 0)
+    return report
+
+
+def run_batch(project_dir, output_dir, workers=None, force=False):
+    """Reanalyze the whole corpus; returns the aggregate report"""
+    versions = analyzer_versions()
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    store = ResultStore(output_dir / "results.jsonl")
+
+    corpus = discover_corpus(project_dir)
+    current = {}
+    pending = []
+    for kind, path in corpus:
+        record = None if force else store.unchanged(path, kind, versions[kind])
+        if record:
+            current[str(path)] = record
+        else:
+            pending.append((kind, path))
+
+    print(f"📂 Corpus: {len(corpus)} files, {len(corpus) - len(pending)} unchanged, {len(pending)} to check")
+    known = frozenset() if force else frozenset(store.records)
+
+    start = time.perf_counter()
+    analyzed = skipped = 0
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                                initargs=(known,)) as pool:
+        futures = [pool.submit(_reanalyze_file, kind, path, versions[kind]) for kind, path in pending]
+        for future in concurrent.futures.as_completed(futures):
+            record = future.result()
+            if record.pop("skipped", False):
+                # Same content already analyzed under another name/mtime
+                stored = dict(store.records[record["key"]], **record)
+                store.append(stored)
+                current[record["path"]] = stored
+                skipped += 1
+                continue
+            store.append(record)
+            current[record["path"]] = record
+            analyzed += 1
+            status = "❌" if "error" in record or not record["result"].get("passed") else "✅"
+            print(f"  {status} {record['kind']:<8} {Path(record['path']).name} ({record['elapsed_s']:.3f}s)")
+
+    elapsed = time.perf_counter() - start
+    report = aggregate(list(current.values()))
+    report["analyzed"] = analyzed
+    report["reused"] = len(corpus) - analyzed
+    report["elapsed_s"] = round(elapsed, 3)
+    report["analyzer_versions"] = versions
+
+    report_file = output_dir / f"report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    with open(report_file, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"\n📊 Analyzed {analyzed}, reused {report['reused']} ({skipped} by content hash) in {elapsed:.1f}s")
+    for kind, stats in report["kinds"].items():
+        print(f"   {kind:<8} {stats['passed']}/{stats['files']} passed")
+    print(f"📄 Report saved to: {report_file}")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reanalyze all historical captures and RTT logs")
+    parser.add_argument("--project-dir", default=str(PROJECT_DIR), help="Project root containing the corpus")
+    parser.add_argument("--output-dir", help="Result store directory (default: <project>/reanalysis)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Worker processes")
+    parser.add_argument("--force", action="store_true", help="Ignore stored results and reanalyze everything")
+
+    args = parser.parse_args()
+    output_dir = args.output_dir or Path(args.project_dir) / "reanalysis"
+
+    report = run_batch(args.project_dir, output_dir, workers=args.workers, force=args.force)
+    return 1 if report["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
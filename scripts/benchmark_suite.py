@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+"""
+MIPE_EV1 Analysis Benchmark Suite
+Times the capture, decode and RTT analysis hot paths on generated workloads
+and compares throughput against a stored baseline
+"""
+
+import argparse
+import concurrent.futures
+import contextlib
+import io
+import json
+import multiprocessing
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+import logic_capture
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+RESULTS_DIR = PROJECT_DIR / "benchmark_results"
+BASELINE_FILE = RESULTS_DIR / "baseline.json"
+
+SAMPLE_RATE = 25_000_000
+DEFAULT_SIZES = ["1M", "10M"]
+DEFAULT_THRESHOLD = 0.10  # 10% throughput drop counts as a regression
+
+# Representative RTT traffic: mostly cycle lines with periodic validation lines
+RTT_TEMPLATE = [
+    "Cycle {n}: Toggling pins (23ms timing verified)",
+    "Cycle {n}: Toggling pins (23ms timing verified)",
+    "Cycle {n}: Toggling pins (23ms timing verified)",
+    "Cycle {n}: Toggling pins (23ms timing verified)",
+    "Timing validation: {n} cycles completed (approx {ms}ms total)",
+]
+
+_SIZE_UNITS = {"": 1, "K": 1_000, "M": 1_000_000, "G": 1_000_000_000}
+
+
+def parse_size(text):
+    """'1M' -> 1_000_000, '10G' -> 10_000_000_000 (samples or bytes)"""
+    text = text.strip().upper().rstrip("B")
+    unit = text[-1] if text and text[-1] in _SIZE_UNITS else ""
+    number = text[:-1] if unit else text
+    return int(float(number) * _SIZE_UNITS[unit])
+
+
+def _reset_peak_rss():
+    """
+    Restart the kernel's peak RSS counter (Linux) so setup allocations are not
+    counted; False where it cannot be reset and the peak covers the whole process
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss_bytes():
+    """Peak resident set size of this process (since the last reset on Linux)"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:
+        import psutil
+        return psutil.Process().memory_info().peak_wset
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _rtt_log_lines(total_bytes):
+    """Yield synthetic RTT log lines until total_bytes have been produced"""
+    produced = 0
+    cycle = 0
+    while produced < total_bytes:
+        for template in RTT_TEMPLATE:
+            cycle += 10
+            ms = cycle * 23
+            stamp = f"[{ms // 3_600_000:02d}:{ms // 60_000 % 60:02d}:{ms // 1000 % 60:02d}.{ms % 1000:03d}]"
+            line = f"{stamp} {template.format(n=cycle, ms=ms)}\n"
+            produced += len(line)
+            yield line
+
+
+def _write_rtt_log(path, total_bytes):
+    with open(path, "w", encoding="utf-8") as f:
+        for line in _rtt_log_lines(total_bytes):
+            f.write(line)
+    return path
+
+
+class _SpiRows:
+    """
+    Decoded rows equivalent to a capture of the given number of samples, as a
+    sized iterable: rows are produced while iterating, never stored
+    """
+
+    def __init__(self, samples):
+        frame = logic_capture.spi_frame_samples(b"\x8f\x00", b"\x00\x6c")
+        transactions = [logic_capture.SpiTransaction(0, len(frame), b"\x8f\x00", b"\x00\x6c")]
+        self.rows = logic_capture.spi_annotations(transactions, SAMPLE_RATE)
+        self.repeats = max(1, samples // len(frame))
+
+    def __len__(self):
+        return len(self.rows) * self.repeats
+
+    def __iter__(self):
+        rows = self.rows
+        for _ in range(self.repeats):
+            yield from rows
+
+
+# Each case: setup(size, workdir) -> state, run(state) -> units processed
+# Setup is excluded from timing and allocation measurement.
+
+def _setup_sr_load(size, workdir):
+    path = workdir / "bench.sr"
+    logic_capture.write_sr(path, logic_capture.generate_spi_workload(size), SAMPLE_RATE)
+    return path
+
+
+def _run_sr_load(path):
+    capture = logic_capture.open_sr(path)
+    return sum(len(chunk) for chunk in capture.iter_chunks()) // capture.unitsize
+
+
+def _setup_spi_decode(size, workdir):
+    return size
+
+
+def _run_spi_decode(size):
+    logic_capture.decode_spi_chunks(logic_capture.generate_spi_workload(size))
+    return size
+
+
+def _run_spi_timing(path):
+    from spi_timing import analyze_spi_timing
+    capture, _ = analyze_spi_timing(path)
+    return capture.total_samples
+
+
+def _setup_validate_lsm6(size, workdir):
+    from analyzer_automation import AnalyzerAutomation
+    automation = AnalyzerAutomation(project_dir=workdir)
+    return automation, _SpiRows(size)
+
+
+def _run_validate_lsm6(state):
+    automation, rows = state
+    with contextlib.redirect_stdout(io.StringIO()):
+        automation.validate_lsm6_communication(rows)
+    return len(rows)
+
+
+def _lsm6_transactions(count):
+    """
+    Yield polling firmware traffic: configuration writes, then STATUS_REG reads
+    each followed by a 12-byte output burst, `count` transactions in total
+    """
+    SpiTransaction = logic_capture.SpiTransaction
+    setup = [SpiTransaction(0, 400, b"\x12\x44", b"\x00\x00"),
+             SpiTransaction(500, 900, b"\x10\x40", b"\x00\x00"),
+             SpiTransaction(1000, 1400, b"\x11\x4c", b"\x00\x00")]
+    yield from setup[:count]
+    burst = b"\xa2" + bytes(12)
+    t = 1500
+    for produced in range(len(setup), count, 2):
+        yield SpiTransaction(t, t + 400, b"\x9e\x00", b"\x00\x03")
+        if produced + 1 < count:
+            data = (t & 0xFFFFFF).to_bytes(3, "little") * 4
+            yield SpiTransaction(t + 500, t + 1200, burst, b"\x00" + data)
+        t += SAMPLE_RATE // 104
+
+
+def _setup_lsm6_semantic(size, workdir):
+    return size
+
+
+def _run_lsm6_semantic(size):
+    from lsm6_decoder import Lsm6Decoder
+    decoder = Lsm6Decoder(SAMPLE_RATE)
+    decoder.feed(_lsm6_transactions(size))
+    decoder.summary()
+    return decoder.transactions
+
+
+def _setup_rtt_parse(size, workdir):
+    return _write_rtt_log(workdir / "bench_rtt.txt", size)
+
+
+def _run_rtt_parse(path):
+    from rtt_monitor import iter_rtt_events
+    lines = 0
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        for _ in iter_rtt_events(f):
+            lines += 1
+    return lines
+
+
+def _setup_rtt_analyze(size, workdir):
+    from rtt_monitor import RTTMonitor
+    monitor = RTTMonitor(duration=0, project_dir=workdir)
+    return monitor, _write_rtt_log(workdir / "bench_rtt.txt", size)
+
+
+def _run_rtt_analyze(state):
+    monitor, path = state
+    with contextlib.redirect_stdout(io.StringIO()):
+        monitor.analyze_rtt_logs(path)
+    with open(path, "rb") as f:
+        return sum(1 for _ in f)
+
+
+CASES = {
+    "sr_load": (_setup_sr_load, _run_sr_load, "samples/s"),
+    "spi_decode": (_setup_spi_decode, _run_spi_decode, "samples/s"),
+    "spi_timing": (_setup_sr_load, _run_spi_timing, "samples/s"),
+    "validate_lsm6": (_setup_validate_lsm6, _run_validate_lsm6, "rows/s"),
+    "lsm6_semantic": (_setup_lsm6_semantic, _run_lsm6_semantic, "transactions/s"),
+    "rtt_parse": (_setup_rtt_parse, _run_rtt_parse, "lines/s"),
+    "rtt_analyze": (_setup_rtt_analyze, _run_rtt_analyze, "lines/s"),
+}
+
+
+def _run_case(case, size, trace_allocations):
+    """Run one case in the current (fresh worker) process and measure it"""
+    setup, run, unit = CASES[case]
+    with tempfile.TemporaryDirectory(prefix="mipe_bench_") as tmp:
+        workdir = Path(tmp)
+        state = setup(size, workdir)
+
+        # Peak RSS covers the measured run only where the counter can be reset
+        rss_scope = "run" if _reset_peak_rss() else "process"
+        start = time.perf_counter()
+        units = run(state)
+        seconds = time.perf_counter() - start
+        peak_rss = _peak_rss_bytes()
+
+        traced_peak = None
+        if trace_allocations:
+            # Second pass under tracemalloc so tracing overhead never skews timing
+            tracemalloc.start()
+            run(state)
+            traced_peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+    return {
+        "case": case,
+        "size": size,
+        "units": units,
+        "seconds": round(seconds, 6),
+        "throughput": units / seconds if seconds > 0 else 0.0,
+        "unit": unit,
+        "peak_rss_bytes": peak_rss,
+        "peak_rss_scope": rss_scope,
+        "traced_peak_bytes": traced_peak,
+    }
+
+
+def run_benchmarks(cases, sizes, trace_allocations=True):
+    """Run every (case, size) pair in its own process so peak RSS is per-case"""
+    context = multiprocessing.get_context("spawn")
+    results = []
+    for case in cases:
+        for size in sizes:
+            with concurrent.futures.ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                result = pool.submit(_run_case, case, size, trace_allocations).result()
+            results.append(result)
+            print(f"  {case:<14} {size:>14,} {result['seconds']:>10.3f}s "
+                  f"{result['throughput']:>16,.0f} {result['unit']}")
+    return {
+        "created": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+
+
+def compare_to_baseline(report, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Compare throughput per (case, size) with a baseline report.
+    Returns a list of comparison rows; rows with 'regression' True exceeded the threshold.
+    """
+    reference = {(r["case"], r["size"]): r for r in baseline.get("results", [])}
+    comparisons = []
+    for result in report["results"]:
+        base = reference.get((result["case"], result["size"]))
+        if not base or not base["throughput"]:
+            continue
+        ratio = result["throughput"] / base["throughput"]
+        comparisons.append({
+            "case": result["case"],
+            "size": result["size"],
+            "baseline": base["throughput"],
+            "current": result["throughput"],
+            "ratio": ratio,
+            "regression": ratio < 1.0 - threshold,
+        })
+    return comparisons
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark MIPE_EV1 capture, decode and RTT analysis")
+    parser.add_argument("--cases", default="all",
+                        help=f"Comma-separated cases ({', '.join(CASES)}) or 'all'")
+    parser.add_argument("--sizes", default=",".join(DEFAULT_SIZES),
+                        help="Comma-separated workload sizes in samples/bytes, e.g. 1M,100M,10G")
+    parser.add_argument("--output", help="Results JSON path (default: benchmark_results/results_<timestamp>.json)")
+    parser.add_argument("--baseline", default=str(BASELINE_FILE), help="Baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Allowed fractional throughput drop before failing")
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the new baseline")
+    parser.add_argument("--no-alloc", action="store_true", help="Skip the tracemalloc allocation pass")
+
+    args = parser.parse_args()
+
+    cases = list(CASES) if args.cases == "all" else [c.strip() for c in args.cases.split(",")]
+    unknown = [c for c in cases if c not in CASES]
+    if unknown:
+        parser.error(f"Unknown case(s): {', '.join(unknown)}")
+    sizes = [parse_size(s) for s in args.sizes.split(",")]
+
+    print("MIPE_EV1 Analysis Benchmarks")
+    print("=" * 70)
+    print(f"  {'Case':<14} {'Size':>14} {'Time':>11} {'Throughput':>16}")
+    print("-" * 70)
+
+    report = run_benchmarks(cases, sizes, trace_allocations=not args.no_alloc)
+
+    RESULTS_DIR.mkdir(exist_ok=True)
+    output = Path(args.output) if args.output else RESULTS_DIR / f"results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n📄 Results saved to: {output}")
+
+    exit_code = 0
+    baseline_path = Path(args.baseline)
+    if baseline_path.exists() and not args.save_baseline:
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+        print(f"\nComparison with baseline ({baseline_path}, threshold {args.threshold:.0%}):")
+        for row in compare_to_baseline(report, baseline, args.threshold):
+            status = "❌ REGRESSION" if row["regression"] else "✅"
+            print(f"  {row['case']:<14} {row['size']:>14,} {row['ratio']:>8.2f}x {status}")
+            if row["regression"]:
+                exit_code = 1
+
+    if args.save_baseline:
+        with open(baseline_path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"📌 Baseline updated: {baseline_path}")
+
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
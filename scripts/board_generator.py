@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+"""
+MIPE Board Project Generator
+Renders a Zephyr application + custom board (main.c, prj.conf, DTS, Kconfig,
+board.cmake, board.yml) from a board spec and the templates in board_templates/.
+Only files whose content changed are written, so unchanged files keep their
+mtimes and incremental builds stay incremental.
+"""
+
+import argparse
+import copy
+import json
+import os
+import re
+import shutil
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+from string import Template
+
+TEMPLATE_DIR = Path(__file__).resolve().parent / "board_templates"
+MANIFEST = ".generated.json"
+BOARD_VENDOR_DIR = "nordic"
+
+# Proven MIPE_EV1 application configuration (prj.conf), in file order
+BASE_CONFIG = {
+    "CONFIG_BUILD_WITH_TFM": "n",
+    "CONFIG_NRF_SECURITY": "n",
+    "CONFIG_GPIO": "y",
+    "CONFIG_SYS_CLOCK_EXISTS": "y",
+    "CONFIG_TICKLESS_KERNEL": "y",
+    "CONFIG_NRF_GRTC_TIMER": "y",
+    "CONFIG_WATCHDOG": "n",
+    "CONFIG_WDT_DISABLE_AT_BOOT": "y",
+    "CONFIG_WDT_NRFX": "n",
+    "CONFIG_PM": "n",
+    "CONFIG_PM_DEVICE": "n",
+    "CONFIG_KERNEL_INIT_PRIORITY_DEFAULT": "50",
+}
+
+MIPE_EV1_SPEC = {
+    "name": "mipe_ev1",
+    "full_name": "MIPE EV1 Board",
+    "title": "MIPE_EV1",
+    "vendor": "custom",
+    "soc": "nrf54l15",
+    "cpu": "cpuapp",
+    "board_prompt": "MIPE EV1 nRF54L15 CPU APP",
+    "jlink_device": "nRF54L15_M33",
+    "sys_clock_hz": 32000000,
+    "toggle_threshold": 1000000,  # ~23 ms busy-wait toggle
+    "leds": [
+        {"name": "led0", "node": "led_0", "port": 0, "pin": 0, "label": "LED 0"},
+        {"name": "led1", "node": "led_1", "port": 0, "pin": 1, "label": "LED 1"},
+    ],
+    "test_pins": [
+        {"name": "testpin05", "node": "test_pin_05", "var": "test_pin05", "port": 1, "pin": 5,
+         "label": "Test Pin 05"},
+        {"name": "testpin06", "node": "test_pin_06", "var": "test_pin06", "port": 1, "pin": 6},
+    ],
+    "spi": [],
+    "config": {},
+}
+
+MIPE_EV2_SPEC = dict(copy.deepcopy(MIPE_EV1_SPEC), name="mipe_ev2", full_name="MIPE EV2 Board",
+                     title="MIPE_EV2", board_prompt="MIPE EV2 nRF54L15 CPU APP")
+
+# LSM6DSO32 on a SPIM instance; merged into a spec as {"spi": [LSM6_SPI_BUS]}
+LSM6_SPI_BUS = {
+    "instance": "spi22",
+    "pins": {"sck": [1, 4], "mosi": [1, 7], "miso": [1, 8]},
+    "cs": [1, 9],
+    "devices": [
+        {"name": "lsm6dso32", "compatible": "st,lsm6dso32", "reg": 0,
+         "frequency": 1000000, "probe_reg": "0x0F"},
+    ],
+}
+
+
+class BoardSpecError(ValueError):
+    """Spec is incomplete or describes an impossible board"""
+
+
+def deep_merge(base, overrides):
+    """Dicts merge recursively; anything else (lists included) is replaced"""
+    merged = copy.deepcopy(base)
+    for key, value in overrides.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = deep_merge(merged[key], value)
+        else:
+            merged[key] = copy.deepcopy(value)
+    return merged
+
+
+def expand_variants(spec):
+    """
+    A spec may carry "variants": {"<name>": {<overrides>}}; each variant is the
+    base spec with its overrides merged in. Without variants the spec stands alone.
+    """
+    variants = spec.get("variants")
+    base = {k: v for k, v in spec.items() if k != "variants"}
+    if not variants:
+        return [(base["name"], base)]
+    return [(name, deep_merge(base, dict({"name": name}, **overrides)))
+            for name, overrides in variants.items()]
+
+
+def _validate(spec):
+    for key in ("name", "soc", "cpu"):
+        if not spec.get(key):
+            raise BoardSpecError(f"Board spec is missing '{key}'")
+    if not re.fullmatch(r"[a-z][a-z0-9_]*", spec["name"]):
+        raise BoardSpecError(f"Board name {spec['name']!r} must be lower-case snake_case")
+    used = {}
+    pins = [(p["name"], p["port"], p["pin"]) for p in spec.get("leds", []) + spec.get("test_pins", [])]
+    for bus in spec.get("spi", []):
+        pins += [(f"{bus['instance']}.{signal}", port, pin) for signal, (port, pin) in bus["pins"].items()]
+        pins.append((f"{bus['instance']}.cs", *bus["cs"]))
+    for owner, port, pin in pins:
+        if (port, pin) in used:
+            raise BoardSpecError(f"P{port}.{pin:02d} assigned to both {used[(port, pin)]} and {owner}")
+        used[(port, pin)] = owner
+
+
+@lru_cache(maxsize=None)
+def _template(name):
+    """Templates are read and compiled once per process"""
+    return Template((TEMPLATE_DIR / name).read_text(encoding="utf-8"))
+
+
+def _var(pin):
+    return pin.get("var", pin["name"])
+
+
+def _render_gpio_group(group, pins):
+    lines = [f"\t{group} {{", '\t\tcompatible = "gpio-leds";']
+    for pin in pins:
+        lines.append(f"\t\t{pin['name']}: {pin.get('node', pin['name'])} {{")
+        lines.append(f"\t\t\tgpios = <&gpio{pin['port']} {pin['pin']} GPIO_ACTIVE_HIGH>;")
+        if pin.get("label"):
+            lines.append(f"\t\t\tlabel = \"{pin['label']}\";")
+        lines.append("\t\t};")
+    lines.append("\t};")
+    return "\n".join(lines)
+
+
+def _render_spi_bus(bus):
+    instance = bus["instance"]
+    psels = [f"<NRF_PSEL(SPIM_{signal.upper()}, {port}, {pin})>"
+             for signal, (port, pin) in bus["pins"].items()]
+    psel_text = ",\n\t\t\t\t".join(psels)
+    cs_port, cs_pin = bus["cs"]
+    lines = [
+        "",
+        f"/* {instance}: {', '.join(d['name'] for d in bus['devices'])} */",
+        "&pinctrl {",
+        f"\t{instance}_default: {instance}_default {{",
+        "\t\tgroup1 {",
+        f"\t\t\tpsels = {psel_text};",
+        "\t\t};",
+        "\t};",
+        "",
+        f"\t{instance}_sleep: {instance}_sleep {{",
+        "\t\tgroup1 {",
+        f"\t\t\tpsels = {psel_text};",
+        "\t\t\tlow-power-enable;",
+        "\t\t};",
+        "\t};",
+        "};",
+        "",
+        f"&{instance} {{",
+        '\tstatus = "okay";',
+        f"\tcs-gpios = <&gpio{cs_port} {cs_pin} GPIO_ACTIVE_LOW>;",
+        f"\tpinctrl-0 = <&{instance}_default>;",
+        f"\tpinctrl-1 = <&{instance}_sleep>;",
+        '\tpinctrl-names = "default", "sleep";',
+    ]
+    for device in bus["devices"]:
+        lines += [
+            "",
+            f"\t{device['name']}: {device['name']}@{device['reg']} {{",
+            f"\t\tcompatible = \"{device['compatible']}\";",
+            f"\t\treg = <{device['reg']}>;",
+            f"\t\tspi-max-frequency = <{device['frequency']}>;",
+            "\t};",
+        ]
+    lines.append("};")
+    return "\n".join(lines)
+
+
+def _render_main_c_spi(spec):
+    devices = [d for bus in spec.get("spi", []) for d in bus["devices"]]
+    if not devices:
+        return {"spi_includes": "", "spi_specs": "", "spi_init": "", "spi_poll": ""}
+    specs = [""] + [f"static const struct spi_dt_spec {d['name']} = SPI_DT_SPEC_GET(DT_NODELABEL({d['name']}),\n"
+             f"\tSPI_WORD_SET(8) | SPI_TRANSFER_MSB, 0);" for d in devices]
+    specs.append("""
+/* Single-register read: address with the read bit set, then one dummy byte */
+static int spi_read_reg(const struct spi_dt_spec *spec, uint8_t reg)
+{
+	uint8_t tx_buf[2] = {reg | 0x80, 0x00};
+	uint8_t rx_buf[2] = {0};
+	const struct spi_buf tx = {.buf = tx_buf, .len = sizeof(tx_buf)};
+	const struct spi_buf rx = {.buf = rx_buf, .len = sizeof(rx_buf)};
+	const struct spi_buf_set tx_set = {.buffers = &tx, .count = 1};
+	const struct spi_buf_set rx_set = {.buffers = &rx, .count = 1};
+
+	int ret = spi_transceive_dt(spec, &tx_set, &rx_set);
+
+	return ret == 0 ? rx_buf[1] : ret;
+}
+""")
+    ready = "\n".join(f"\tconst bool {d['name']}_ready = spi_is_ready_dt(&{d['name']});" for d in devices)
+    poll = "\n".join(f"\t\t\tif ({d['name']}_ready) {{\n"
+                     f"\t\t\t\t(void)spi_read_reg(&{d['name']}, {d.get('probe_reg', '0x0F')});\n"
+                     f"\t\t\t}}" for d in devices)
+    return {
+        "spi_includes": "#include <zephyr/drivers/spi.h>\n",
+        "spi_specs": "\n".join(specs),
+        "spi_init": f"\n\t/* SPI devices: probe register read on every toggle */\n{ready}\n",
+        "spi_poll": poll,
+    }
+
+
+def render_project(spec):
+    """{relative path: content} for every generated file"""
+    _validate(spec)
+    name, soc, cpu = spec["name"], spec["soc"], spec["cpu"]
+    board_id = f"{name}_{soc}_{cpu}"
+    pins = spec.get("leds", []) + spec.get("test_pins", [])
+    buses = spec.get("spi", [])
+    title = spec.get("title", name.upper())
+
+    values = {
+        "name": name,
+        "soc": soc,
+        "cpu": cpu,
+        "title": title,
+        "full_name": spec.get("full_name", title),
+        "vendor": spec.get("vendor", "custom"),
+        "compatible": name.replace("_", "-"),
+        "project_name": spec.get("project_name", f"{name}_gpio_test"),
+        "board_prompt": spec.get("board_prompt", f"{spec.get('full_name', title)} {soc} {cpu}"),
+        "name_symbol": f"BOARD_{name.upper()}",
+        "board_symbol": f"BOARD_{board_id.upper()}",
+        "soc_upper": soc.upper(),
+        "cpu_upper": cpu.upper(),
+        "jlink_device": spec.get("jlink_device", f"{soc}_xxaa"),
+        "sys_clock_hz": spec.get("sys_clock_hz", 32000000),
+        "toggle_threshold": spec.get("toggle_threshold", 1000000),
+    }
+
+    config = dict(BASE_CONFIG)
+    if buses:
+        config["CONFIG_SPI"] = "y"
+    config.update(spec.get("config", {}))
+    values["config_lines"] = "\n".join(f"{key}={value}" for key, value in config.items())
+
+    # Pins alternate phase within each group (led0 follows led_state, led1 opposite, ...)
+    toggles = []
+    for group in ("leds", "test_pins"):
+        for index, pin in enumerate(spec.get(group, [])):
+            inverted = pin.get("inverted", index % 2 == 1)
+            toggles.append(f"\t\t\tgpio_pin_set_dt(&{_var(pin)}, led_state ? {'0 : 1' if inverted else '1 : 0'});")
+    values.update(
+        gpio_specs="\n".join(f"static const struct gpio_dt_spec {_var(p)} = "
+                             f"GPIO_DT_SPEC_GET(DT_ALIAS({p['name']}), gpios);  /* P{p['port']}.{p['pin']:02d} */"
+                             for p in pins),
+        gpio_configure="\n".join(f"\tgpio_pin_configure_dt(&{_var(p)}, GPIO_OUTPUT);" for p in pins),
+        gpio_initial="\n".join(f"\tgpio_pin_set_dt(&{_var(p)}, 0);" for p in pins),
+        gpio_toggle="\n".join(toggles),
+    )
+    values.update(_render_main_c_spi(spec))
+
+    ports = sorted({p["port"] for p in pins} | {bus["cs"][0] for bus in buses})
+    values.update(
+        dts_includes="#include <dt-bindings/pinctrl/nrf-pinctrl.h>\n" if buses else "",
+        gpio_groups="".join("\n" + _render_gpio_group(group, spec[group]) + "\n"
+                            for group in ("leds", "test_pins") if spec.get(group)),
+        aliases="\n".join(f"\t\t{p['name']} = &{p['name']};" for p in pins),
+        gpio_ports="\n".join(f"&gpio{port} {{\n\tstatus = \"okay\";\n}};\n" for port in ports),
+        spi_nodes="".join(_render_spi_bus(bus) + "\n" for bus in buses),
+    )
+
+    board_dir = f"boards/{BOARD_VENDOR_DIR}/{name}"
+    layout = {
+        "CMakeLists.txt": "CMakeLists.txt.tmpl",
+        "prj.conf": "prj.conf.tmpl",
+        "src/main.c": "main.c.tmpl",
+        f"{board_dir}/{board_id}.dts": "board.dts.tmpl",
+        f"{board_dir}/{board_id}_defconfig": "defconfig.tmpl",
+        f"{board_dir}/Kconfig.board": "Kconfig.board.tmpl",
+        f"{board_dir}/Kconfig.defconfig": "Kconfig.defconfig.tmpl",
+        f"{board_dir}/Kconfig.{name}": "Kconfig.name.tmpl",
+        f"{board_dir}/board.cmake": "board.cmake.tmpl",
+        f"{board_dir}/board.yml": "board.yml.tmpl",
+    }
+    return {path: _template(template).substitute(values) for path, template in layout.items()}
+
+
+def write_if_changed(path, content):
+    """Write only when the bytes differ; returns 'created', 'updated' or 'unchanged'"""
+    path = Path(path)
+    data = content.encode("utf-8")
+    try:
+        if path.read_bytes() == data:
+            return "unchanged"
+        status = "updated"
+    except FileNotFoundError:
+        status = "created"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Opened normally so the file gets the umask mode; an update keeps the old mode
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_bytes(data)
+    if status == "updated":
+        shutil.copymode(path, tmp)
+    os.replace(tmp, path)
+    return status
+
+
+def generate_project(spec, output_dir):
+    """
+    Render spec into output_dir. Files generated last time but no longer part
+    of the project (e.g. after a rename) are removed. Returns {path: status}.
+    """
+    output_dir = Path(output_dir)
+    files = render_project(spec)
+    results = {path: write_if_changed(output_dir / path, content) for path, content in files.items()}
+
+    manifest_file = output_dir / MANIFEST
+    previous = []
+    if manifest_file.exists():
+        with open(manifest_file) as f:
+            previous = json.load(f).get("files", [])
+    for stale in set(previous) - set(files):
+        try:
+            (output_dir / stale).unlink()
+            results[stale] = "removed"
+        except FileNotFoundError:
+            pass
+    write_if_changed(manifest_file, json.dumps({"board": spec["name"], "files": sorted(files)}, indent=2) + "\n")
+    return results
+
+
+def generate_variants(spec, output_root, workers=None):
+    """Generate every variant of spec into output_root/<variant> concurrently"""
+    output_root = Path(output_root)
+    variants = expand_variants(spec)
+    with ThreadPoolExecutor(max_workers=workers or min(8, len(variants))) as pool:
+        futures = {name: pool.submit(generate_project, variant, output_root / name)
+                   for name, variant in variants}
+    return {name: future.result() for name, future in futures.items()}
+
+
+def load_spec(path):
+    with open(path, encoding="utf-8") as f:
+        return deep_merge(MIPE_EV1_SPEC, json.load(f))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate Zephyr board projects from a board spec")
+    parser.add_argument("output", help="Project directory (or root directory when the spec has variants)")
+    parser.add_argument("--spec", help="JSON board spec, merged over the MIPE_EV1 defaults")
+    parser.add_argument("--board", choices=["mipe_ev1", "mipe_ev2"], default="mipe_ev2",
+                        help="Built-in spec when --spec is not given")
+    parser.add_argument("--with-lsm6", action="store_true", help="Add the LSM6DSO32 SPI bus")
+    parser.add_argument("--workers", type=int, help="Concurrent variant generators")
+    args = parser.parse_args()
+
+    if args.spec:
+        spec = load_spec(args.spec)
+    else:
+        spec = copy.deepcopy(MIPE_EV1_SPEC if args.board == "mipe_ev1" else MIPE_EV2_SPEC)
+    if args.with_lsm6:
+        spec["spi"] = [LSM6_SPI_BUS]
+
+    try:
+        if spec.get("variants"):
+            results = generate_variants(spec, args.output, args.workers)
+        else:
+            results = {spec["name"]: generate_project(spec, args.output)}
+    except BoardSpecError as e:
+        print(f"❌ {e}")
+        return 1
+
+    for name, files in results.items():
+        changed = {path: status for path, status in files.items() if status != "unchanged"}
+        print(f"🧩 {name}: {len(changed)} of {len(files)} file(s) changed")
+        for path, status in sorted(changed.items()):
+            print(f"   {status:<8} {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+MIPE_EV1 Build Artifact Cache
+Stores zephyr.hex/.elf/.config keyed by a hash of the build inputs
+(sources, board files, Kconfig fragments) so an identical tree is never rebuilt
+"""
+
+import fnmatch
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import time
+from pathlib import Path
+
+# Files that influence the firmware image, relative to the application root.
+# Patterns match per path segment ("*.conf" is top level only); a trailing
+# "**" matches everything below that directory.
+BUILD_INPUTS = (
+    "CMakeLists.txt",
+    "prj.conf",
+    "*.conf",
+    "*.overlay",
+    "Kconfig*",
+    "src/**",
+    "boards/**",
+)
+ARTIFACTS = (
+    "zephyr/zephyr.hex",
+    "zephyr/zephyr.elf",
+    "zephyr/zephyr.bin",
+    "zephyr/.config",
+)
+MANIFEST = "manifest.json"
+
+
+def _match_segments(parts, pattern):
+    segments = pattern.split("/")
+    if segments[-1] == "**":
+        segments = segments[:-1]
+        if len(parts) <= len(segments):
+            return False
+        parts = parts[:len(segments)]
+    elif len(parts) != len(segments):
+        return False
+    return all(fnmatch.fnmatchcase(part, segment) for part, segment in zip(parts, segments))
+
+
+def is_build_input(relative_path, patterns=BUILD_INPUTS):
+    parts = relative_path.replace("\\", "/").split("/")
+    return any(_match_segments(parts, pattern) for pattern in patterns)
+
+
+def git_input_hash(repo, rev):
+    """Hash of the build inputs in a commit, straight from git's object ids"""
+    listing = subprocess.run(["git", "ls-tree", "-r", rev], cwd=repo,
+                             capture_output=True, text=True, check=True).stdout
+    digest = hashlib.sha256()
+    for line in listing.splitlines():
+        meta, path = line.split("\t", 1)
+        if is_build_input(path):
+            digest.update(f"{path}\0{meta.split()[2]}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def directory_input_hash(project_dir, patterns=BUILD_INPUTS):
+    """Hash of the build inputs on disk (uncommitted trees, generated projects)"""
+    project_dir = Path(project_dir)
+    digest = hashlib.sha256()
+    for path in sorted(p for p in project_dir.rglob("*") if p.is_file()):
+        relative = path.relative_to(project_dir).as_posix()
+        # build/, build_pool/, build_matrix/, build_cache/ hold outputs, not inputs; stored
+        # fix overlays only count when a build passes them (see cache_key extra_args)
+        top = relative.split("/")[0]
+        if top.startswith(("build", ".git")) or top == "fix_overlays" or not is_build_input(relative, patterns):
+            continue
+        digest.update(f"{relative}\0".encode("utf-8"))
+        digest.update(hashlib.sha256(path.read_bytes()).digest())
+    return digest.hexdigest()
+
+
+def cache_key(input_hash, board, extra_args=()):
+    text = "\0".join([input_hash, board, *extra_args])
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:24]
+
+
+class BuildCache:
+    """Directory of <key>/{zephyr.hex, zephyr.elf, ..., manifest.json} entries"""
+
+    def __init__(self, cache_dir, max_entries=64):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self.stats = {"hits": 0, "misses": 0, "stores": 0}
+
+    def lookup(self, key):
+        """Entry directory for key, or None; touching it keeps it from being pruned"""
+        entry = self.cache_dir / key
+        if (entry / MANIFEST).exists():
+            self.stats["hits"] += 1
+            os.utime(entry / MANIFEST)
+            return entry
+        self.stats["misses"] += 1
+        return None
+
+    def store(self, key, build_dir, **metadata):
+        """Copy a finished build's artifacts in; the manifest is written last so partial entries never hit"""
+        build_dir = Path(build_dir)
+        entry = self.cache_dir / key
+        staging = self.cache_dir / f".{key}.{os.getpid()}.tmp"
+        shutil.rmtree(staging, ignore_errors=True)
+        staging.mkdir()
+        stored = []
+        for artifact in ARTIFACTS:
+            source = build_dir / artifact
+            if source.exists():
+                shutil.copy2(source, staging / source.name)
+                stored.append(source.name)
+        with open(staging / MANIFEST, "w") as f:
+            json.dump(dict(metadata, key=key, artifacts=stored, stored_at=time.time()), f, indent=2)
+        shutil.rmtree(entry, ignore_errors=True)
+        staging.rename(entry)
+        self.stats["stores"] += 1
+        self.prune()
+        return entry
+
+    def manifest(self, key):
+        with open(self.cache_dir / key / MANIFEST) as f:
+            return json.load(f)
+
+    def prune(self):
+        """Drop least recently used entries beyond max_entries"""
+        entries = [p for p in self.cache_dir.iterdir() if (p / MANIFEST).exists()]
+        entries.sort(key=lambda p: (p / MANIFEST).stat().st_mtime, reverse=True)
+        for stale in entries[self.max_entries:]:
+            shutil.rmtree(stale, ignore_errors=True)
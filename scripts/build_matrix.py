@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+MIPE Board Build Matrix
+Builds (board, app, overlay) combinations concurrently on a bounded process
+pool in warm pooled build directories, reusing the build cache, and reports
+timing and memory usage for the whole matrix
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from build_cache import BuildCache, cache_key, directory_input_hash
+from build_pool import BuildDirPool
+from fix_overlays import overlay_cmake_args
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_MATRIX = [
+    {"name": "mipe_ev1", "board": "mipe_ev1/nrf54l15/cpuapp", "app": "."},
+    {"name": "mipe_ev2", "board": "mipe_ev2/nrf54l15/cpuapp", "app": "MIPE_EV2_Project"},
+]
+
+# "            FLASH:       41832 B      1428 KB      2.86%" from --print-memory-usage
+_MEMORY_LINE = re.compile(r"^\s*(\w+):\s+(\d+(?:\.\d+)?)\s*(B|KB|MB)\s+(\d+(?:\.\d+)?)\s*(B|KB|MB)", re.M)
+_UNITS = {"B": 1, "KB": 1024, "MB": 1024 * 1024}
+
+
+def parse_memory_usage(output):
+    """{region: {'used': bytes, 'size': bytes}} from the linker memory report"""
+    regions = {}
+    for region, used, used_unit, size, size_unit in _MEMORY_LINE.findall(output):
+        regions[region] = {
+            "used": int(float(used) * _UNITS[used_unit]),
+            "size": int(float(size) * _UNITS[size_unit]),
+        }
+    return regions
+
+
+def job_name(job):
+    if job.get("name"):
+        return job["name"]
+    overlays = "+".join(Path(o).stem for o in job.get("overlays", []))
+    return re.sub(r"[^\w.+-]", "_", job["board"]) + (f"+{overlays}" if overlays else "")
+
+
+def build_args(job, project_dir=PROJECT_DIR):
+    """CMake arguments for the job's overlays: .conf -> EXTRA_CONF_FILE, .overlay -> DTC_OVERLAY_FILE"""
+    return overlay_cmake_args(Path(project_dir, o) for o in job.get("overlays", []))
+
+
+def job_key(job, project_dir=PROJECT_DIR):
+    """Cache key: app inputs + board + the contents of every overlay"""
+    overlay_hashes = [hashlib.sha256(Path(project_dir, o).read_bytes()).hexdigest()
+                      for o in job.get("overlays", [])]
+    return cache_key(directory_input_hash(Path(project_dir, job["app"])), job["board"], overlay_hashes)
+
+
+def run_build_job(job, pool_dir, cache_dir, key, project_dir=PROJECT_DIR, max_slots=2):
+    """Pool worker: west build in a warm pooled directory, then publish to the cache"""
+    app = Path(project_dir, job["app"]).resolve()
+    result, build_dir = BuildDirPool(pool_dir, max_slots).build(app, job["board"], build_args(job, project_dir))
+    record = {"status": "built" if result.success else "failed", "seconds": result.seconds,
+              "build_dir": str(build_dir)}
+    if not result.success:
+        errors = result.errors()
+        record["error"] = "\n".join(d.text for d in errors) if errors else result.output.strip()[-2000:]
+        return record
+    record["memory"] = parse_memory_usage(result.output)
+    BuildCache(cache_dir).store(key, build_dir, board=job["board"], app=job["app"],
+                                overlays=job.get("overlays", []), memory=record["memory"],
+                                build_seconds=result.seconds)
+    return record
+
+
+def run_matrix(jobs, project_dir=PROJECT_DIR, pool_dir=None, cache_dir=None, workers=None):
+    """
+    Build every job; cache hits are answered without touching the pool.
+    Returns (records, wall_seconds) with one record per job in input order.
+    """
+    project_dir = Path(project_dir)
+    pool_dir = Path(pool_dir or project_dir / "build_pool")
+    cache = BuildCache(cache_dir or project_dir / "build_cache")
+    workers = workers or max(1, min(len(jobs), (os.cpu_count() or 2) // 2))
+
+    records = {}
+    pending = []
+    start = time.perf_counter()
+    for job in jobs:
+        name = job_name(job)
+        key = job_key(job, project_dir)
+        entry = cache.lookup(key)
+        if entry is not None:
+            manifest = cache.manifest(key)
+            records[name] = {"status": "cached", "seconds": 0.0, "memory": manifest.get("memory", {}),
+                             "artifacts": str(entry)}
+            print(f"♻️  {name}: cached")
+        else:
+            pending.append((name, job, key))
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(run_build_job, job, pool_dir, cache.cache_dir, key, project_dir,
+                               max(2, workers)): name
+                   for name, job, key in pending}
+        for future in as_completed(futures):
+            name = futures[future]
+            records[name] = future.result()
+            icon = "✅" if records[name]["status"] == "built" else "❌"
+            print(f"{icon} {name}: {records[name]['status']} in {records[name]['seconds']:.1f}s")
+
+    wall = round(time.perf_counter() - start, 2)
+    ordered = []
+    for job in jobs:
+        name = job_name(job)
+        ordered.append(dict(records[name], name=name, board=job["board"], app=job["app"],
+                            overlays=job.get("overlays", [])))
+    return ordered, wall
+
+
+def print_report(records, wall):
+    print(f"\n{'Job':<28} {'Status':<8} {'Time':>8} {'FLASH':>10} {'RAM':>10}")
+    print("-" * 68)
+    for record in records:
+        memory = record.get("memory", {})
+        flash = memory.get("FLASH", memory.get("RRAM", {})).get("used")
+        ram = memory.get("RAM", memory.get("SRAM", {})).get("used")
+        print(f"{record['name']:<28} {record['status']:<8} {record['seconds']:>7.1f}s "
+              f"{flash if flash is not None else '-':>10} {ram if ram is not None else '-':>10}")
+    serial = sum(r["seconds"] for r in records)
+    print("-" * 68)
+    if serial and wall:
+        print(f"Wall time {wall:.1f}s vs {serial:.1f}s of build time ({serial / wall:.1f}x)")
+    else:
+        print(f"Wall time {wall:.1f}s (nothing rebuilt)")
+    for record in records:
+        if record["status"] == "failed":
+            print(f"\n❌ {record['name']}:\n{record.get('error', '')}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build every board/app/overlay combination in parallel")
+    parser.add_argument("--matrix", help="JSON list of {name?, board, app, overlays?} jobs")
+    parser.add_argument("--job", action="append", metavar="BOARD:APP[:OVERLAY,...]",
+                        help="Add a job on the command line (repeatable)")
+    parser.add_argument("--project-dir", default=str(PROJECT_DIR))
+    parser.add_argument("--workers", type=int, help="Concurrent west builds")
+    parser.add_argument("--cache-dir", help="Build cache directory (default: <project>/build_cache)")
+    args = parser.parse_args()
+
+    jobs = []
+    if args.matrix:
+        with open(args.matrix) as f:
+            jobs = json.load(f)
+    for spec in args.job or []:
+        board, app, *rest = spec.split(":")
+        jobs.append({"board": board, "app": app, "overlays": rest[0].split(",") if rest else []})
+    jobs = jobs or DEFAULT_MATRIX
+
+    names = [job_name(job) for job in jobs]
+    if len(set(names)) != len(names):
+        print("❌ Matrix jobs must have unique names")
+        return 1
+
+    print(f"🏗️  Building {len(jobs)} job(s)")
+    records, wall = run_matrix(jobs, args.project_dir, cache_dir=args.cache_dir, workers=args.workers)
+    print_report(records, wall)
+
+    report_dir = Path(args.project_dir) / "build_matrix"
+    report_dir.mkdir(parents=True, exist_ok=True)
+    report_file = report_dir / f"report_{time.strftime('%Y%m%d_%H%M%S')}.json"
+    with open(report_file, "w") as f:
+        json.dump({"wall_seconds": wall, "jobs": records}, f, indent=2)
+    print(f"\n📄 Report: {report_file}")
+    return 0 if all(r["status"] != "failed" for r in records) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+MIPE Warm Build Directory Pool
+Keeps configured Zephyr build directories per (app, board, configure
+fingerprint) so a candidate build is an incremental Ninja build instead of a
+fresh CMake/Kconfig/devicetree configure. A directory is reconfigured only
+when its configure inputs change, and reset to pristine when a failed
+configure may have left it inconsistent or its overlay arguments change
+(CMakeCache.txt keeps the old DTC_OVERLAY_FILE/EXTRA_CONF_FILE otherwise).
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+import time
+from pathlib import Path
+
+from build_cache import directory_input_hash
+from build_runner import FATAL_KINDS, format_diagnostic, run_build, west_build_cmd
+
+# Inputs that CMake/Kconfig/dtc consume at configure time (sources are not among them)
+CONFIGURE_INPUTS = (
+    "CMakeLists.txt",
+    "*.conf",
+    "*.overlay",
+    "Kconfig*",
+    "boards/**",
+)
+STATE_FILE = "pool_state.json"
+LOCK_FILE = "pool.lock"
+LOCK_STALE_S = 2 * 60 * 60
+# A build that fails in these leaves a half-written CMake cache behind
+POISONING_KINDS = ("cmake_error", "devicetree_error", "kconfig_error")
+
+_OVERLAY_ARG = re.compile(r"^-D(?:EXTRA_CONF_FILE|DTC_OVERLAY_FILE|OVERLAY_CONFIG)=(.*)$")
+
+
+def configure_fingerprint(app_dir, board, cmake_args=()):
+    """Hash of everything the configure step reads, including overlay files passed as CMake args"""
+    digest = hashlib.sha256()
+    digest.update(f"{board}\0{directory_input_hash(app_dir, CONFIGURE_INPUTS)}\0".encode("utf-8"))
+    for arg in cmake_args:
+        digest.update(f"{arg}\0".encode("utf-8"))
+        match = _OVERLAY_ARG.match(arg)
+        if match:
+            for path in filter(None, match.group(1).split(";")):
+                overlay = Path(app_dir, path)
+                if overlay.exists():
+                    digest.update(hashlib.sha256(overlay.read_bytes()).digest())
+    return digest.hexdigest()[:24]
+
+
+def _slug(text):
+    return re.sub(r"[^\w.-]", "_", text)
+
+
+class PooledDir:
+    """One pool slot: a build directory plus its state file and lock"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+
+    @property
+    def state(self):
+        try:
+            with open(self.path / STATE_FILE) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def update(self, **values):
+        state = dict(self.state, **values)
+        self.path.mkdir(parents=True, exist_ok=True)
+        tmp = self.path / f".{STATE_FILE}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp, self.path / STATE_FILE)
+
+    def try_lock(self):
+        """Exclusive use across processes (build matrix workers share the pool)"""
+        self.path.mkdir(parents=True, exist_ok=True)
+        lock = self.path / LOCK_FILE
+        try:
+            fd = os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            try:
+                stale = time.time() - lock.stat().st_mtime > LOCK_STALE_S
+            except OSError:
+                return False
+            if not stale:
+                return False
+            lock.unlink(missing_ok=True)
+            return self.try_lock()
+        with os.fdopen(fd, "w") as f:
+            f.write(str(os.getpid()))
+        return True
+
+    def unlock(self):
+        (self.path / LOCK_FILE).unlink(missing_ok=True)
+
+    def reset(self):
+        """Throw away the configured tree; the next build configures from scratch"""
+        for child in self.path.iterdir():
+            if child.name not in (STATE_FILE, LOCK_FILE):
+                if child.is_dir():
+                    shutil.rmtree(child, ignore_errors=True)
+                else:
+                    child.unlink(missing_ok=True)
+        self.update(fingerprint=None, poisoned=False)
+
+
+class BuildDirPool:
+    """
+    Slots live in <root>/<app>__<board>/<n>/. acquire() prefers a slot already
+    configured with the same fingerprint (warm: incremental build), then an
+    unconfigured slot, then a new slot up to max_slots, and only then the least
+    recently used slot of another configuration (reconfigured in place, object
+    files kept).
+    """
+
+    def __init__(self, root, max_slots=2):
+        self.root = Path(root)
+        self.max_slots = max_slots
+        self.stats = {"warm": 0, "reconfigure": 0, "pristine": 0}
+
+    def _group(self, app_dir, board):
+        return self.root / f"{_slug(Path(app_dir).resolve().name)}__{_slug(board)}"
+
+    def slots(self, app_dir, board):
+        group = self._group(app_dir, board)
+        if not group.exists():
+            return []
+        return sorted((PooledDir(p) for p in group.iterdir() if p.is_dir()), key=lambda s: s.path.name)
+
+    def acquire(self, app_dir, board, fingerprint, timeout=None):
+        """(slot, mode) with the slot locked; mode is 'warm', 'reconfigure' or 'pristine'"""
+        deadline = time.monotonic() + timeout if timeout else None
+        while True:
+            slots = self.slots(app_dir, board)
+            matching = [s for s in slots if s.state.get("fingerprint") == fingerprint]
+            unconfigured = [s for s in slots if not s.state.get("fingerprint")]
+            configured = sorted((s for s in slots if s not in matching and s not in unconfigured),
+                                key=lambda s: s.state.get("last_used", 0))
+            for slot in matching + unconfigured:
+                if slot.try_lock():
+                    return slot, self._mode(slot, fingerprint)
+            # Grow before evicting another configuration's warm directory
+            if len(slots) < self.max_slots:
+                slot = PooledDir(self._group(app_dir, board) / str(len(slots)))
+                if slot.try_lock():
+                    return slot, "pristine"
+            for slot in configured:
+                if slot.try_lock():
+                    return slot, self._mode(slot, fingerprint)
+            if deadline and time.monotonic() > deadline:
+                raise TimeoutError(f"No free build directory for {board} after {timeout}s")
+            time.sleep(0.5)
+
+    @staticmethod
+    def _mode(slot, fingerprint):
+        state = slot.state
+        if state.get("poisoned") or not (slot.path / "CMakeCache.txt").exists():
+            return "pristine"
+        return "warm" if state.get("fingerprint") == fingerprint else "reconfigure"
+
+    def build(self, app_dir, board, cmake_args=(), abort_on=FATAL_KINDS, on_line=None, timeout=None):
+        """
+        Build app_dir for board in a pooled directory. Returns (BuildResult,
+        build_dir); the directory stays valid for flashing until the next
+        build of the same app/board reuses it.
+        """
+        app_dir = Path(app_dir).resolve()
+        fingerprint = configure_fingerprint(app_dir, board, cmake_args)
+        overlay_args = [arg for arg in cmake_args if _OVERLAY_ARG.match(arg)]
+        slot, mode = self.acquire(app_dir, board, fingerprint)
+        try:
+            if mode == "reconfigure" and slot.state.get("overlay_args") != overlay_args:
+                # Omitting an overlay variable would leave the cached value in place
+                mode = "pristine"
+            if mode == "pristine" and slot.state:
+                slot.reset()
+            self.stats[mode] += 1
+            pristine = {"warm": None, "reconfigure": None, "pristine": "always"}[mode]
+            cmd = west_build_cmd(board, slot.path, pristine, app_dir, cmake_args)
+            if mode == "reconfigure":
+                cmd.insert(2, "--cmake")
+            result = run_build(cmd, cwd=app_dir, abort_on=abort_on, on_line=on_line, timeout=timeout,
+                               name=f"build_{mode}")
+
+            # Only a clean configure earns the fingerprint; a failed configure poisons the tree
+            poisoned = any(d.kind in POISONING_KINDS for d in result.diagnostics) or result.timed_out
+            slot.update(app=str(app_dir), board=board, last_used=time.time(), last_mode=mode,
+                        last_seconds=result.seconds, poisoned=poisoned,
+                        fingerprint=None if poisoned else fingerprint, overlay_args=overlay_args,
+                        builds=slot.state.get("builds", 0) + 1)
+            return result, slot.path
+        finally:
+            slot.unlock()
+
+    def reset_all(self, app_dir=None, board=None):
+        """Reset every (matching) slot to pristine; returns how many were reset"""
+        if app_dir and board:
+            slots = self.slots(app_dir, board)
+        elif self.root.exists():
+            slots = [PooledDir(p) for group in self.root.iterdir() if group.is_dir()
+                     for p in group.iterdir() if p.is_dir()]
+        else:
+            slots = []
+        count = 0
+        for slot in slots:
+            if slot.try_lock():
+                try:
+                    slot.reset()
+                    count += 1
+                finally:
+                    slot.unlock()
+        return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build through the warm build directory pool")
+    parser.add_argument("--project-dir", default=str(Path(__file__).resolve().parent.parent))
+    parser.add_argument("--app", default=".", help="Application directory relative to the project")
+    parser.add_argument("--board", default="mipe_ev1_nrf54l15_cpuapp")
+    parser.add_argument("--pool-dir", help="Pool root (default: <project>/build_pool)")
+    parser.add_argument("--reset", action="store_true", help="Reset all pooled directories to pristine")
+    parser.add_argument("--status", action="store_true", help="Show pooled directories")
+    parser.add_argument("cmake_args", nargs="*", help="Extra CMake arguments (after --)")
+    args = parser.parse_args()
+
+    pool = BuildDirPool(args.pool_dir or Path(args.project_dir) / "build_pool")
+    app_dir = Path(args.project_dir, args.app)
+
+    if args.reset:
+        print(f"🧹 Reset {pool.reset_all()} pooled build directories")
+        return 0
+    if args.status:
+        for slot in pool.slots(app_dir, args.board):
+            state = slot.state
+            flag = "☠️  poisoned" if state.get("poisoned") else (state.get("fingerprint") or "unconfigured")
+            print(f"📁 {slot.path}  {flag}  builds={state.get('builds', 0)} last={state.get('last_mode')}")
+        return 0
+
+    result, build_dir = pool.build(app_dir, args.board, args.cmake_args)
+    for diagnostic in result.errors():
+        print(format_diagnostic(diagnostic))
+    mode = PooledDir(build_dir).state.get("last_mode")
+    icon = "✅" if result.success else "❌"
+    print(f"{icon} {mode} build in {build_dir} took {result.seconds:.1f}s")
+    return 0 if result.success else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
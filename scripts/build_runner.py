@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+MIPE Streaming Build Runner
+Runs west build (or a build script) reading its output line by line,
+classifies diagnostics as they appear and stops the build on the first
+fatal one instead of waiting for it to finish failing
+"""
+
+import argparse
+import os
+import re
+import signal
+import subprocess
+import sys
+import threading
+import time
+from collections import namedtuple
+from pathlib import Path
+
+from tracing import tracer
+
+Diagnostic = namedtuple("Diagnostic", ["kind", "message", "file", "line", "text"])
+
+# "path:line", allowing a Windows drive letter
+_SOURCE = r"(?P<file>(?:[A-Za-z]:)?[^:\s][^:]*?):(?P<line>\d+)"
+
+# (kind, pattern) in match order; named groups file/line/message are optional
+DIAGNOSTIC_PATTERNS = [
+    ("devicetree_warning", re.compile(r"^(?P<file>\S+\.(?:dts|dtsi|overlay)):(?P<line>\d+)[.\d-]*:?\s*"
+                                      r"(?P<message>Warning .*)$")),
+    ("devicetree_error", re.compile(r"^(?:Error: )?(?P<file>\S+\.(?:dts|dtsi|overlay)):(?P<line>\d+)[.\d-]*:?\s*"
+                                    r"(?P<message>.*)$")),
+    ("devicetree_error", re.compile(r"^(?:-- )?(?:devicetree error|FATAL ERROR):\s*(?P<message>.*)$")),
+    ("kconfig_error", re.compile(r"^(?:error: )?(?P<message>Aborting due to Kconfig warnings)")),
+    ("kconfig_error", re.compile(r"^(?P<file>\S+\.conf|\S*Kconfig\S*):(?P<line>\d+): error: (?P<message>.*)$")),
+    ("kconfig_warning", re.compile(r"^(?P<file>\S+\.conf|\S*_defconfig):(?P<line>\d+): warning: (?P<message>.*)$")),
+    ("kconfig_warning", re.compile(r"^warning: (?P<message>\w+ \(defined at .*)$")),
+    ("cmake_error", re.compile(r"^CMake Error at " + _SOURCE + r"\s*(?P<message>.*)$")),
+    ("compile_error", re.compile(r"^" + _SOURCE + r":\d+: (?:fatal )?error: (?P<message>.*)$")),
+    ("compile_warning", re.compile(r"^" + _SOURCE + r":\d+: warning: (?P<message>.*)$")),
+    ("link_error", re.compile(r"(?P<message>undefined reference to .*|region `\w+' overflowed by .*)$")),
+]
+
+# Diagnostics after which the build cannot succeed
+FATAL_KINDS = ("launch_error", "devicetree_error", "kconfig_error", "cmake_error", "compile_error", "link_error")
+
+
+def classify_line(line):
+    """Diagnostic for one line of build output, or None"""
+    text = line.rstrip()
+    for kind, pattern in DIAGNOSTIC_PATTERNS:
+        match = pattern.search(text)
+        if match:
+            groups = match.groupdict()
+            number = groups.get("line")
+            return Diagnostic(kind, (groups.get("message") or text).strip(), groups.get("file"),
+                              int(number) if number else None, text)
+    return None
+
+
+class BuildResult:
+    """Outcome of one streamed build"""
+
+    def __init__(self, returncode, diagnostics, output, seconds, aborted_on=None, timed_out=False):
+        self.returncode = returncode
+        self.diagnostics = diagnostics
+        self.output = output
+        self.seconds = seconds
+        self.aborted_on = aborted_on   # the fatal Diagnostic that stopped the build
+        self.timed_out = timed_out
+
+    @property
+    def success(self):
+        return self.returncode == 0 and self.aborted_on is None and not self.timed_out
+
+    def errors(self):
+        return [d for d in self.diagnostics if d.kind in FATAL_KINDS]
+
+    def warnings(self):
+        return [d for d in self.diagnostics if d.kind not in FATAL_KINDS]
+
+    def summary(self):
+        """{kind: count}"""
+        counts = {}
+        for diagnostic in self.diagnostics:
+            counts[diagnostic.kind] = counts.get(diagnostic.kind, 0) + 1
+        return counts
+
+
+def format_diagnostic(diagnostic):
+    location = Path(diagnostic.file).name if diagnostic.file else ""
+    if diagnostic.line:
+        location += f":{diagnostic.line}"
+    icon = "❌" if diagnostic.kind in FATAL_KINDS else "⚠️ "
+    return " ".join(part for part in (icon, f"[{diagnostic.kind}]", location, diagnostic.message) if part)
+
+
+def _kill_tree(process):
+    """Stop the build and everything it spawned (cmake, ninja, compilers)"""
+    if process.poll() is not None:
+        return
+    if os.name == "nt":
+        subprocess.run(["taskkill", "/F", "/T", "/PID", str(process.pid)], capture_output=True)
+    else:
+        try:
+            os.killpg(process.pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def run_build(cmd, cwd=None, abort_on=FATAL_KINDS, timeout=None, on_line=None, env=None, name="build"):
+    """
+    Run a build command streaming its combined stdout/stderr. The first
+    diagnostic whose kind is in abort_on stops the build (pass abort_on=()
+    to always run to completion). on_line(line, diagnostic) sees every line
+    as it arrives.
+    """
+    popen_kwargs = {}
+    if os.name == "nt":
+        popen_kwargs["creationflags"] = subprocess.CREATE_NEW_PROCESS_GROUP
+    else:
+        popen_kwargs["start_new_session"] = True
+
+    with tracer.span(name, category="subprocess", cmd=" ".join(str(c) for c in cmd)) as span:
+        start = time.perf_counter()
+        diagnostics = []
+        output = []
+        aborted_on = None
+        try:
+            process = subprocess.Popen(cmd, cwd=cwd, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                       text=True, errors="replace", bufsize=1, **popen_kwargs)
+        except OSError as e:
+            message = f"{cmd[0]}: {e}"
+            span.set(returncode=None, error=message)
+            return BuildResult(None, [Diagnostic("launch_error", message, None, None, message)], message, 0.0,
+                               aborted_on=None)
+
+        expired = threading.Event()
+        timer = None
+        if timeout:
+            def expire():
+                expired.set()
+                _kill_tree(process)
+            timer = threading.Timer(timeout, expire)
+            timer.daemon = True
+            timer.start()
+
+        try:
+            for line in process.stdout:
+                output.append(line)
+                diagnostic = classify_line(line)
+                if diagnostic:
+                    diagnostics.append(diagnostic)
+                if on_line:
+                    on_line(line, diagnostic)
+                if diagnostic and diagnostic.kind in abort_on:
+                    aborted_on = diagnostic
+                    _kill_tree(process)
+                    break
+            process.wait()
+        finally:
+            if timer:
+                timer.cancel()
+            process.stdout.close()
+
+        result = BuildResult(process.returncode, diagnostics, "".join(output),
+                             round(time.perf_counter() - start, 2), aborted_on, expired.is_set())
+        span.set(returncode=result.returncode, diagnostics=len(diagnostics),
+                 aborted_on=aborted_on.kind if aborted_on else None, timed_out=result.timed_out)
+        return result
+
+
+def west_build_cmd(board, build_dir=None, pristine=None, source_dir=None, cmake_args=()):
+    cmd = ["west", "build", "-b", board]
+    if build_dir:
+        cmd += ["-d", str(build_dir)]
+    if pristine:
+        cmd += ["-p", pristine]
+    if source_dir:
+        cmd.append(str(source_dir))
+    if cmake_args:
+        cmd += ["--"] + list(cmake_args)
+    return cmd
+
+
+def main():
+    parser = argparse.ArgumentParser(description="west build with streamed diagnostics and early abort")
+    parser.add_argument("--board", default="mipe_ev1_nrf54l15_cpuapp")
+    parser.add_argument("--project-dir", default=str(Path(__file__).resolve().parent.parent))
+    parser.add_argument("--build-dir")
+    parser.add_argument("--pristine", choices=["auto", "always", "never"])
+    parser.add_argument("--no-abort", action="store_true", help="Run to completion on fatal diagnostics")
+    parser.add_argument("--timeout", type=float)
+    parser.add_argument("--quiet", action="store_true", help="Only print diagnostics")
+    args = parser.parse_args()
+
+    def echo(line, diagnostic):
+        if not args.quiet:
+            print(line, end="")
+        elif diagnostic:
+            print(format_diagnostic(diagnostic))
+
+    result = run_build(west_build_cmd(args.board, args.build_dir, args.pristine), cwd=args.project_dir,
+                       abort_on=() if args.no_abort else FATAL_KINDS, timeout=args.timeout, on_line=echo)
+    print()
+    for diagnostic in result.diagnostics:
+        print(format_diagnostic(diagnostic))
+    if result.aborted_on:
+        print(f"\n🛑 Aborted after {result.seconds:.1f}s on {result.aborted_on.kind}")
+    elif result.timed_out:
+        print(f"\n⏱️  Timed out after {result.seconds:.1f}s")
+    print("✅ Build succeeded" if result.success else "❌ Build failed")
+    return 0 if result.success else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+MIPE_EV1 Bus Decoders
+I2C and UART decoders on the same transition stream as the SPI decoder in
+logic_capture.py, plus a single pass that feeds one capture to several
+decoders at once. Like SpiDecoder they never look at individual samples:
+idle stretches are collapsed to one transition before Python sees them.
+"""
+
+import argparse
+import sys
+from collections import namedtuple
+
+from logic_capture import DEFAULT_CHANNEL_MAP, SpiDecoder, open_capture
+
+I2C_CHANNEL_MAP = {"scl": 4, "sda": 5}
+UART_CHANNEL_MAP = {"rx": 6}
+
+# address is the 7-bit address; acks holds one flag per byte (address first)
+I2cTransaction = namedtuple("I2cTransaction", ["start", "end", "address", "read", "data", "acks",
+                                               "repeated_start", "stretched"])
+UartFrame = namedtuple("UartFrame", ["start", "end", "value", "parity_error", "framing_error"])
+
+# An SCL low phase this many times the shortest one in a transaction is a stretch
+STRETCH_FACTOR = 2.0
+BATCH = 65536
+
+
+class I2cDecoder:
+    """
+    Streaming I2C decoder: START/STOP while SCL is high, SDA sampled on SCL
+    rising edges, ACK/NACK on every ninth clock. A repeated START closes the
+    current transaction and opens the next. Clock stretching is reported as the
+    number of SCL low phases much longer than the transaction's shortest one.
+    """
+
+    def __init__(self, channel_map=None):
+        channel_map = channel_map or I2C_CHANNEL_MAP
+        self.scl_bit = 1 << channel_map["scl"]
+        self.sda_bit = 1 << channel_map["sda"]
+        self.mask = self.scl_bit | self.sda_bit
+        self._prev = None
+        self._start = None
+        self._scl_fall = None
+
+    def _open(self, index, repeated):
+        self._start = index
+        self._repeated = repeated
+        self._bytes = []
+        self._acks = []
+        self._word = 0
+        self._bits = 0
+        self._lows = []
+        self._scl_fall = None
+
+    def _close(self, index):
+        address = read = None
+        if self._bytes:
+            address, read = self._bytes[0] >> 1, bool(self._bytes[0] & 1)
+        stretched = 0
+        if len(self._lows) > 1:
+            shortest = min(self._lows)
+            stretched = sum(1 for low in self._lows if low > STRETCH_FACTOR * shortest)
+        transaction = I2cTransaction(self._start, index, address, read, bytes(self._bytes[1:]),
+                                     tuple(self._acks), self._repeated, stretched)
+        self._start = None
+        return transaction
+
+    def feed(self, transitions):
+        """Consume transitions, returning the transactions they complete"""
+        done = []
+        scl_bit, sda_bit = self.scl_bit, self.sda_bit
+        prev = self._prev
+        for index, value in transitions:
+            if prev is None:
+                prev = value
+                continue
+            changed = prev ^ value
+            if changed & sda_bit and prev & scl_bit and value & scl_bit:
+                if value & sda_bit:
+                    # STOP
+                    if self._start is not None:
+                        done.append(self._close(index))
+                else:
+                    # START or repeated START
+                    repeated = self._start is not None
+                    if repeated:
+                        done.append(self._close(index))
+                    self._open(index, repeated)
+            elif changed & scl_bit and self._start is not None:
+                if value & scl_bit:
+                    if self._scl_fall is not None:
+                        self._lows.append(index - self._scl_fall)
+                    bit = 1 if value & sda_bit else 0
+                    if self._bits == 8:
+                        self._acks.append(bit == 0)
+                        self._bytes.append(self._word)
+                        self._word = self._bits = 0
+                    else:
+                        self._word = (self._word << 1) | bit
+                        self._bits += 1
+                else:
+                    self._scl_fall = index
+            prev = value
+        self._prev = prev
+        return done
+
+    def finish(self, end_sample):
+        """Flush a transaction still open (no STOP) when the capture (or window) ends"""
+        self._prev = None
+        if self._start is None:
+            return []
+        return [self._close(end_sample)]
+
+
+class UartDecoder:
+    """
+    Streaming UART decoder (start bit, LSB-first data, optional parity, stop
+    bits). Bits are read at mid-bit sample positions computed from the start
+    edge, so a frame costs one step per bit however many samples it spans.
+    """
+
+    def __init__(self, samplerate, baud=115200, channel_map=None, data_bits=8, parity="none",
+                 stop_bits=1, inverted=False):
+        if parity not in ("none", "even", "odd"):
+            raise ValueError(f"Unknown parity {parity!r}")
+        channel_map = channel_map or UART_CHANNEL_MAP
+        self.rx_bit = 1 << channel_map["rx"]
+        self.mask = self.rx_bit
+        self.bit_samples = samplerate / baud
+        self.data_bits = data_bits
+        self.parity = parity
+        self.stop_bits = stop_bits
+        self.inverted = inverted
+        self.frame_bits = 1 + data_bits + (parity != "none") + stop_bits
+        self._level = None
+        self._start = None
+        self._bits = []
+
+    def _mark(self, value):
+        """Line level as a logical 1 (idle/mark) or 0 (space)"""
+        level = 1 if value & self.rx_bit else 0
+        return level ^ 1 if self.inverted else level
+
+    def _sample_until(self, index, done):
+        """Read every pending mid-bit position before `index` at the current level"""
+        while self._start is not None:
+            position = self._start + (len(self._bits) + 0.5) * self.bit_samples
+            if position >= index:
+                return
+            self._bits.append(self._level)
+            if len(self._bits) == 1 and self._level:
+                # Start bit gone by mid-bit: a glitch, not a frame
+                self._start = None
+                self._bits = []
+            elif len(self._bits) == self.frame_bits:
+                done.append(self._frame())
+
+    def _frame(self):
+        bits = self._bits
+        data = bits[1:1 + self.data_bits]
+        value = sum(bit << i for i, bit in enumerate(data))
+        parity_error = False
+        if self.parity != "none":
+            ones = sum(data) + bits[1 + self.data_bits]
+            parity_error = (ones % 2 == 1) != (self.parity == "odd")
+        framing_error = not all(bits[self.frame_bits - self.stop_bits:])
+        frame = UartFrame(self._start, int(self._start + self.frame_bits * self.bit_samples), value,
+                          parity_error, framing_error)
+        self._start = None
+        self._bits = []
+        return frame
+
+    def feed(self, transitions):
+        """Consume transitions, returning the frames they complete"""
+        done = []
+        for index, value in transitions:
+            level = self._mark(value)
+            if self._level is None:
+                self._level = level
+                continue
+            if level == self._level:
+                continue
+            self._sample_until(index, done)
+            self._level = level
+            if self._start is None and level == 0:
+                self._start = index
+        return done
+
+    def finish(self, end_sample):
+        """Complete a frame whose remaining bits fall before the capture (or window) end"""
+        done = []
+        self._sample_until(end_sample, done)
+        # A frame still missing bits is cut off by the end; the next feed starts afresh
+        self._level = self._start = None
+        self._bits = []
+        return done
+
+
+def decode_buses(transitions, decoders):
+    """
+    Feed one transition stream to several decoders ({name: decoder}) in a
+    single pass; returns {name: records}. Each decoder only sees changes on
+    the channels in its own mask.
+    """
+    results = {name: [] for name in decoders}
+    last = {name: None for name in decoders}
+    batches = {name: [] for name in decoders}
+
+    def flush():
+        for name, decoder in decoders.items():
+            if batches[name]:
+                results[name].extend(decoder.feed(batches[name]))
+                batches[name] = []
+
+    count = 0
+    for index, value in transitions:
+        for name, decoder in decoders.items():
+            masked = value & decoder.mask
+            if masked != last[name]:
+                batches[name].append((index, masked))
+                last[name] = masked
+        count += 1
+        if count % BATCH == 0:
+            flush()
+    flush()
+    return results
+
+
+def decode_capture_buses(capture_file, decoders):
+    """
+    Decode several buses from one .sr/.vcd capture in one pass; returns
+    (capture, {name: records}). Trigger windows are decoded one at a time.
+    """
+    capture = open_capture(capture_file)
+    mask = 0
+    for decoder in decoders.values():
+        mask |= decoder.mask
+    results = {name: [] for name in decoders}
+    for _, end, transitions in capture.iter_segments(mask):
+        for name, records in decode_buses(transitions, decoders).items():
+            results[name].extend(records)
+        for name, decoder in decoders.items():
+            results[name].extend(decoder.finish(end))
+    return capture, results
+
+
+def _channel_map(text, default):
+    """'scl=4,sda=5' -> {'scl': 4, 'sda': 5} on top of the default map"""
+    mapping = dict(default)
+    for term in filter(None, (text or "").split(",")):
+        name, _, channel = term.partition("=")
+        mapping[name.strip()] = int(channel)
+    return mapping
+
+
+def format_record(record, samplerate):
+    time_s = f"{record.start / samplerate:.6f}s"
+    if isinstance(record, I2cTransaction):
+        if record.address is None:
+            return f"{time_s} I2C (no address)"
+        acks = "".join("A" if ack else "N" for ack in record.acks)
+        flags = " Sr" if record.repeated_start else ""
+        if record.stretched:
+            flags += f" stretched x{record.stretched}"
+        return (f"{time_s} I2C 0x{record.address:02X} {'R' if record.read else 'W'} "
+                f"[{record.data.hex(' ')}] {acks}{flags}")
+    if isinstance(record, UartFrame):
+        errors = (" PARITY" if record.parity_error else "") + (" FRAMING" if record.framing_error else "")
+        return f"{time_s} UART 0x{record.value:02X}{errors}"
+    return f"{time_s} SPI MOSI [{record.mosi.hex(' ')}] MISO [{record.miso.hex(' ')}]"
+
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Decode SPI, I2C and UART from one capture in one pass")
+    parser.add_argument("capture", help="Capture file (.sr or .vcd)")
+    parser.add_argument("--spi", nargs="?", const="", help="Decode SPI (optional map clk=0,mosi=1,miso=2,cs=3)")
+    parser.add_argument("--i2c", nargs="?", const="", help="Decode I2C (optional map scl=4,sda=5)")
+    parser.add_argument("--uart", nargs="?", const="", help="Decode UART (optional map rx=6)")
+    parser.add_argument("--baud", type=int, default=115200)
+    parser.add_argument("--parity", choices=("none", "even", "odd"), default="none")
+    parser.add_argument("--stop-bits", type=int, default=1)
+    parser.add_argument("--limit", type=int, default=10, help="Records to print per bus")
+    args = parser.parse_args()
+
+    capture = open_capture(args.capture)
+    decoders = {}
+    if args.spi is not None:
+        decoders["spi"] = SpiDecoder(_channel_map(args.spi, DEFAULT_CHANNEL_MAP))
+    if args.i2c is not None:
+        decoders["i2c"] = I2cDecoder(_channel_map(args.i2c, I2C_CHANNEL_MAP))
+    if args.uart is not None:
+        decoders["uart"] = UartDecoder(capture.samplerate, args.baud, _channel_map(args.uart, UART_CHANNEL_MAP),
+                                       parity=args.parity, stop_bits=args.stop_bits)
+    if not decoders:
+        print("❌ Choose at least one of --spi, --i2c, --uart")
+        return 1
+
+    capture, results = decode_capture_buses(args.capture, decoders)
+    for name, records in results.items():
+        print(f"🔍 {name}: {len(records)} records")
+        for record in records[:args.limit]:
+            print(f"   {format_record(record, capture.samplerate)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+MIPE_EV1 Capture Planner
+Chooses the lowest usable sample rate and shortest capture duration from the
+SPI clock and GPIO timing configured in the board and application sources
+"""
+
+import argparse
+import json
+import math
+import re
+from pathlib import Path
+
+from fix_overlays import OVERLAY_DIR, OverlayStore
+from logic_capture import format_samplerate, parse_samplerate
+
+# Rates offered by the fx2lafw driver (Cypress FX2 analyzer), ascending
+SUPPORTED_SAMPLE_RATES = [
+    20_000, 25_000, 50_000, 100_000, 200_000, 250_000, 500_000,
+    1_000_000, 2_000_000, 3_000_000, 4_000_000, 6_000_000, 8_000_000,
+    12_000_000, 16_000_000, 24_000_000,
+]
+# Fixed rate when nothing is planned: the fastest the analyzer really offers
+DEFAULT_SAMPLE_RATE = "24M"
+
+SPI_OVERSAMPLE = 4          # samples per SCLK period: 2x Nyquist plus edge margin
+GPIO_RESOLUTION = 0.01      # sample period as a fraction of the timing tolerance
+TOGGLE_TOLERANCE_MS = 2     # matches RTTMonitor.tolerance
+MIN_GPIO_EVENTS = 20        # toggles needed for a confident period estimate
+MIN_SPI_TRANSFERS = 3       # WHO_AM_I reads needed for a confident verdict
+DURATION_MARGIN = 1.2
+
+_DTS_SPI_FREQ = re.compile(r"spi-max-frequency\s*=\s*<\s*(\d+)\s*>")
+_C_SPI_FREQ = re.compile(r"\.?frequency\s*=\s*(\d+)\s*[,;]")
+_C_SLEEP_MS = re.compile(r"k_msleep\s*\(\s*(\d+)\s*\)")
+_C_TOGGLE_MS = re.compile(r"toggle_threshold\s*=.*?(\d+(?:\.\d+)?)\s*ms")
+
+
+def _read(path):
+    try:
+        return Path(path).read_text(encoding="utf-8", errors="ignore")
+    except OSError:
+        return ""
+
+
+def board_sources(project_dir, board="mipe_ev1"):
+    """
+    DTS/overlay files in layering order (board DTS, project overlays, then the
+    active fix overlays the next build composes) and application sources
+    """
+    project_dir = Path(project_dir)
+    dts = sorted((project_dir / "boards" / "nordic" / board).glob("*.dts"))
+    dts += sorted(project_dir.glob("*.overlay"))
+    dts += sorted((project_dir / "boards").glob("*.overlay"))
+    dts += OverlayStore(project_dir / OVERLAY_DIR).active_files("dts")
+    sources = sorted((project_dir / "src").glob("main.c"))
+    return dts, sources
+
+
+def read_timing_config(project_dir, board="mipe_ev1"):
+    """
+    Extract the effective SPI clock (lowest of DTS spi-max-frequency and
+    spi_cfg.frequency), the GPIO toggle period and periodic SPI poll interval.
+    An overlay that sets spi-max-frequency replaces the value layered below it.
+    """
+    dts_files, source_files = board_sources(project_dir, board)
+    config = {"spi_frequency": None, "toggle_period_ms": None, "spi_period_ms": None, "sources": []}
+
+    frequencies = []
+    dts_frequencies = []
+    for path in dts_files:
+        found = [int(f) for f in _DTS_SPI_FREQ.findall(_read(path))]
+        if found:
+            config["sources"].append(str(path))
+            if path.suffix == ".overlay":
+                dts_frequencies = found
+            else:
+                dts_frequencies.extend(found)
+    frequencies.extend(dts_frequencies)
+
+    for path in source_files:
+        content = _read(path)
+        spi_in_use = "spi_transceive" in content
+        if spi_in_use:
+            frequencies.extend(int(f) for f in _C_SPI_FREQ.findall(content))
+            sleeps = [int(ms) for ms in _C_SLEEP_MS.findall(content)]
+            if sleeps:
+                config["spi_period_ms"] = max(sleeps)
+        toggle = _C_TOGGLE_MS.search(content)
+        if toggle:
+            config["toggle_period_ms"] = float(toggle.group(1))
+        if spi_in_use or toggle:
+            config["sources"].append(str(path))
+
+    if frequencies:
+        config["spi_frequency"] = min(frequencies)
+    return config
+
+
+def choose_sample_rate(required):
+    """Lowest supported rate >= required (the fastest rate if none is)"""
+    for rate in SUPPORTED_SAMPLE_RATES:
+        if rate >= required:
+            return rate
+    return SUPPORTED_SAMPLE_RATES[-1]
+
+
+def format_duration(seconds):
+    milliseconds = math.ceil(seconds * 1000)
+    if milliseconds % 1000 == 0:
+        return f"{milliseconds // 1000}s"
+    return f"{milliseconds}ms"
+
+
+def plan_capture(project_dir, board="mipe_ev1", fallback_rate=DEFAULT_SAMPLE_RATE, fallback_duration="5s"):
+    """
+    Build a capture plan: {'samplerate', 'duration', 'reasons', ...}.
+    Falls back to the legacy fixed settings when nothing can be derived.
+    """
+    config = read_timing_config(project_dir, board)
+    reasons = []
+    required_rate = 0
+    duration_s = 0.0
+
+    if config["spi_frequency"]:
+        spi_rate = config["spi_frequency"] * SPI_OVERSAMPLE
+        required_rate = max(required_rate, spi_rate)
+        reasons.append(f"SPI {config['spi_frequency'] / 1e6:g} MHz x{SPI_OVERSAMPLE} oversample "
+                       f"-> >= {format_samplerate(spi_rate)}")
+        if config["spi_period_ms"]:
+            spi_duration = MIN_SPI_TRANSFERS * config["spi_period_ms"] / 1000
+            duration_s = max(duration_s, spi_duration)
+            reasons.append(f"{MIN_SPI_TRANSFERS} transfers every {config['spi_period_ms']} ms "
+                           f"-> {format_duration(spi_duration)}")
+
+    if config["toggle_period_ms"]:
+        gpio_rate = 1000 / (TOGGLE_TOLERANCE_MS * GPIO_RESOLUTION)
+        required_rate = max(required_rate, gpio_rate)
+        gpio_duration = MIN_GPIO_EVENTS * config["toggle_period_ms"] / 1000
+        duration_s = max(duration_s, gpio_duration)
+        reasons.append(f"GPIO toggle {config['toggle_period_ms']:g} ms, ±{TOGGLE_TOLERANCE_MS} ms "
+                       f"-> >= {format_samplerate(int(gpio_rate))}, {MIN_GPIO_EVENTS} toggles "
+                       f"-> {format_duration(gpio_duration)}")
+
+    if required_rate:
+        rate = choose_sample_rate(required_rate)
+        if rate < required_rate:
+            reasons.append(f"⚠️  required {format_samplerate(int(required_rate))} exceeds analyzer maximum")
+    else:
+        rate = parse_samplerate(fallback_rate)
+        reasons.append(f"no SPI/GPIO timing found - keeping {fallback_rate}")
+
+    if duration_s:
+        duration = format_duration(duration_s * DURATION_MARGIN)
+    else:
+        duration = fallback_duration
+        reasons.append(f"no periodic events found - keeping {fallback_duration}")
+
+    seconds = float(duration[:-2]) / 1000 if duration.endswith("ms") else float(duration[:-1])
+    return {
+        "samplerate": format_samplerate(rate).replace(" ", "").replace("Hz", ""),
+        "samplerate_hz": rate,
+        "duration": duration,
+        "estimated_samples": int(rate * seconds),
+        "config": config,
+        "reasons": reasons,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Plan logic analyzer sample rate and capture duration")
+    parser.add_argument("--project-dir", default=str(Path(__file__).resolve().parent.parent))
+    parser.add_argument("--board", default="mipe_ev1")
+    args = parser.parse_args()
+
+    plan = plan_capture(args.project_dir, args.board)
+    print("📐 Capture plan")
+    print(f"   Sample rate: {plan['samplerate']} ({plan['samplerate_hz']:,} Hz)")
+    print(f"   Duration:    {plan['duration']}")
+    print(f"   Samples:     {plan['estimated_samples']:,}")
+    for reason in plan["reasons"]:
+        print(f"   - {reason}")
+    print(json.dumps(plan["config"], indent=2))
+
+
+if __name__ == "__main__":
+    main()
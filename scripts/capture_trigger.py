@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+MIPE_EV1 Triggered Capture
+Hardware-armed sigrok triggers with pre/post-trigger windows, and a software
+trigger that scans a streaming sample feed and keeps only windows around activity
+"""
+
+import subprocess
+from pathlib import Path
+
+from logic_capture import iter_transitions, write_sr
+from tracing import tracer
+
+DEFAULT_TRIGGER = "3=f"  # CS (CH3) falling edge starts every LSM6 transfer
+STREAM_CHUNK = 1024 * 1024
+
+
+class TriggerCondition:
+    """
+    sigrok-style trigger spec, e.g. '3=f' or '0=1,3=0'.
+    Levels: 0/1; edges: r (rising), f (falling), e (either).
+    All terms must hold on the same sample.
+    """
+
+    def __init__(self, spec):
+        self.spec = spec
+        self.level_mask = 0
+        self.level_value = 0
+        self.edges = []
+        for term in spec.split(","):
+            channel, _, kind = term.strip().partition("=")
+            bit = 1 << int(channel)
+            if kind in ("0", "1"):
+                self.level_mask |= bit
+                self.level_value |= bit if kind == "1" else 0
+            elif kind in ("r", "f", "e"):
+                self.edges.append((bit, kind))
+            else:
+                raise ValueError(f"Bad trigger term {term!r} in {spec!r}")
+
+    def matches(self, prev, value):
+        if (value & self.level_mask) != self.level_value:
+            return False
+        for bit, kind in self.edges:
+            if prev is None or not (prev ^ value) & bit:
+                return False
+            if kind == "r" and not value & bit:
+                return False
+            if kind == "f" and value & bit:
+                return False
+        if not self.edges:
+            # Pure level pattern: fire on entering the pattern, not while held
+            return prev is None or (prev & self.level_mask) != self.level_value
+        return True
+
+
+class SampleRing:
+    """Fixed-capacity byte ring holding the most recent samples (pre-trigger history)"""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._buffer = bytearray(capacity)
+        self._head = 0
+        self.size = 0
+
+    def extend(self, data):
+        if self.capacity == 0:
+            return
+        data = memoryview(data)[-self.capacity:]
+        n = len(data)
+        first = min(n, self.capacity - self._head)
+        self._buffer[self._head:self._head + first] = data[:first]
+        self._buffer[:n - first] = data[first:]
+        self._head = (self._head + n) % self.capacity
+        self.size = min(self.capacity, self.size + n)
+
+    def tail(self, n):
+        """The last n samples in order"""
+        n = min(n, self.size)
+        start = (self._head - n) % self.capacity if self.capacity else 0
+        if start + n <= self.capacity:
+            return bytes(self._buffer[start:start + n])
+        return bytes(self._buffer[start:]) + bytes(self._buffer[:self._head])
+
+
+class SoftwareTrigger:
+    """
+    Streams unitsize-1 sample chunks and cuts [trigger - pre, trigger + post)
+    windows. A trigger inside an open window extends it (retrigger), windows
+    never overlap, and only pre + one window of samples are ever held.
+    """
+
+    def __init__(self, condition, pre, post, max_windows=None, retrigger=True):
+        self.condition = condition if isinstance(condition, TriggerCondition) else TriggerCondition(condition)
+        self.pre = pre
+        self.post = post
+        self.max_windows = max_windows
+        self.retrigger = retrigger
+        self.ring = SampleRing(pre)
+        self.position = 0
+        self.windows_emitted = 0
+        self._prev = None
+        self._floor = 0  # windows may not start before the previous one ended
+        self._open = None  # [start, end, data]
+
+    @property
+    def done(self):
+        return self.max_windows is not None and self.windows_emitted >= self.max_windows
+
+    def _triggers(self, chunk, offset):
+        prev = self._prev
+        for index, value in iter_transitions([chunk], 1, offset):
+            if value != prev and self.condition.matches(prev, value):
+                yield index
+            prev = value
+        self._prev = prev
+
+    def _advance(self, chunk, offset, upto, completed):
+        """Fill the open window up to sample `upto`, closing it if it reached its end"""
+        start, end, data = self._open
+        filled = start + len(data)
+        stop = min(end, upto)
+        if stop > filled:
+            data += chunk[filled - offset:stop - offset]
+        if start + len(data) >= end:
+            completed.append((start, bytes(data)))
+            self._floor = end
+            self._open = None
+            self.windows_emitted += 1
+
+    def feed(self, chunk):
+        """Consume a chunk; returns the (start_sample, samples) windows it completed"""
+        completed = []
+        offset = self.position
+        for trigger in self._triggers(chunk, offset):
+            if self.done:
+                break
+            if self._open is not None:
+                self._advance(chunk, offset, trigger, completed)
+            if self._open is not None:
+                if self.retrigger:
+                    self._open[1] = max(self._open[1], trigger + self.post)
+                continue
+            if self.done:
+                break
+            start = max(trigger - self.pre, self._floor, offset - self.ring.size)
+            data = bytearray(self.ring.tail(offset - start)) if start < offset else bytearray()
+            data += chunk[max(start, offset) - offset:trigger - offset]
+            self._open = [start, trigger + self.post, data]
+
+        if self._open is not None:
+            self._advance(chunk, offset, offset + len(chunk), completed)
+        self.ring.extend(chunk)
+        self.position += len(chunk)
+        return completed
+
+    def finish(self):
+        """Flush a window cut short by the end of the stream"""
+        if self._open is None:
+            return []
+        start, _, data = self._open
+        self._open = None
+        self.windows_emitted += 1
+        return [(start, bytes(data))]
+
+
+def write_windows(path, windows, samplerate, trigger=None):
+    """
+    Store trigger windows as one .sr (one chunk per window) whose window index
+    maps each chunk back to capture sample indices; SrCapture.iter_segments
+    then decodes every window on its own, at its real position in the stream
+    """
+    path = Path(path)
+    windows = list(windows)
+    index = []
+    position = 0
+    for start, data in windows:
+        index.append({"capture_start": start, "file_start": position, "length": len(data),
+                      "trigger": trigger})
+        position += len(data)
+    write_sr(path, (data for _, data in windows), samplerate, windows=index)
+    return path
+
+
+def file_to_capture_sample(index, windows):
+    """Map a sample index in a windowed .sr (SrCapture.windows) back to the original stream position"""
+    for window in windows:
+        if window["file_start"] <= index < window["file_start"] + window["length"]:
+            return window["capture_start"] + index - window["file_start"]
+    return None
+
+
+def hardware_trigger_command(sigrok_cli, device, samplerate, output_file,
+                             trigger=DEFAULT_TRIGGER, pre_samples=0, post_samples=100_000):
+    """
+    sigrok-cli invocation that arms the analyzer's own trigger. captureratio
+    sets the share of the sample buffer kept from before the trigger.
+    """
+    total = pre_samples + post_samples
+    ratio = int(round(100 * pre_samples / total)) if total else 0
+    return [
+        sigrok_cli,
+        "-d", device,
+        "-c", f"samplerate={samplerate}:captureratio={ratio}",
+        "--triggers", trigger,
+        "--samples", str(total),
+        "-o", str(output_file),
+    ]
+
+
+def stream_software_trigger(sigrok_cli, device, samplerate, duration, output_file,
+                            trigger=DEFAULT_TRIGGER, pre_samples=25_000, post_samples=250_000,
+                            max_windows=None):
+    """
+    Stream raw samples from sigrok-cli and keep only windows around trigger
+    events; used when the analyzer has no usable hardware trigger.
+    """
+    cmd = [
+        sigrok_cli,
+        "-d", device,
+        "-c", f"samplerate={samplerate}",
+        "-t", f"time={duration}",
+        "-O", "binary",
+    ]
+    software = SoftwareTrigger(trigger, pre_samples, post_samples, max_windows)
+    windows = []
+    with tracer.span("software_trigger_stream", trigger=trigger) as stream_span:
+        process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        try:
+            while not software.done:
+                chunk = process.stdout.read(STREAM_CHUNK)
+                if not chunk:
+                    break
+                windows.extend(software.feed(chunk))
+        finally:
+            process.terminate()
+            process.wait(timeout=5)
+        windows.extend(software.finish())
+        stream_span.set(samples_scanned=software.position, windows=len(windows))
+
+    if not windows:
+        return None
+    return write_windows(output_file, windows, samplerate, trigger)
@@ -11,11 +11,47 @@ import subprocess
 from datetime import datetime
 from pathlib import Path
 
+from build_pool import BuildDirPool
+from build_runner import format_diagnostic
+from fix_overlays import OVERLAY_DIR, OverlayStore
+from fix_ranking import (FIXES_PER_ITERATION, HISTORY_FILE, FixHistory, FixRanker, PendingFixes,
+                         issue_signature)
+from iteration_snapshots import SnapshotStore
+from kconfig_resolver import resolve_config
+from prebuild_check import errors, format_finding, validate_project
+from tracing import tracer
+
+# Keyword rules mapping analysis issues to candidate fixes (fallback priority order)
+FIX_RULES = [
+    ("dts_spi_clock", ("clock",)),
+    ("dts_cs_polarity", ("cs", "select")),
+    ("main_spi_clock", ("clock",)),
+    ("main_transfer_delay", ("timing",)),
+]
+
+# Clock the clock fixes fall back to when no measured timing is available
+FALLBACK_SPI_FREQUENCY = 500000
+
+
+def candidate_fixes(issues):
+    """Fixes whose keywords appear in any issue, in the fixed fallback order"""
+    lowered = [issue.lower() for issue in issues]
+    return [fix for fix, keywords in FIX_RULES
+            if any(keyword in issue for issue in lowered for keyword in keywords)]
+
 class SpiCodeGenerator:
     def __init__(self, project_root):
         self.project_root = Path(project_root)
         self.iteration_count = 0
         self.log_file = self.project_root / "ai_development.log"
+        self.fix_history = FixHistory(self.project_root / HISTORY_FILE)
+        self.ranker = FixRanker(self.fix_history)
+        self.pending_fixes = PendingFixes(self.project_root / "analyzer_captures" / "pending_fixes.json")
+        self.build_diagnostics = []
+        self.build_pool = BuildDirPool(self.project_root / "build_pool")
+        self.overlays = OverlayStore(self.project_root / OVERLAY_DIR)
+        self.snapshots = SnapshotStore(self.project_root)
+        self.baseline_snapshot = None
         
     def log(self, message):
         """Log AI decision process"""
@@ -60,8 +96,39 @@ class SpiCodeGenerator:
             "iteration": self.iteration_count
         }
     
-    def generate_device_tree_fix(self, issues):
-        """Generate device tree modifications based on issues"""
+    def measured_spi_timing(self):
+        """spi_timing block of the newest analyzer result (native decode only), or None"""
+        results = sorted((self.project_root / "analyzer_captures").glob("test_results_*.json"))
+        if not results:
+            return None
+        try:
+            with open(results[-1], "r") as f:
+                return json.load(f).get("spi_timing")
+        except (OSError, ValueError):
+            return None
+    
+    def _spi_clock_target(self):
+        """
+        Clock for the clock fixes: the measured suggestion when the capture
+        showed it must go below the measured SCLK, otherwise the fixed fallback
+        """
+        clock = (self.measured_spi_timing() or {}).get("clock") or {}
+        suggested, measured = clock.get("suggested_hz"), clock.get("measured_hz")
+        if suggested and measured and suggested < measured:
+            return suggested
+        return FALLBACK_SPI_FREQUENCY
+    
+    def _log_clock_headroom(self):
+        """After a pass, report whether the measured margins allow a faster clock"""
+        clock = (self.measured_spi_timing() or {}).get("clock") or {}
+        suggested, measured = clock.get("suggested_hz"), clock.get("measured_hz")
+        if suggested and measured and suggested > measured:
+            self.log(f"SPI timing margins allow {suggested} Hz (measured {measured} Hz, "
+                     f"limited by {clock.get('limited_by')}): spi-max-frequency can be raised")
+        return suggested
+    
+    def generate_device_tree_fix(self, issues, fixes=None):
+        """Layer device tree fixes as overlays; the board DTS itself is never edited"""
         dts_file = self.project_root / "boards/nordic/mipe_ev1/mipe_ev1_nrf54l15_cpuapp.dts"
         
         if not dts_file.exists():
@@ -72,31 +139,30 @@ class SpiCodeGenerator:
         with open(dts_file, 'r') as f:
             content = f.read()
         
-        modifications = []
+        overlays = []
+        if fixes is None:
+            fixes = candidate_fixes(issues)
         
         # Check if SPI node exists
-        if "&spi130" not in content:
-            modifications.append(self._add_spi_node())
+        if "&spi130" not in content and not self.overlays.is_active("dts_spi_node"):
+            overlays.append(("dts_spi_node", self._add_spi_node()))
         
         # Fix clock speed if too fast
-        if any("clock" in issue.lower() for issue in issues):
-            modifications.append(self._fix_spi_clock())
+        if "dts_spi_clock" in fixes:
+            overlays.append(("dts_spi_clock", self._fix_spi_clock(self._spi_clock_target())))
         
         # Fix CS polarity
-        if any("cs" in issue.lower() or "select" in issue.lower() for issue in issues):
-            modifications.append(self._fix_cs_polarity())
-        
-        if modifications:
-            new_content = self._apply_dts_modifications(content, modifications)
-            with open(dts_file, 'w') as f:
-                f.write(new_content)
-            self.log(f"Applied {len(modifications)} device tree fixes")
-            return True
+        if "dts_cs_polarity" in fixes:
+            overlays.append(("dts_cs_polarity", self._fix_cs_polarity()))
         
-        return False
+        for fix, overlay in overlays:
+            path = self.overlays.put(overlay, "dts")
+            self.overlays.activate(fix, path)
+            self.log(f"Layered {fix} as {path.name}")
+        return bool(overlays)
     
     def _add_spi_node(self):
-        """Generate SPI node for LSM6DSO32"""
+        """SPI node for LSM6DSO32"""
         return """
 &spi130 {
     status = "okay";
@@ -116,32 +182,21 @@ class SpiCodeGenerator:
     };
 };"""
     
-    def _fix_spi_clock(self):
-        """Reduce SPI clock speed"""
-        return {
-            "pattern": r"spi-max-frequency = <(\d+)>",
-            "replacement": "spi-max-frequency = <500000>" # Reduce to 500kHz
-        }
+    def _fix_spi_clock(self, frequency=FALLBACK_SPI_FREQUENCY):
+        """Reduce SPI clock speed (500kHz unless measured timing allows more)"""
+        return f"""
+&lsm6dso32 {{
+    spi-max-frequency = <{frequency}>;
+}};"""
     
     def _fix_cs_polarity(self):
         """Fix chip select polarity"""
-        return {
-            "pattern": r"cs-gpios = <&gpio2 10 GPIO_ACTIVE_HIGH>",
-            "replacement": "cs-gpios = <&gpio2 10 GPIO_ACTIVE_LOW>"
-        }
-    
-    def _apply_dts_modifications(self, content, modifications):
-        """Apply modifications to device tree content"""
-        for mod in modifications:
-            if isinstance(mod, str):
-                # Simple addition - append before closing brace
-                content = content.replace("};", mod + "\n};")
-            elif isinstance(mod, dict):
-                # Regex replacement
-                content = re.sub(mod["pattern"], mod["replacement"], content)
-        return content
+        return """
+&spi130 {
+    cs-gpios = <&gpio2 10 GPIO_ACTIVE_LOW>;
+};"""
     
-    def generate_main_c_fix(self, issues):
+    def generate_main_c_fix(self, issues, fixes=None):
         """Generate main.c modifications for SPI communication"""
         main_file = self.project_root / "src/main.c"
         
@@ -155,10 +210,11 @@ class SpiCodeGenerator:
         # Check if SPI code already exists
         if "lsm6dso32" in content.lower():
             self.log("SPI code already present, modifying...")
-            new_content = self._modify_existing_spi_code(content, issues)
+            new_content = self._modify_existing_spi_code(content, issues, fixes)
         else:
             self.log("Adding new SPI implementation...")
             new_content = self._add_spi_implementation(content)
+            self._enable_spi_config()
         
         with open(main_file, 'w') as f:
             f.write(new_content)
@@ -166,6 +222,52 @@ class SpiCodeGenerator:
         self.log("Updated main.c with SPI implementation")
         return True
     
+    def _enable_spi_config(self):
+        """The SPI implementation needs CONFIG_SPI, or spi_transceive() will not link"""
+        if resolve_config(self.project_root, extra_files=self.overlays.active_files("conf")).is_enabled("SPI"):
+            return
+        path = self.overlays.put("# SPI for LSM6DSO32\nCONFIG_SPI=y", "conf")
+        self.overlays.activate("conf_spi", path)
+        self.log(f"Enabled CONFIG_SPI in {path.name}")
+    
+    def _validate(self):
+        return errors(validate_project(self.project_root, extra_conf=self.overlays.active_files("conf"),
+                                       extra_dts=self.overlays.active_files("dts")))
+    
+    def _apply_checked_fixes(self, issues, fixes, signature, limit=FIXES_PER_ITERATION):
+        """
+        Apply fixes in rank order until `limit` are kept, running the static
+        pre-build checks after each; a fix that introduces new errors is
+        reverted and logged as a pre-build rejection (not a build failure, so
+        the ranker may offer it again once the tree changes) without spending
+        a build. Returns the fixes that were kept.
+        """
+        main_file = self.project_root / "src/main.c"
+        baseline = {(f.check, f.message) for f in self._validate()}
+        applied = []
+        for fix in fixes:
+            if len(applied) >= limit:
+                break
+            snapshot = main_file.read_bytes() if main_file.exists() else None
+            active = self.overlays.active
+            with tracer.span("prebuild_check", fix=fix) as check_span:
+                self.generate_device_tree_fix(issues, [fix])
+                self.generate_main_c_fix(issues, [fix])
+                new_errors = [f for f in self._validate() if (f.check, f.message) not in baseline]
+                check_span.set(errors=len(new_errors))
+            if new_errors:
+                if snapshot is not None:
+                    main_file.write_bytes(snapshot)
+                self.overlays.set_active(active)
+                self.log(f"Rejected fix {fix} before building:")
+                for finding in new_errors:
+                    self.log(f"  {format_finding(finding)}")
+                self.fix_history.reject(signature, fix, [format_finding(f) for f in new_errors],
+                                        issues=issues)
+            else:
+                applied.append(fix)
+        return applied
+    
     def _add_spi_implementation(self, content):
         """Add complete SPI implementation to main.c"""
         spi_code = '''
@@ -241,16 +343,18 @@ static int init_lsm6dso32(void) {
         
         return new_content
     
-    def _modify_existing_spi_code(self, content, issues):
+    def _modify_existing_spi_code(self, content, issues, fixes=None):
         """Modify existing SPI code based on issues"""
+        if fixes is None:
+            fixes = candidate_fixes(issues)
         
         # Reduce SPI frequency if clock issues
-        if any("clock" in issue.lower() for issue in issues):
+        if "main_spi_clock" in fixes:
             content = re.sub(r"spi_cfg\.frequency = \d+", 
-                           "spi_cfg.frequency = 500000", content)
+                           f"spi_cfg.frequency = {self._spi_clock_target()}", content)
         
         # Add delays if timing issues
-        if any("timing" in issue.lower() for issue in issues):
+        if "main_transfer_delay" in fixes:
             content = content.replace("spi_transceive(", 
                                     "k_msleep(1);\n\tspi_transceive(")
         
@@ -260,22 +364,41 @@ static int init_lsm6dso32(void) {
         """Execute complete build and test cycle"""
         self.iteration_count += 1
         self.log(f"Starting AI iteration #{self.iteration_count}")
+        if self.baseline_snapshot is None:
+            self.baseline_snapshot = self.snapshots.snapshot(
+                "Baseline before AI iterations", extra_files=self.overlays.active_files())["id"]
         
-        # 1. Build firmware
-        build_result = subprocess.run(
-            ["west", "build", "-b", "mipe_ev1_nrf54l15_cpuapp"],
-            cwd=self.project_root,
-            capture_output=True,
-            text=True
-        )
+        with tracer.span("iteration", iteration=self.iteration_count) as iteration_span:
+            outcome = self._run_iteration_stages()
+            iteration_span.set(outcome=outcome)
         
-        if build_result.returncode != 0:
-            self.log(f"Build failed: {build_result.stderr}")
-            return False
+        if outcome == "fixed":
+            return self.run_build_test_cycle()  # Recursive iteration
+        return outcome == "success"
+    
+    def _run_iteration_stages(self):
+        """Run one build/flash/capture/analyze pass; returns 'success', 'fixed' or 'failed'"""
+        # 1. Build firmware in a warm build directory, stopping at the first fatal diagnostic
+        build_result, build_dir = self.build_pool.build(self.project_root, "mipe_ev1_nrf54l15_cpuapp",
+                                                        self.overlays.cmake_args())
+        self.build_diagnostics = build_result.diagnostics
+        
+        if not build_result.success:
+            if build_result.aborted_on:
+                self.log(f"Build aborted after {build_result.seconds:.1f}s on {build_result.aborted_on.kind}")
+            reported = build_result.errors() or build_result.diagnostics
+            if reported:
+                for diagnostic in reported:
+                    self.log(f"Build failed: {format_diagnostic(diagnostic)}")
+            else:
+                self.log(f"Build failed: {build_result.output[-2000:]}")
+            self.pending_fixes.resolve(self.fix_history, passed=False)
+            return "failed"
         
         # 2. Flash firmware
-        flash_result = subprocess.run(
-            ["west", "flash"],
+        flash_result = tracer.run(
+            ["west", "flash", "-d", str(build_dir)],
+            name="flash",
             cwd=self.project_root,
             capture_output=True,
             text=True
@@ -283,44 +406,85 @@ static int init_lsm6dso32(void) {
         
         if flash_result.returncode != 0:
             self.log(f"Flash failed: {flash_result.stderr}")
-            return False
+            return "failed"
         
         # 3. Capture signals
         capture_file = self.project_root / "analyzer_captures" / f"spi_test_iter_{self.iteration_count}.csv"
-        capture_result = subprocess.run([
+        capture_result = tracer.run([
             "python", 
             str(self.project_root / "scripts/analyzer_automation.py"),
-            str(capture_file)
-        ], capture_output=True, text=True)
+            str(capture_file),
+            # The native decoder writes the spi_timing the clock target reads
+            "--decoder", "native"
+        ], name="capture", capture_output=True, text=True)
         
         if capture_result.returncode != 0:
             self.log(f"Capture failed: {capture_result.stderr}")
-            return False
+            return "failed"
         
         # 4. Analyze results
-        analysis = self.analyze_capture_results(capture_file)
+        with tracer.span("analyze") as analyze_span:
+            analysis = self.analyze_capture_results(capture_file)
+            analyze_span.set(issues=len(analysis.get("issues", [])))
+        
+        # The previous iteration's fixes are judged by this capture
+        self.pending_fixes.resolve(self.fix_history, passed=not analysis["fix_needed"])
         
         if analysis["fix_needed"]:
             self.log(f"Issues found: {analysis['issues']}")
             
-            # 5. Generate fixes
-            self.generate_device_tree_fix(analysis["issues"])
-            self.generate_main_c_fix(analysis["issues"])
+            # 5. Build the best fix by expected success per round trip alone,
+            #    so its verdict is its own; never repeat a fix that already
+            #    failed for this signature
+            signature = issue_signature(analysis["issues"])
+            candidates = candidate_fixes(analysis["issues"])
+            ranked = [entry["fix"] for entry in self.ranker.rank(signature, candidates)]
+            if candidates and not ranked:
+                self.log(f"All candidate fixes {candidates} already failed for signature {signature}")
+                return "failed"
+            self.log(f"Fix order: {ranked}")
             
-            # 6. Commit changes
-            subprocess.run([
-                "git", "add", "-A"
-            ], cwd=self.project_root)
+            with tracer.span("generate_fixes", signature=signature, fixes=",".join(ranked)) as fix_span:
+                applied = self._apply_checked_fixes(analysis["issues"], ranked, signature)
+                fix_span.set(applied=",".join(applied))
+            if ranked and not applied:
+                self.log(f"Every candidate fix {ranked} failed the pre-build checks")
+                return "failed"
+            deferred = ranked[ranked.index(applied[-1]) + 1:] if applied else []
+            if deferred:
+                self.log(f"Deferred to later iterations: {deferred}")
+            self.pending_fixes.save(signature, applied, analysis["issues"])
             
-            subprocess.run([
-                "git", "commit", "-m", 
-                f"AI Fix Iteration #{self.iteration_count}: {', '.join(analysis['issues'])}"
-            ], cwd=self.project_root)
+            # 6. Snapshot the iteration (git only sees the final state)
+            with tracer.span("snapshot") as snapshot_span:
+                manifest = self.snapshots.snapshot(
+                    f"AI Fix Iteration #{self.iteration_count}: {', '.join(analysis['issues'])}",
+                    extra_files=self.overlays.active_files(), iteration=self.iteration_count,
+                    signature=signature, fixes=applied)
+                snapshot_span.set(snapshot=manifest["id"], changed=len(manifest["changed"]))
+            self.log(f"Snapshot {manifest['id']}: {len(manifest['changed'])} file(s) changed")
             
-            return self.run_build_test_cycle()  # Recursive iteration
+            return "fixed"
         else:
             self.log("✅ SPI communication successful! AI development complete.")
-            return True
+            self._log_clock_headroom()
+            self._promote_final_state()
+            return "success"
+    
+    def _promote_final_state(self):
+        """Commit the verified tree once, instead of one commit per iteration"""
+        with tracer.span("commit"):
+            manifest = self.snapshots.snapshot(f"AI Fix Iteration #{self.iteration_count}: verified",
+                                               extra_files=self.overlays.active_files(),
+                                               iteration=self.iteration_count, verified=True)
+            if self.baseline_snapshot is None or not self.snapshots.diff(self.baseline_snapshot, manifest["id"]):
+                return None
+            sha = self.snapshots.promote(
+                manifest["id"], f"AI Fix Iteration #{self.iteration_count}: SPI communication verified "
+                                f"(snapshots {self.baseline_snapshot}-{manifest['id']})")
+        if sha:
+            self.log(f"Promoted snapshot {manifest['id']} to commit {sha[:10]}")
+        return sha
 
 def main():
     generator = SpiCodeGenerator("C:/Development/MIPE_EV1")
@@ -328,6 +492,11 @@ def main():
     # Run autonomous development cycle
     success = generator.run_build_test_cycle()
     
+    # Where did the iteration time go?
+    tracer.print_summary()
+    trace_file, summary_file = tracer.export(generator.project_root / "traces", "ai_loop")
+    generator.log(f"Trace exported: {trace_file} (summary: {summary_file})")
+    
     if success:
         print("🎉 AI Agent successfully implemented SPI communication!")
     else:
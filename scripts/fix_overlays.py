@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+MIPE Candidate Fix Overlays
+Candidate fixes as devicetree overlays and Kconfig fragments layered at build
+time (DTC_OVERLAY_FILE / EXTRA_CONF_FILE) instead of edits to the board DTS
+and prj.conf. Each overlay is stored once under its content hash; the active
+set is an ordered list of (fix, file) that the next build composes.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+from pathlib import Path
+
+OVERLAY_DIR = "fix_overlays"
+ACTIVE_FILE = "active.json"
+SUFFIXES = {"dts": ".overlay", "conf": ".conf"}
+
+
+# Drop overlay variables cached by an earlier configure of a reused build directory
+CLEAR_CACHED_ARGS = ("-UEXTRA_CONF_FILE", "-UDTC_OVERLAY_FILE")
+
+
+def overlay_cmake_args(paths):
+    """CMake arguments for overlay files: .conf -> EXTRA_CONF_FILE, .overlay -> DTC_OVERLAY_FILE"""
+    paths = [Path(p).resolve() for p in paths]
+    confs = [str(p) for p in paths if p.suffix == ".conf"]
+    dts = [str(p) for p in paths if p.suffix == ".overlay"]
+    args = []
+    if confs:
+        args.append(f"-DEXTRA_CONF_FILE={';'.join(confs)}")
+    if dts:
+        args.append(f"-DDTC_OVERLAY_FILE={';'.join(dts)}")
+    return args
+
+
+class OverlayStore:
+    """Content-addressed overlay files plus the ordered set active for the next build"""
+
+    def __init__(self, root):
+        self.root = Path(root)
+
+    def put(self, content, kind):
+        """Store an overlay ('dts' or 'conf'); identical content always maps to the same file"""
+        content = content.strip() + "\n"
+        digest = hashlib.sha256(f"{kind}\0{content}".encode("utf-8")).hexdigest()[:16]
+        path = self.root / f"{digest}{SUFFIXES[kind]}"
+        if not path.exists():
+            self.root.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+            tmp.write_text(content, encoding="utf-8")
+            os.replace(tmp, path)
+        return path
+
+    @property
+    def active(self):
+        """[{'fix': name, 'file': overlay file name}] in layering order"""
+        try:
+            with open(self.root / ACTIVE_FILE) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return []
+
+    def set_active(self, entries):
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self.root / f".{ACTIVE_FILE}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(list(entries), f, indent=2)
+        os.replace(tmp, self.root / ACTIVE_FILE)
+
+    def activate(self, fix, path):
+        """Layer an overlay on top of the active set (replacing an earlier one for the same fix)"""
+        entries = [e for e in self.active if e["fix"] != fix]
+        entries.append({"fix": fix, "file": Path(path).name})
+        self.set_active(entries)
+
+    def deactivate(self, fix):
+        self.set_active([e for e in self.active if e["fix"] != fix])
+
+    def is_active(self, fix):
+        return any(e["fix"] == fix for e in self.active)
+
+    def active_files(self, kind=None):
+        files = [self.root / e["file"] for e in self.active]
+        if kind:
+            files = [f for f in files if f.suffix == SUFFIXES[kind]]
+        return files
+
+    def cmake_args(self):
+        return overlay_cmake_args(self.active_files())
+
+    def fingerprint(self):
+        """Identifies the composed candidate: the ordered overlay hashes"""
+        return hashlib.sha256("\0".join(e["file"] for e in self.active).encode("utf-8")).hexdigest()[:16]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show or clear the active candidate fix overlays")
+    parser.add_argument("--project-dir", default=str(Path(__file__).resolve().parent.parent))
+    parser.add_argument("--clear", action="store_true", help="Deactivate every overlay (files are kept)")
+    parser.add_argument("--drop", action="append", default=[], metavar="FIX", help="Deactivate one fix")
+    parser.add_argument("--cmake-args", action="store_true",
+                        help="Print the CMake arguments on one line for build scripts")
+    args = parser.parse_args()
+
+    store = OverlayStore(Path(args.project_dir) / OVERLAY_DIR)
+    if args.clear:
+        store.set_active([])
+    for fix in args.drop:
+        store.deactivate(fix)
+    if args.cmake_args:
+        print(" ".join(list(CLEAR_CACHED_ARGS) + [f'"{arg}"' for arg in store.cmake_args()]))
+        return 0
+
+    if not store.active:
+        print("📭 No active fix overlays - building the base tree")
+        return 0
+    print(f"🧩 Active fix overlays ({store.fingerprint()}):")
+    for entry in store.active:
+        print(f"   {entry['fix']:<24} {entry['file']}")
+        for line in (store.root / entry["file"]).read_text(encoding="utf-8").splitlines():
+            print(f"      {line}")
+    print("\nCMake arguments:")
+    for arg in store.cmake_args():
+        print(f"   {arg}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
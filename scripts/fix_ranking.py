@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+MIPE_EV1 Fix Ranking
+Learns from stored iteration outcomes which fixes resolve which issue
+signatures, and orders candidate fixes by expected success per second of
+build+flash+capture round trip
+"""
+
+import argparse
+import hashlib
+import json
+import re
+import time
+from collections import defaultdict
+from pathlib import Path
+
+HISTORY_FILE = "ai_fix_history.jsonl"
+DEFAULT_FIX_COST_S = 120.0   # assumed round trip for a fix never tried before
+PRIOR_STRENGTH = 2.0         # pseudo-observations given to the cross-signature success rate
+PRIOR_SUCCESS = 0.5          # success rate assumed for a fix with no history at all
+FIXES_PER_ITERATION = 1      # top-ranked fixes built together, so each verdict belongs to its fix
+FEATURE_KEYS = ("spi_activity", "who_am_i_found", "valid_responses")
+
+_DIGITS = re.compile(r"\d+")
+
+
+def issue_signature(issues, features=None):
+    """
+    Stable key for "this kind of failure": the normalised, order-independent
+    issue list plus coarse capture features (numbers collapsed so that e.g.
+    '3 transactions' and '5 transactions' share a signature)
+    """
+    parts = sorted({_DIGITS.sub("#", str(issue).strip().lower()) for issue in issues})
+    if features:
+        for key in FEATURE_KEYS:
+            if key in features:
+                parts.append(f"{key}={bool(features[key])}")
+    text = "|".join(parts)
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:12]
+
+
+def capture_features(results):
+    """The subset of a test result that goes into signatures and history"""
+    return {key: results[key] for key in FEATURE_KEYS if key in results}
+
+
+class FixHistory:
+    """
+    Append-only JSONL log of {signature, fix, passed, batch, cost_s, features, time},
+    where batch is how many fixes shared the build; pre-build rejections are
+    logged with "rejected" and are not build outcomes
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.records = []
+        if self.path.exists():
+            with open(self.path) as f:
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        try:
+                            self.records.append(json.loads(line))
+                        except json.JSONDecodeError:
+                            continue  # torn write from an interrupted run
+
+    def record(self, signature, fixes, passed, cost_s=None, features=None, issues=None):
+        """Log the outcome of one iteration; every fix applied in it shares the verdict"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "a") as f:
+            for fix in fixes:
+                entry = {
+                    "signature": signature,
+                    "fix": fix,
+                    "passed": bool(passed),
+                    "batch": len(fixes),
+                    "cost_s": cost_s,
+                    "features": features or {},
+                    "issues": list(issues or []),
+                    "time": time.time(),
+                }
+                self.records.append(entry)
+                f.write(json.dumps(entry) + "\n")
+
+    def reject(self, signature, fix, reasons, issues=None):
+        """Log a fix the static checks turned away; it was never built, so it is not a failure"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        entry = {
+            "signature": signature,
+            "fix": fix,
+            "rejected": list(reasons),
+            "issues": list(issues or []),
+            "time": time.time(),
+        }
+        self.records.append(entry)
+        with open(self.path, "a") as f:
+            f.write(json.dumps(entry) + "\n")
+
+    def outcomes(self):
+        """Records of fixes that were built and judged (older logs marked rejections in features)"""
+        return [r for r in self.records if "rejected" not in r and "rejected" not in r.get("features", {})]
+
+
+class FixRanker:
+    """
+    Scores fix = P(success | signature, fix) / expected cost.
+    The per-signature success rate is shrunk towards the fix's rate across all
+    signatures, so a fix that worked elsewhere is tried before an unknown one.
+    A fix that has failed alone for a signature and never succeeded for it is
+    excluded; a failure shared with other fixes only lowers its score.
+    """
+
+    def __init__(self, history, default_cost=DEFAULT_FIX_COST_S, prior_strength=PRIOR_STRENGTH):
+        self.history = history
+        self.default_cost = default_cost
+        self.prior_strength = prior_strength
+
+    def _stats(self):
+        # (signature, fix) -> [successes, trials, trials built alone]
+        by_signature = defaultdict(lambda: [0, 0, 0])
+        by_fix = defaultdict(lambda: [0, 0, 0])
+        costs = defaultdict(list)
+        for r in self.history.outcomes():
+            for table, key in ((by_signature, (r["signature"], r["fix"])), (by_fix, r["fix"])):
+                table[key][0] += r["passed"]
+                table[key][1] += 1
+                table[key][2] += r.get("batch", 1) == 1
+            if r.get("cost_s"):
+                costs[r["fix"]].append(r["cost_s"])
+        return by_signature, by_fix, costs
+
+    def known_failures(self, signature):
+        by_signature, _, _ = self._stats()
+        return {fix for (sig, fix), (wins, _, solo) in by_signature.items()
+                if sig == signature and solo and not wins}
+
+    def score(self, signature, fix, stats=None):
+        by_signature, by_fix, costs = stats or self._stats()
+        fix_wins, fix_trials, _ = by_fix.get(fix, (0, 0, 0))
+        global_rate = (fix_wins + PRIOR_SUCCESS) / (fix_trials + 1)
+        wins, trials, _ = by_signature.get((signature, fix), (0, 0, 0))
+        success = (wins + self.prior_strength * global_rate) / (trials + self.prior_strength)
+        fix_costs = costs.get(fix)
+        cost = sum(fix_costs) / len(fix_costs) if fix_costs else self.default_cost
+        return {"fix": fix, "success": round(success, 3), "cost_s": round(cost, 1),
+                "score": success / max(cost, 1e-3), "trials": trials}
+
+    def rank(self, signature, candidates):
+        """Candidates best-first, with known failures for this signature removed"""
+        stats = self._stats()
+        by_signature = stats[0]
+        ranked = []
+        for order, fix in enumerate(dict.fromkeys(candidates)):
+            wins, _, solo = by_signature.get((signature, fix), (0, 0, 0))
+            if solo and not wins:
+                continue
+            entry = self.score(signature, fix, stats)
+            ranked.append((-entry["score"], order, entry))
+        # Ties keep the caller's order (the original fixed priority)
+        return [entry for _, _, entry in sorted(ranked, key=lambda item: item[:2])]
+
+
+class PendingFixes:
+    """
+    Fixes applied in the current iteration whose verdict arrives with the next
+    analysis; persisted so the outcome can be recorded across process runs
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+
+    def save(self, signature, fixes, issues, features=None):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "w") as f:
+            json.dump({"signature": signature, "fixes": list(fixes), "issues": list(issues),
+                       "features": features or {}, "applied_at": time.time()}, f, indent=2)
+
+    def resolve(self, history, passed):
+        """Record the verdict for the pending fixes (if any) and clear them"""
+        if not self.path.exists():
+            return None
+        with open(self.path) as f:
+            pending = json.load(f)
+        self.path.unlink()
+        cost = time.time() - pending["applied_at"]
+        history.record(pending["signature"], pending["fixes"], passed, cost_s=round(cost, 1),
+                       features=pending["features"], issues=pending["issues"])
+        return pending
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show learned fix rankings")
+    parser.add_argument("history", help=f"Path to {HISTORY_FILE}")
+    args = parser.parse_args()
+
+    history = FixHistory(args.history)
+    ranker = FixRanker(history)
+    signatures = defaultdict(set)
+    issues = {}
+    for r in history.outcomes():
+        signatures[r["signature"]].add(r["fix"])
+        issues[r["signature"]] = r.get("issues", [])
+
+    rejected = len(history.records) - len(history.outcomes())
+    print(f"📚 {len(history.outcomes())} fix outcome(s), {len(signatures)} signature(s), "
+          f"{rejected} pre-build rejection(s)")
+    for signature, fixes in signatures.items():
+        print(f"\n🔖 {signature}: {', '.join(issues[signature]) or '(no issues)'}")
+        excluded = ranker.known_failures(signature)
+        for entry in ranker.rank(signature, sorted(fixes)):
+            print(f"   {entry['fix']:<28} p={entry['success']:.2f} cost={entry['cost_s']:.0f}s "
+                  f"trials={entry['trials']}")
+        for fix in sorted(excluded):
+            print(f"   {fix:<28} ❌ known to fail")
+
+
+if __name__ == "__main__":
+    main()
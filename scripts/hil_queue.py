@@ -0,0 +1,405 @@
+#!/usr/bin/env python3
+"""
+MIPE_EV1 Hardware-in-the-Loop Job Queue
+SQLite-backed job queue plus a long-running worker daemon that accepts
+build/flash/capture/analyze jobs over a local socket and keeps devices,
+caches and imported modules warm between jobs
+"""
+
+import argparse
+import json
+import os
+import socket
+import socketserver
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import closing
+from pathlib import Path
+
+from tracing import tracer
+
+PROJECT_DIR = Path(r"C:\Development\MIPE_EV1")
+QUEUE_DB = PROJECT_DIR / "hil_jobs.sqlite3"
+SOCKET_PATH = PROJECT_DIR / "hil_worker.sock"
+TCP_PORT = 47815  # fallback where AF_UNIX sockets are unavailable
+JOB_KINDS = ("build", "flash", "capture", "analyze", "cycle")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    params TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',
+    submitted REAL NOT NULL,
+    started REAL,
+    finished REAL,
+    result TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id);
+"""
+
+
+class JobQueue:
+    """Persistent FIFO of HIL jobs; survives daemon restarts"""
+
+    def __init__(self, db_path=QUEUE_DB):
+        self.db_path = str(db_path)
+        with closing(self._connect()) as db:
+            db.executescript(_SCHEMA)
+
+    def _connect(self):
+        db = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        db.row_factory = sqlite3.Row
+        db.execute("PRAGMA journal_mode=WAL")
+        return db
+
+    def submit(self, kind, params=None):
+        if kind not in JOB_KINDS:
+            raise ValueError(f"Unknown job kind {kind!r} (expected one of {', '.join(JOB_KINDS)})")
+        with closing(self._connect()) as db:
+            cursor = db.execute("INSERT INTO jobs (kind, params, submitted) VALUES (?, ?, ?)",
+                                (kind, json.dumps(params or {}), time.time()))
+            return cursor.lastrowid
+
+    def claim(self):
+        """Atomically move the oldest queued job to 'running' and return it"""
+        db = self._connect()
+        try:
+            db.execute("BEGIN IMMEDIATE")
+            row = db.execute("SELECT * FROM jobs WHERE status = 'queued' ORDER BY id LIMIT 1").fetchone()
+            if row is None:
+                db.execute("COMMIT")
+                return None
+            db.execute("UPDATE jobs SET status = 'running', started = ? WHERE id = ?", (time.time(), row["id"]))
+            db.execute("COMMIT")
+            return self._decode(row)
+        finally:
+            db.close()
+
+    def complete(self, job_id, result):
+        self._finish(job_id, "done", result=json.dumps(result, default=str))
+
+    def fail(self, job_id, error):
+        self._finish(job_id, "failed", error=str(error))
+
+    def _finish(self, job_id, status, result=None, error=None):
+        with closing(self._connect()) as db:
+            db.execute("UPDATE jobs SET status = ?, finished = ?, result = ?, error = ? WHERE id = ?",
+                       (status, time.time(), result, error, job_id))
+
+    def requeue_interrupted(self):
+        """Jobs left 'running' by a crashed daemon go back to the queue"""
+        with closing(self._connect()) as db:
+            return db.execute("UPDATE jobs SET status = 'queued', started = NULL "
+                              "WHERE status = 'running'").rowcount
+
+    def get(self, job_id):
+        with closing(self._connect()) as db:
+            row = db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._decode(row) if row else None
+
+    def list(self, status=None, limit=20):
+        query = "SELECT * FROM jobs"
+        args = []
+        if status:
+            query += " WHERE status = ?"
+            args.append(status)
+        query += " ORDER BY id DESC LIMIT ?"
+        args.append(limit)
+        with closing(self._connect()) as db:
+            return [self._decode(row) for row in db.execute(query, args)]
+
+    @staticmethod
+    def _decode(row):
+        job = dict(row)
+        job["params"] = json.loads(job["params"])
+        if job["result"]:
+            job["result"] = json.loads(job["result"])
+        return job
+
+
+class WarmState:
+    """Everything worth keeping between jobs: imports, analyzer session, last capture"""
+
+    def __init__(self, project_dir, board, analyzer_backend="sigrok", replay_source=None):
+        from analyzer_automation import AnalyzerAutomation
+
+        self.project_dir = Path(project_dir)
+        self.board = board
+        self.automation = AnalyzerAutomation(project_dir=self.project_dir, decoder="native")
+        self.automation.open_session(analyzer_backend, replay_source=replay_source)
+        self.last_capture = None
+
+
+def _west(state, args, name):
+    result = tracer.run(["west"] + args, name=name, cwd=state.project_dir, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"west {args[0]} failed: {result.stderr.strip()[-2000:]}")
+    return {"returncode": result.returncode}
+
+
+def handle_build(state, params):
+    args = ["build", "-b", params.get("board", state.board)]
+    if params.get("pristine"):
+        args += ["-p", "always"]
+    return _west(state, args, "build")
+
+
+def handle_flash(state, params):
+    return _west(state, ["flash"], "flash")
+
+
+def handle_capture(state, params):
+    capture_file = state.automation.capture_spi_signals()
+    if capture_file is None:
+        raise RuntimeError("capture failed")
+    state.last_capture = capture_file
+    return {"capture_file": str(capture_file)}
+
+
+def handle_analyze(state, params):
+    capture_file = params.get("capture_file") or state.last_capture
+    if capture_file is None:
+        raise RuntimeError("no capture to analyze")
+    spi_data = state.automation.decode_spi_capture(Path(capture_file))
+    if spi_data is None:
+        raise RuntimeError("decode failed")
+    results = state.automation.validate_lsm6_communication(spi_data)
+    results.pop("raw_data")
+    results["passed"] = results["spi_activity"] and results["who_am_i_found"]
+    results["capture_file"] = str(capture_file)
+    return results
+
+
+def handle_cycle(state, params):
+    result = {"build": handle_build(state, params), "flash": handle_flash(state, params)}
+    result["capture"] = handle_capture(state, params)
+    result["analyze"] = handle_analyze(state, params)
+    result["passed"] = result["analyze"]["passed"]
+    return result
+
+
+HANDLERS = {
+    "build": handle_build,
+    "flash": handle_flash,
+    "capture": handle_capture,
+    "analyze": handle_analyze,
+    "cycle": handle_cycle,
+}
+
+
+class WorkerDaemon:
+    """Serves the control socket and executes queued jobs one at a time on warm state"""
+
+    def __init__(self, queue, state_factory, socket_path=SOCKET_PATH):
+        self.queue = queue
+        self.state_factory = state_factory
+        self.socket_path = Path(socket_path)
+        self.wakeup = threading.Event()
+        self.stopping = threading.Event()
+        self.state = None
+        self.server = None
+
+    def request(self, message):
+        """Handle one control request (runs on the socket server threads)"""
+        op = message.get("op")
+        if op == "submit":
+            job_id = self.queue.submit(message["kind"], message.get("params"))
+            self.wakeup.set()
+            return {"ok": True, "job_id": job_id}
+        if op == "status":
+            return {"ok": True, "job": self.queue.get(message["job_id"])}
+        if op == "wait":
+            deadline = time.monotonic() + message.get("timeout", 600)
+            while time.monotonic() < deadline:
+                job = self.queue.get(message["job_id"])
+                if job is None or job["status"] in ("done", "failed"):
+                    return {"ok": True, "job": job}
+                time.sleep(0.05)
+            return {"ok": False, "error": "timeout"}
+        if op == "list":
+            return {"ok": True, "jobs": self.queue.list(message.get("status"), message.get("limit", 20))}
+        if op == "ping":
+            return {"ok": True, "pid": os.getpid(), "warm": self.state is not None}
+        if op == "shutdown":
+            # The request handler stops the server once this reply is flushed
+            self.stopping.set()
+            self.wakeup.set()
+            return {"ok": True}
+        return {"ok": False, "error": f"unknown op {op!r}"}
+
+    def work(self):
+        """Job loop: warm state is created once and reused for every job"""
+        while not self.stopping.is_set():
+            job = self.queue.claim()
+            if job is None:
+                self.wakeup.wait(timeout=1.0)
+                self.wakeup.clear()
+                continue
+            print(f"▶️  Job {job['id']}: {job['kind']} {job['params']}")
+            try:
+                if self.state is None:
+                    with tracer.span("warm_state_init"):
+                        self.state = self.state_factory()
+                with tracer.span(f"job_{job['kind']}", job_id=job["id"]):
+                    result = HANDLERS[job["kind"]](self.state, job["params"])
+                self.queue.complete(job["id"], result)
+                print(f"✅ Job {job['id']} done")
+            except Exception as e:
+                self.queue.fail(job["id"], f"{type(e).__name__}: {e}")
+                print(f"❌ Job {job['id']} failed: {e}")
+
+    def serve(self):
+        requeued = self.queue.requeue_interrupted()
+        if requeued:
+            print(f"🔁 Requeued {requeued} job(s) interrupted by the previous daemon")
+        self.server = _make_server(self.socket_path, self)
+        worker = threading.Thread(target=self.work, daemon=True)
+        worker.start()
+        print(f"🛰️  HIL worker listening on {_describe(self.socket_path)}")
+        try:
+            self.server.serve_forever()
+        finally:
+            self.stopping.set()
+            self.wakeup.set()
+            worker.join(timeout=5)
+            self.server.server_close()
+            if hasattr(socket, "AF_UNIX") and self.socket_path.exists():
+                self.socket_path.unlink()
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """Newline-delimited JSON: one request line in, one response line out"""
+
+    def handle(self):
+        for line in self.rfile:
+            op = None
+            try:
+                message = json.loads(line)
+                op = message.get("op")
+                response = self.server.daemon.request(message)
+            except Exception as e:
+                response = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+            self.wfile.write((json.dumps(response, default=str) + "\n").encode("utf-8"))
+            self.wfile.flush()
+            if op == "shutdown" and response.get("ok"):
+                threading.Thread(target=self.server.shutdown, daemon=True).start()
+                return
+
+
+def _make_server(socket_path, daemon):
+    if hasattr(socket, "AF_UNIX"):
+        if socket_path.exists():
+            socket_path.unlink()
+        server = socketserver.ThreadingUnixStreamServer(str(socket_path), _RequestHandler)
+    else:
+        server = socketserver.ThreadingTCPServer(("127.0.0.1", TCP_PORT), _RequestHandler)
+    server.daemon_threads = True
+    server.daemon = daemon
+    return server
+
+
+def _describe(socket_path):
+    return str(socket_path) if hasattr(socket, "AF_UNIX") else f"127.0.0.1:{TCP_PORT}"
+
+
+class HILClient:
+    """Thin client for the worker daemon; one persistent connection"""
+
+    def __init__(self, socket_path=SOCKET_PATH):
+        if hasattr(socket, "AF_UNIX"):
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.connect(str(socket_path))
+        else:
+            self.sock = socket.create_connection(("127.0.0.1", TCP_PORT))
+        self.stream = self.sock.makefile("rwb")
+
+    def call(self, **message):
+        self.stream.write((json.dumps(message) + "\n").encode("utf-8"))
+        self.stream.flush()
+        return json.loads(self.stream.readline())
+
+    def submit(self, kind, **params):
+        return self.call(op="submit", kind=kind, params=params)["job_id"]
+
+    def status(self, job_id):
+        return self.call(op="status", job_id=job_id)["job"]
+
+    def wait(self, job_id, timeout=600):
+        return self.call(op="wait", job_id=job_id, timeout=timeout)
+
+    def close(self):
+        self.stream.close()
+        self.sock.close()
+
+
+def _parse_params(pairs):
+    """key=value pairs; JSON values (false, 3, null) are typed, anything else stays a string"""
+    params = {}
+    for pair in pairs or []:
+        key, _, value = pair.partition("=")
+        try:
+            params[key] = json.loads(value)
+        except ValueError:
+            params[key] = value
+    return params
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HIL job queue and worker daemon")
+    parser.add_argument("--db", default=str(QUEUE_DB))
+    parser.add_argument("--socket", default=str(SOCKET_PATH))
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    daemon = sub.add_parser("daemon", help="Run the worker daemon")
+    daemon.add_argument("--project-dir", default=str(PROJECT_DIR))
+    daemon.add_argument("--board", default="mipe_ev1_nrf54l15_cpuapp")
+    daemon.add_argument("--analyzer", default="sigrok", choices=["sigrok", "logic2", "replay"])
+    daemon.add_argument("--replay-source", help="Capture file/directory for the replay analyzer")
+
+    submit = sub.add_parser("submit", help="Queue a job")
+    submit.add_argument("kind", choices=JOB_KINDS)
+    submit.add_argument("--param", action="append", help="key=value job parameter")
+    submit.add_argument("--wait", action="store_true", help="Block until the job finishes")
+
+    status = sub.add_parser("status", help="Show one job")
+    status.add_argument("job_id", type=int)
+
+    sub.add_parser("list", help="Show recent jobs")
+    sub.add_parser("shutdown", help="Stop the daemon")
+
+    args = parser.parse_args()
+
+    if args.command == "daemon":
+        queue = JobQueue(args.db)
+        factory = lambda: WarmState(args.project_dir, args.board, args.analyzer, args.replay_source)
+        WorkerDaemon(queue, factory, args.socket).serve()
+        return 0
+
+    client = HILClient(args.socket)
+    try:
+        if args.command == "submit":
+            job_id = client.submit(args.kind, **_parse_params(args.param))
+            print(f"📥 Job {job_id} queued")
+            if args.wait:
+                job = client.wait(job_id).get("job")
+                print(json.dumps(job, indent=2))
+                return 0 if job and job["status"] == "done" else 1
+        elif args.command == "status":
+            print(json.dumps(client.status(args.job_id), indent=2))
+        elif args.command == "list":
+            for job in client.call(op="list")["jobs"]:
+                print(f"{job['id']:>6} {job['kind']:<8} {job['status']:<8} {job['error'] or ''}")
+        elif args.command == "shutdown":
+            client.call(op="shutdown")
+            print("🛑 Daemon stopping")
+    finally:
+        client.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
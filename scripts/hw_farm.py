@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""
+MIPE_EV1 Hardware Farm Scheduler
+Leases (debug probe, logic analyzer) slots to iteration jobs so one firmware
+build can be flashed and verified on several boards in parallel
+"""
+
+import argparse
+import json
+import random
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+from capture_planner import DEFAULT_SAMPLE_RATE
+from tracing import tracer
+
+FARM_CONFIG = Path(r"C:\Development\MIPE_EV1") / "farm_slots.json"
+MAX_SLOT_FAILURES = 2   # consecutive hardware errors before a slot is quarantined
+MAX_JOB_ATTEMPTS = 3    # a job is retried (on another slot unless pinned) at most this often
+
+
+class SlotFailure(Exception):
+    """Hardware problem with the slot itself (probe/analyzer), not the firmware"""
+
+
+class Slot:
+    """One bench position: an nRF debug probe and the analyzer wired to that board"""
+
+    def __init__(self, probe_serial, analyzer_conn, name=None):
+        self.probe_serial = str(probe_serial)
+        self.analyzer_conn = analyzer_conn
+        self.name = name or f"board-{self.probe_serial}"
+        self.failures = 0
+        self.quarantined = False
+        self.jobs_run = 0
+
+    def __repr__(self):
+        return f"Slot({self.name}, probe={self.probe_serial}, analyzer={self.analyzer_conn})"
+
+
+def list_probe_serials():
+    """Serial numbers of every connected J-Link probe (nrfjprog --ids)"""
+    result = subprocess.run(["nrfjprog", "--ids"], capture_output=True, text=True, timeout=10)
+    return [line.strip() for line in result.stdout.splitlines() if line.strip().isdigit()]
+
+
+def load_slots(config_file=FARM_CONFIG):
+    """
+    Pair connected probes with analyzers using farm_slots.json:
+    {"<probe serial>": {"analyzer": "fx2lafw:conn=3.22", "name": "bench-1"}, ...}
+    Probes without an entry are ignored; configured probes that are absent are skipped.
+    """
+    with open(config_file) as f:
+        config = json.load(f)
+    connected = set(list_probe_serials())
+    return [Slot(serial, entry["analyzer"], entry.get("name"))
+            for serial, entry in config.items() if serial in connected]
+
+
+class SlotPool:
+    """Thread-safe lease/release of healthy slots"""
+
+    def __init__(self, slots, max_failures=MAX_SLOT_FAILURES):
+        self.slots = list(slots)
+        self.max_failures = max_failures
+        self._free = list(self.slots)
+        self._condition = threading.Condition()
+
+    @property
+    def healthy(self):
+        return [s for s in self.slots if not s.quarantined]
+
+    def lease(self, timeout=None):
+        """Block until a healthy slot is free; None if every slot is quarantined or on timeout"""
+        with self._condition:
+            while not self._free:
+                if not self.healthy:
+                    return None
+                if not self._condition.wait(timeout):
+                    return None
+            return self._free.pop(0)
+
+    def release(self, slot, failed=False, used=True):
+        """Return a slot; a failure counts towards quarantine, a clean run resets the count"""
+        with self._condition:
+            if failed:
+                slot.failures += 1
+                if slot.failures >= self.max_failures:
+                    slot.quarantined = True
+                    print(f"🚫 {slot.name} quarantined after {slot.failures} hardware failures")
+            elif used:
+                slot.failures = 0
+            if not slot.quarantined:
+                self._free.append(slot)
+            self._condition.notify_all()
+
+
+class FarmJob:
+    """
+    Flash one firmware image on a slot and return its hardware verdict. A job
+    pinned to a probe serial only ever runs on that slot, retries included.
+    """
+
+    def __init__(self, job_id, hex_file, label=None, slot=None):
+        self.job_id = job_id
+        self.hex_file = hex_file
+        self.label = label or job_id
+        self.slot = None if slot is None else str(slot)
+        self.attempts = 0
+        self.slot_history = []
+
+
+class HardwareRunner:
+    """Real slot runner: nrfjprog flash by serial, sigrok capture by connection, native decode"""
+
+    def __init__(self, captures_dir, samplerate=DEFAULT_SAMPLE_RATE, duration="5s", sigrok_cli="sigrok-cli"):
+        self.captures_dir = Path(captures_dir)
+        self.captures_dir.mkdir(parents=True, exist_ok=True)
+        self.samplerate = samplerate
+        self.duration = duration
+        self.sigrok_cli = sigrok_cli
+
+    def __call__(self, job, slot):
+        from analyzer_automation import check_lsm6_rows
+        from logic_capture import decode_spi_file, spi_annotations
+
+        flash = tracer.run(["nrfjprog", "--snr", slot.probe_serial, "--program", str(job.hex_file),
+                            "--sectorerase", "--verify", "--reset"],
+                           name="farm_flash", capture_output=True, text=True)
+        if flash.returncode != 0:
+            raise SlotFailure(f"flash failed on {slot.name}: {flash.stderr.strip()}")
+
+        capture_file = self.captures_dir / f"{job.job_id}_{slot.probe_serial}.sr"
+        capture = tracer.run([self.sigrok_cli, "-d", slot.analyzer_conn,
+                              "-c", f"samplerate={self.samplerate}",
+                              "-t", f"time={self.duration}", "-o", str(capture_file)],
+                             name="farm_capture", capture_output=True, text=True)
+        if capture.returncode != 0:
+            raise SlotFailure(f"capture failed on {slot.name}: {capture.stderr.strip()}")
+
+        sr, transactions = decode_spi_file(capture_file)
+        results = check_lsm6_rows(spi_annotations(transactions, sr.samplerate))
+        results.pop("raw_data")
+        results["passed"] = results["spi_activity"] and results["who_am_i_found"]
+        results["capture_file"] = str(capture_file)
+        return results
+
+
+class SimulatedRunner:
+    """Stand-in runner for scheduler testing without hardware"""
+
+    def __init__(self, duration=0.05, slot_failure_rate=0.0, pass_rate=1.0, broken_slots=(), seed=None):
+        self.duration = duration
+        self.slot_failure_rate = slot_failure_rate
+        self.pass_rate = pass_rate
+        self.broken_slots = set(broken_slots)
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def __call__(self, job, slot):
+        time.sleep(self.duration)
+        with self._lock:
+            roll_slot = self._random.random()
+            roll_pass = self._random.random()
+        if slot.name in self.broken_slots or roll_slot < self.slot_failure_rate:
+            raise SlotFailure(f"simulated hardware fault on {slot.name}")
+        return {"passed": roll_pass < self.pass_rate, "simulated": True}
+
+
+class FarmScheduler:
+    """
+    Runs jobs on every healthy slot concurrently; each free slot takes the
+    first pending job allowed on it. A SlotFailure requeues the job and counts
+    against the slot: an unpinned job prefers a slot it has not failed on, a
+    pinned job keeps its pin and fails once its slot is quarantined. Any other
+    outcome, including a runner exception, is the job's result.
+    """
+
+    def __init__(self, pool, runner, max_attempts=MAX_JOB_ATTEMPTS):
+        self.pool = pool
+        self.runner = runner
+        self.max_attempts = max_attempts
+
+    def run(self, jobs):
+        pending = list(jobs)
+        results = {}
+        remaining = [len(jobs)]
+        lock = threading.RLock()
+
+        def finish(job, record):
+            with lock:
+                results[job.job_id] = record
+                remaining[0] -= 1
+
+        def allowed(job, slot, healthy):
+            if job.slot is not None:
+                return job.slot == slot.probe_serial
+            # Retry on a board this job has not failed on yet, if any is left
+            return (slot.name not in job.slot_history
+                    or all(s.name in job.slot_history for s in healthy))
+
+        def take(slot):
+            """First pending job allowed on slot; fails jobs whose pinned slot is gone"""
+            with lock:
+                healthy = self.pool.healthy
+                serials = {s.probe_serial for s in healthy}
+                for job in [j for j in pending if j.slot is not None and j.slot not in serials]:
+                    pending.remove(job)
+                    finish(job, {"job": job.label, "error": f"pinned slot {job.slot} quarantined",
+                                 "attempts": job.attempts, "slots": job.slot_history})
+                for job in pending:
+                    if allowed(job, slot, healthy):
+                        pending.remove(job)
+                        return job
+                return None
+
+        def worker():
+            while True:
+                with lock:
+                    if remaining[0] == 0:
+                        return
+                slot = self.pool.lease(timeout=0.1)
+                if slot is None:
+                    if not self.pool.healthy:
+                        with lock:
+                            while pending:
+                                job = pending.pop(0)
+                                finish(job, {"job": job.label, "error": "no healthy slots",
+                                             "attempts": job.attempts})
+                    continue
+                job = take(slot)
+                if job is None:
+                    # Nothing pending may run here; leave the slot to the jobs in flight
+                    self.pool.release(slot, used=False)
+                    time.sleep(0.01)
+                    continue
+
+                job.attempts += 1
+                job.slot_history.append(slot.name)
+                start = time.perf_counter()
+                try:
+                    with tracer.span("farm_job", job=job.label, slot=slot.name, attempt=job.attempts):
+                        outcome = self.runner(job, slot)
+                except SlotFailure as e:
+                    self.pool.release(slot, failed=True)
+                    print(f"⚠️  {job.label} on {slot.name}: {e}")
+                    if job.attempts >= self.max_attempts:
+                        finish(job, {"job": job.label, "error": str(e), "attempts": job.attempts,
+                                     "slots": job.slot_history})
+                    else:
+                        with lock:
+                            pending.append(job)
+                    continue
+                except Exception as e:
+                    # A runner bug is the job's result, not a hardware fault
+                    self.pool.release(slot, used=False)
+                    print(f"❌ {job.label} on {slot.name}: {e}")
+                    finish(job, {"job": job.label, "error": f"{type(e).__name__}: {e}",
+                                 "attempts": job.attempts, "slots": job.slot_history})
+                    continue
+                slot.jobs_run += 1
+                self.pool.release(slot)
+                finish(job, dict(outcome, job=job.label, slot=slot.name, attempts=job.attempts,
+                                 seconds=round(time.perf_counter() - start, 3)))
+                status = "✅" if outcome.get("passed") else "❌"
+                print(f"{status} {job.label} on {slot.name}")
+
+        threads = [threading.Thread(target=worker, daemon=True) for _ in self.pool.slots]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return [results[job.job_id] for job in jobs]
+
+
+def build_once_test_many(build, pool, runner, repeats=1):
+    """
+    Build a single image with build() -> hex path, then verify it on every
+    healthy slot `repeats` times in parallel; each job is pinned to its board
+    """
+    with tracer.span("farm_build"):
+        hex_file = build()
+    if hex_file is None:
+        return None
+    jobs = [FarmJob(f"{slot.probe_serial}_{n}", hex_file, label=f"{slot.name}#{n}", slot=slot.probe_serial)
+            for n in range(repeats) for slot in pool.healthy]
+    return FarmScheduler(pool, runner).run(jobs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run one firmware image across the hardware farm")
+    parser.add_argument("--hex", default="build/zephyr/zephyr.hex", help="Firmware image to test")
+    parser.add_argument("--config", default=str(FARM_CONFIG), help="Probe-to-analyzer slot map")
+    parser.add_argument("--repeats", type=int, default=1, help="Test runs per board")
+    parser.add_argument("--simulate", type=int, metavar="N", help="Use N simulated slots instead of hardware")
+    parser.add_argument("--fault-rate", type=float, default=0.1, help="Simulated slot fault probability")
+    args = parser.parse_args()
+
+    if args.simulate:
+        slots = [Slot(f"10000000{i}", f"sim:{i}", f"sim-{i}") for i in range(args.simulate)]
+        runner = SimulatedRunner(slot_failure_rate=args.fault_rate, pass_rate=0.9)
+    else:
+        slots = load_slots(args.config)
+        runner = HardwareRunner(Path(args.config).parent / "analyzer_captures")
+
+    if not slots:
+        print("❌ No farm slots available")
+        return 1
+
+    print(f"🏭 Farm: {len(slots)} slot(s): {', '.join(s.name for s in slots)}")
+    pool = SlotPool(slots)
+    start = time.perf_counter()
+    results = build_once_test_many(lambda: Path(args.hex), pool, runner, args.repeats)
+    elapsed = time.perf_counter() - start
+
+    passed = sum(1 for r in results if r.get("passed"))
+    errors = sum(1 for r in results if "error" in r)
+    print(f"\n📊 {passed}/{len(results)} passed, {errors} hardware error(s) in {elapsed:.1f}s")
+    for slot in slots:
+        state = "QUARANTINED" if slot.quarantined else "ok"
+        print(f"   {slot.name:<16} jobs={slot.jobs_run} failures={slot.failures} {state}")
+    return 0 if passed == len(results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+MIPE AI Iteration Snapshots
+Records the source/config files of every AI iteration as content-addressed
+blobs plus a small manifest, restores any iteration instantly and promotes
+only the final state to a git commit. Only the tracked inputs are visited
+and unchanged files are recognised by (size, mtime), so a snapshot costs
+milliseconds however large the working tree (captures, logs, builds) grows.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+SNAPSHOT_DIR = ".ai_snapshots"
+# Files an iteration can change, relative to the project root
+SNAPSHOT_INPUTS = (
+    "CMakeLists.txt",
+    "prj.conf",
+    "*.conf",
+    "*.overlay",
+    "Kconfig*",
+    "src/**/*",
+    "boards/**/*",
+    "fix_overlays/active.json",
+)
+
+
+def _atomic_write(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+class SnapshotStore:
+    """<project>/.ai_snapshots/{objects/<sha>, snapshots/<id>.json, index.json}"""
+
+    def __init__(self, project_root, patterns=SNAPSHOT_INPUTS):
+        self.project_root = Path(project_root)
+        self.root = self.project_root / SNAPSHOT_DIR
+        self.patterns = patterns
+        self._index = None   # relative path -> [size, mtime_ns, sha256]
+
+    # -- blobs -------------------------------------------------------------
+
+    def _object(self, sha):
+        return self.root / "objects" / sha[:2] / sha[2:]
+
+    def _store_blob(self, data):
+        sha = hashlib.sha256(data).hexdigest()
+        obj = self._object(sha)
+        if not obj.exists():
+            _atomic_write(obj, data)
+        return sha
+
+    def read_blob(self, sha):
+        return self._object(sha).read_bytes()
+
+    # -- working tree ------------------------------------------------------
+
+    @property
+    def index(self):
+        if self._index is None:
+            try:
+                with open(self.root / "index.json") as f:
+                    self._index = json.load(f)
+            except (OSError, ValueError):
+                self._index = {}
+        return self._index
+
+    def _save_index(self):
+        _atomic_write(self.root / "index.json", json.dumps(self.index).encode("utf-8"))
+
+    def tracked_files(self, extra_files=()):
+        files = set()
+        for pattern in self.patterns:
+            files.update(p for p in self.project_root.glob(pattern) if p.is_file())
+        files.update(Path(p) for p in extra_files if Path(p).is_file())
+        return sorted(p.relative_to(self.project_root).as_posix() for p in files)
+
+    def _hash_file(self, relative):
+        """sha256 of a tracked file, re-reading it only if its size or mtime moved"""
+        path = self.project_root / relative
+        stat = path.stat()
+        cached = self.index.get(relative)
+        if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+            return cached[2], False
+        sha = self._store_blob(path.read_bytes())
+        self.index[relative] = [stat.st_size, stat.st_mtime_ns, sha]
+        return sha, True
+
+    # -- snapshots ---------------------------------------------------------
+
+    def snapshots(self):
+        directory = self.root / "snapshots"
+        if not directory.exists():
+            return []
+        return sorted(int(p.stem) for p in directory.glob("*.json"))
+
+    def manifest(self, snapshot_id=None):
+        ids = self.snapshots()
+        if not ids:
+            return None
+        snapshot_id = ids[-1] if snapshot_id is None else int(snapshot_id)
+        with open(self.root / "snapshots" / f"{snapshot_id:06d}.json") as f:
+            return json.load(f)
+
+    def snapshot(self, label, extra_files=(), **meta):
+        """Record the tracked files; returns the manifest (files unchanged since the last one cost a stat)"""
+        start = time.perf_counter()
+        parent = self.manifest()
+        files = {}
+        rehashed = 0
+        for relative in self.tracked_files(extra_files):
+            files[relative], read = self._hash_file(relative)
+            rehashed += read
+        self._save_index()
+
+        previous = parent["files"] if parent else {}
+        changed = sorted(p for p in files if previous.get(p) != files[p])
+        removed = sorted(p for p in previous if p not in files)
+        snapshot_id = (parent["id"] + 1) if parent else 1
+        manifest = dict(meta, id=snapshot_id, label=label, parent=parent["id"] if parent else None,
+                        time=time.time(), files=files, changed=changed, removed=removed,
+                        seconds=round(time.perf_counter() - start, 4), rehashed=rehashed)
+        _atomic_write(self.root / "snapshots" / f"{snapshot_id:06d}.json",
+                      json.dumps(manifest, indent=2).encode("utf-8"))
+        return manifest
+
+    def restore(self, snapshot_id):
+        """Make the tracked files match a snapshot; returns (written, removed) paths"""
+        target = self.manifest(snapshot_id)
+        if target is None:
+            raise KeyError(f"No snapshot {snapshot_id}")
+        written, removed = [], []
+        for relative, sha in target["files"].items():
+            path = self.project_root / relative
+            current = self._hash_file(relative)[0] if path.exists() else None
+            if current != sha:
+                _atomic_write(path, self.read_blob(sha))
+                stat = path.stat()
+                self.index[relative] = [stat.st_size, stat.st_mtime_ns, sha]
+                written.append(relative)
+        ever_tracked = self._ever_tracked()
+        for relative in self.tracked_files():
+            if relative not in target["files"] and relative in ever_tracked:
+                (self.project_root / relative).unlink()
+                self.index.pop(relative, None)
+                removed.append(relative)
+        self._save_index()
+        return written, removed
+
+    def checkout(self, snapshot_id, directory):
+        """
+        Write a snapshot's files into another directory (e.g. a private build
+        tree) without touching the working tree; unchanged files keep their
+        mtime so an incremental build there stays incremental
+        """
+        target = self.manifest(snapshot_id)
+        if target is None:
+            raise KeyError(f"No snapshot {snapshot_id}")
+        directory = Path(directory)
+        for relative in self._ever_tracked():
+            path = directory / relative
+            if relative not in target["files"] and path.exists():
+                path.unlink()
+        for relative, sha in target["files"].items():
+            path = directory / relative
+            data = self.read_blob(sha)
+            if not path.exists() or path.read_bytes() != data:
+                _atomic_write(path, data)
+        return target
+
+    def _ever_tracked(self):
+        """Paths recorded in any snapshot - untracked user files are never deleted by restore"""
+        paths = set()
+        for snapshot_id in self.snapshots():
+            paths.update(self.manifest(snapshot_id)["files"])
+        return paths
+
+    def diff(self, a, b):
+        """{path: 'added'|'removed'|'modified'} between two snapshots"""
+        files_a, files_b = self.manifest(a)["files"], self.manifest(b)["files"]
+        changes = {}
+        for path in sorted(set(files_a) | set(files_b)):
+            if path not in files_a:
+                changes[path] = "added"
+            elif path not in files_b:
+                changes[path] = "removed"
+            elif files_a[path] != files_b[path]:
+                changes[path] = "modified"
+        return changes
+
+    def promote(self, snapshot_id, message):
+        """
+        Commit a snapshot's state to git. Only paths the snapshots touched are
+        staged, so git never scans captures, logs or build output.
+        """
+        self.restore(snapshot_id)
+        paths = sorted(self._ever_tracked())
+        present = [p for p in paths if (self.project_root / p).exists()]
+        gone = [p for p in paths if not (self.project_root / p).exists()]
+        if present:
+            subprocess.run(["git", "add", "--", *present], cwd=self.project_root, check=True,
+                           capture_output=True)
+        if gone:
+            # Only deletions of files git knows about belong in the commit
+            gone = subprocess.run(["git", "ls-files", "--", *gone], cwd=self.project_root,
+                                  capture_output=True, text=True, check=True).stdout.split()
+        if gone:
+            subprocess.run(["git", "rm", "--cached", "-q", "--", *gone], cwd=self.project_root, check=True,
+                           capture_output=True)
+        result = subprocess.run(["git", "commit", "-m", message, "--", *present, *gone],
+                                cwd=self.project_root, capture_output=True, text=True)
+        if result.returncode != 0:
+            return None
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=self.project_root,
+                              capture_output=True, text=True, check=True).stdout.strip()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AI iteration snapshots")
+    parser.add_argument("--project-dir", default=str(Path(__file__).resolve().parent.parent))
+    sub = parser.add_subparsers(dest="command")
+    sub.add_parser("list", help="List snapshots")
+    take = sub.add_parser("take", help="Snapshot the tracked files now")
+    take.add_argument("label")
+    show = sub.add_parser("show", help="Files in a snapshot")
+    show.add_argument("id", type=int)
+    restore = sub.add_parser("restore", help="Restore the tracked files of a snapshot")
+    restore.add_argument("id", type=int)
+    diff = sub.add_parser("diff", help="Files that differ between two snapshots")
+    diff.add_argument("a", type=int)
+    diff.add_argument("b", type=int)
+    promote = sub.add_parser("promote", help="Commit a snapshot to git")
+    promote.add_argument("id", type=int)
+    promote.add_argument("-m", "--message", required=True)
+    args = parser.parse_args()
+
+    store = SnapshotStore(args.project_dir)
+    if args.command == "take":
+        manifest = store.snapshot(args.label)
+        print(f"📸 Snapshot {manifest['id']}: {len(manifest['changed'])} changed, "
+              f"{manifest['rehashed']} rehashed in {manifest['seconds'] * 1000:.1f} ms")
+    elif args.command == "show":
+        manifest = store.manifest(args.id)
+        print(f"📸 {manifest['id']} {manifest['label']}")
+        for path, sha in sorted(manifest["files"].items()):
+            print(f"   {sha[:12]} {path}")
+    elif args.command == "restore":
+        written, removed = store.restore(args.id)
+        print(f"⏪ Restored snapshot {args.id}: {len(written)} written, {len(removed)} removed")
+    elif args.command == "diff":
+        for path, change in store.diff(args.a, args.b).items():
+            print(f"   {change:<9} {path}")
+    elif args.command == "promote":
+        sha = store.promote(args.id, args.message)
+        if sha is None:
+            print("❌ Nothing to commit")
+            return 1
+        print(f"✅ Promoted snapshot {args.id} to {sha[:10]}")
+    else:
+        for snapshot_id in store.snapshots():
+            manifest = store.manifest(snapshot_id)
+            stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(manifest["time"]))
+            print(f"📸 {snapshot_id:>4} {stamp} {manifest['label']} "
+                  f"({len(manifest['changed'])} changed, {len(manifest['removed'])} removed)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+MIPE Effective Kconfig Resolver
+Merges board Kconfig.defconfig defaults, the board _defconfig, prj.conf,
+board-specific .conf files and extra fragments the way the Zephyr build
+layers them, with per-symbol provenance, without running CMake.
+
+Only assignments are resolved: `depends on`/`select` and defaults from the
+Zephyr tree itself are not evaluated, so a symbol nobody assigns is reported
+as unset rather than at its Kconfig default.
+"""
+
+import argparse
+import hashlib
+import os
+import re
+import sys
+from pathlib import Path
+
+BOARD_VENDOR_DIR = "nordic"
+
+_ASSIGNMENT = re.compile(r"^(CONFIG_\w+)=(.*)$")
+_NOT_SET = re.compile(r"^#\s*(CONFIG_\w+) is not set")
+_KCONFIG_IF = re.compile(r"^if\s+(\w+)")
+_KCONFIG_ENDIF = re.compile(r"^endif\b")
+_KCONFIG_CONFIG = re.compile(r"^(?:menu)?config\s+(\w+)")
+_KCONFIG_DEFAULT = re.compile(r"^default\s+(.+?)(?:\s+if\s+(\w+))?$")
+
+
+def parse_fragment(text):
+    """[(line, symbol, value)] from a .conf/_defconfig fragment"""
+    assignments = []
+    for number, raw in enumerate(text.splitlines(), 1):
+        line = raw.strip()
+        match = _ASSIGNMENT.match(line)
+        if match:
+            value = match.group(2).split(" #")[0].strip()
+            assignments.append((number, match.group(1), value))
+            continue
+        match = _NOT_SET.match(line)
+        if match:
+            assignments.append((number, match.group(1), "n"))
+    return assignments
+
+
+def parse_kconfig_defaults(text):
+    """
+    [(line, symbol, value, conditions)] for `default` lines in a
+    Kconfig.defconfig; conditions are the enclosing `if` symbols plus any
+    trailing `if SYMBOL` on the default itself
+    """
+    defaults = []
+    conditions = []
+    symbol = None
+    for number, raw in enumerate(text.splitlines(), 1):
+        line = raw.strip()
+        if not line or line.startswith("#"):
+            continue
+        if _KCONFIG_ENDIF.match(line):
+            if conditions:
+                conditions.pop()
+            symbol = None
+            continue
+        match = _KCONFIG_IF.match(line)
+        if match:
+            conditions.append(match.group(1))
+            symbol = None
+            continue
+        match = _KCONFIG_CONFIG.match(line)
+        if match:
+            symbol = match.group(1)
+            continue
+        match = _KCONFIG_DEFAULT.match(line)
+        if match and symbol:
+            extra = [match.group(2)] if match.group(2) else []
+            defaults.append((number, f"CONFIG_{symbol}", match.group(1).strip(), conditions + extra))
+    return defaults
+
+
+class EffectiveConfig:
+    """Merged symbol values with the assignment history that produced each one"""
+
+    def __init__(self):
+        self.values = {}
+        self.provenance = {}   # symbol -> [(file, line, value, layer)], weakest first
+
+    def assign(self, symbol, value, source, line, layer):
+        self.values[symbol] = value
+        self.provenance.setdefault(symbol, []).append((str(source), line, value, layer))
+
+    @staticmethod
+    def _symbol(name):
+        return name if name.startswith("CONFIG_") else f"CONFIG_{name}"
+
+    def get(self, name, default=None):
+        return self.values.get(self._symbol(name), default)
+
+    def is_enabled(self, name):
+        return self.get(name) == "y"
+
+    def source(self, name):
+        """(file, line, value, layer) of the assignment that won, or None"""
+        history = self.provenance.get(self._symbol(name))
+        return history[-1] if history else None
+
+    def overridden(self):
+        """Symbols whose value was changed by a later layer: {symbol: history}"""
+        return {symbol: history for symbol, history in self.provenance.items()
+                if len({value for _, _, value, _ in history}) > 1}
+
+    def explain(self, name):
+        symbol = self._symbol(name)
+        history = self.provenance.get(symbol)
+        if not history:
+            return f"{symbol} is not assigned"
+        lines = [f"{symbol}={self.values[symbol]}"]
+        for source, line, value, layer in history:
+            lines.append(f"   {layer:<10} {source}:{line} -> {value}")
+        return "\n".join(lines)
+
+
+class KconfigResolver:
+    """
+    Resolves the effective configuration for a project/board. Parsed files are
+    cached by (mtime, size); a changed mtime with identical content (e.g. a
+    checkout or diff-aware generator touch) is caught by a content hash.
+    """
+
+    def __init__(self):
+        self._cache = {}   # path -> (mtime_ns, size, sha256, parsed)
+        self.stats = {"parsed": 0, "cached": 0}
+
+    def _parsed(self, path, parser):
+        path = Path(path)
+        stat = path.stat()
+        cached = self._cache.get(path)
+        if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+            self.stats["cached"] += 1
+            return cached[3]
+        data = path.read_bytes()
+        digest = hashlib.sha256(data).hexdigest()
+        if cached and cached[2] == digest:
+            self._cache[path] = (stat.st_mtime_ns, stat.st_size, digest, cached[3])
+            self.stats["cached"] += 1
+            return cached[3]
+        parsed = parser(data.decode("utf-8", errors="replace"))
+        self._cache[path] = (stat.st_mtime_ns, stat.st_size, digest, parsed)
+        self.stats["parsed"] += 1
+        return parsed
+
+    @staticmethod
+    def layers(project_dir, board="mipe_ev1", extra_files=()):
+        """
+        (layer, path) in merge order, weakest first:
+        Kconfig.defconfig defaults, board _defconfig, prj.conf,
+        app boards/<board target>.conf, then extra fragments (EXTRA_CONF_FILE)
+        """
+        project_dir = Path(project_dir)
+        board_dir = project_dir / "boards" / BOARD_VENDOR_DIR / board
+        found = []
+        if (board_dir / "Kconfig.defconfig").exists():
+            found.append(("kconfig", board_dir / "Kconfig.defconfig"))
+        defconfigs = sorted(board_dir.glob("*_defconfig"))
+        found += [("defconfig", path) for path in defconfigs]
+        if (project_dir / "prj.conf").exists():
+            found.append(("prj", project_dir / "prj.conf"))
+        for defconfig in defconfigs:
+            target = defconfig.name[:-len("_defconfig")]
+            board_conf = project_dir / "boards" / f"{target}.conf"
+            if board_conf.exists():
+                found.append(("board_conf", board_conf))
+        found += [("extra", Path(path)) for path in extra_files]
+        return found
+
+    def resolve(self, project_dir, board="mipe_ev1", extra_files=()):
+        config = EffectiveConfig()
+        for layer, path in self.layers(project_dir, board, extra_files):
+            if layer == "kconfig":
+                for line, symbol, value, conditions in self._parsed(path, parse_kconfig_defaults):
+                    # Board-guarded defaults apply: the board symbol is selected by building for it
+                    if all(c.startswith("BOARD_") or config.is_enabled(c) for c in conditions):
+                        if symbol not in config.values:
+                            config.assign(symbol, value, path, line, layer)
+            else:
+                for line, symbol, value in self._parsed(path, parse_fragment):
+                    config.assign(symbol, value, path, line, layer)
+        return config
+
+
+_default_resolver = KconfigResolver()
+
+
+def resolve_config(project_dir, board="mipe_ev1", extra_files=()):
+    """Effective configuration using the process-wide parse cache"""
+    return _default_resolver.resolve(project_dir, board, extra_files)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show the effective Kconfig for a project without CMake")
+    parser.add_argument("--project-dir", default=str(Path(__file__).resolve().parent.parent))
+    parser.add_argument("--board", default="mipe_ev1")
+    parser.add_argument("--extra", action="append", default=[], help="Extra .conf fragment (repeatable)")
+    parser.add_argument("symbols", nargs="*", help="Explain these symbols (default: print everything)")
+    args = parser.parse_args()
+
+    config = resolve_config(args.project_dir, args.board, args.extra)
+    if args.symbols:
+        for symbol in args.symbols:
+            print(config.explain(symbol))
+        return 0
+
+    for layer, path in KconfigResolver.layers(args.project_dir, args.board, args.extra):
+        print(f"📄 {layer:<10} {os.path.relpath(path, args.project_dir)}")
+    print()
+    for symbol in sorted(config.values):
+        source, line, _, layer = config.source(symbol)
+        assignment = f"{symbol}={config.values[symbol]}"
+        print(f"{assignment:<48} # {layer} {Path(source).name}:{line}")
+    overridden = config.overridden()
+    if overridden:
+        print(f"\n⚠️  {len(overridden)} symbol(s) overridden by a later layer:")
+        for symbol in sorted(overridden):
+            print(config.explain(symbol))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,398 @@
+#!/usr/bin/env python3
+"""
+MIPE_EV1 Logic Capture Engine
+In-process sigrok .sr (and .vcd, see vcd_capture.py) loading, edge
+extraction and SPI decoding
+"""
+
+import configparser
+import json
+import re
+import zipfile
+from collections import namedtuple
+from itertools import chain, islice
+from pathlib import Path
+
+DEFAULT_CHANNEL_MAP = {"clk": 0, "mosi": 1, "miso": 2, "cs": 3}
+
+# One decoded SPI transfer: CS assert sample, CS release sample, bytes each way
+SpiTransaction = namedtuple("SpiTransaction", ["start", "end", "mosi", "miso"])
+
+# Runs of identical bytes - lets the regex engine skip idle stretches in C
+_RUN_RE = re.compile(rb"(.)\1*", re.S)
+
+_RATE_UNITS = {"": 1, "k": 1_000, "m": 1_000_000, "g": 1_000_000_000}
+
+# Archive member listing the trigger windows of a windowed capture (capture_trigger.py)
+WINDOWS_MEMBER = "windows"
+BATCH = 65536
+
+
+def parse_samplerate(text):
+    """Convert '25M', '25 MHz' or '25000000' into samples per second"""
+    match = re.fullmatch(r"\s*([\d.]+)\s*([kKmMgG]?)(?:hz|Hz|HZ)?\s*", str(text))
+    if not match:
+        raise ValueError(f"Unrecognised sample rate: {text!r}")
+    return int(float(match.group(1)) * _RATE_UNITS[match.group(2).lower()])
+
+
+def format_samplerate(rate):
+    """Format samples per second the way sigrok metadata does"""
+    for suffix, scale in (("GHz", 1_000_000_000), ("MHz", 1_000_000), ("kHz", 1_000)):
+        if rate >= scale and rate % scale == 0:
+            return f"{rate // scale} {suffix}"
+    return f"{rate} Hz"
+
+
+class SrCapture:
+    """
+    Read-only view of a sigrok session file (.sr zip archive). A windowed
+    capture (trigger windows stored back to back) lists its windows in the
+    archive; iter_segments() then yields one segment per window, indexed in
+    capture samples, so nothing is decoded across a window join.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with zipfile.ZipFile(self.path) as archive:
+            metadata = archive.read("metadata").decode("utf-8")
+            names = archive.namelist()
+            # [{'capture_start', 'file_start', 'length'}, ...] or None for a continuous capture
+            self.windows = None
+            if WINDOWS_MEMBER in names:
+                self.windows = json.loads(archive.read(WINDOWS_MEMBER))["windows"]
+
+        parser = configparser.ConfigParser(interpolation=None)
+        parser.read_string(metadata)
+        device = parser["device 1"]
+
+        self.samplerate = parse_samplerate(device.get("samplerate", "0"))
+        self.unitsize = int(device.get("unitsize", "1"))
+        self.capturefile = device.get("capturefile", "logic-1")
+        total = int(device.get("total probes", "8"))
+        self.channels = [device.get(f"probe{i}", f"D{i - 1}") for i in range(1, total + 1)]
+
+        # Chunks are logic-1-1, logic-1-2, ... (or a single 'logic-1')
+        prefix = self.capturefile + "-"
+        chunks = [n for n in names if n.startswith(prefix) and n[len(prefix):].isdigit()]
+        chunks.sort(key=lambda n: int(n[len(prefix):]))
+        if not chunks and self.capturefile in names:
+            chunks = [self.capturefile]
+        self.chunk_names = chunks
+
+    def iter_chunks(self):
+        """Yield raw sample chunks in capture order without loading the whole file"""
+        with zipfile.ZipFile(self.path) as archive:
+            for name in self.chunk_names:
+                yield archive.read(name)
+
+    def _transitions(self, chunks, mask, start=0):
+        if mask is None:
+            return iter_transitions(chunks, self.unitsize, start)
+        if self.unitsize == 1:
+            # Clear the other channels first so their activity never reaches Python
+            table = bytes(value & mask for value in range(256))
+            return iter_transitions((chunk.translate(table) for chunk in chunks), 1, start)
+        return _masked(iter_transitions(chunks, self.unitsize, start), mask)
+
+    def iter_transitions(self, mask=None):
+        """
+        (sample_index, value) transitions, optionally only of the channels in
+        mask. For a windowed capture the indices are capture samples and every
+        window restarts with its first sample; use iter_segments() to decode.
+        """
+        if self.windows:
+            return chain.from_iterable(transitions for _, _, transitions in self.iter_segments(mask))
+        return self._transitions(self.iter_chunks(), mask)
+
+    def iter_segments(self, mask=None):
+        """
+        Yield (start_sample, end_sample, transitions) per contiguous stretch of
+        samples: the whole capture, or each trigger window in capture samples.
+        Each segment must be consumed before the next one is requested.
+        """
+        if not self.windows:
+            yield 0, self.total_samples, self._transitions(self.iter_chunks(), mask)
+            return
+        chunks = self.iter_chunks()
+        pending = b""
+        width = self.unitsize
+
+        def window_chunks(length):
+            nonlocal pending
+            remaining = length * width
+            while remaining:
+                if not pending:
+                    pending = next(chunks, b"")
+                    if not pending:
+                        return
+                piece, pending = pending[:remaining], pending[remaining:]
+                remaining -= len(piece)
+                yield piece
+
+        for window in self.windows:
+            start = window["capture_start"]
+            yield start, start + window["length"], self._transitions(window_chunks(window["length"]), mask, start)
+
+    @property
+    def total_samples(self):
+        with zipfile.ZipFile(self.path) as archive:
+            size = sum(archive.getinfo(name).file_size for name in self.chunk_names)
+        return size // self.unitsize
+
+
+def _masked(transitions, mask):
+    last = None
+    for index, value in transitions:
+        value &= mask
+        if value != last:
+            yield index, value
+            last = value
+
+
+def open_sr(path):
+    """Open a sigrok .sr capture"""
+    return SrCapture(path)
+
+
+def open_capture(path, samplerate=None):
+    """Open a .sr or .vcd capture; both offer samplerate, channels, iter_chunks and iter_transitions"""
+    if Path(path).suffix.lower() == ".vcd":
+        from vcd_capture import open_vcd
+        return open_vcd(path, samplerate)
+    return open_sr(path)
+
+
+def write_sr(path, chunks, samplerate, channels=8, unitsize=1, windows=None):
+    """
+    Write sample chunks to a sigrok .sr file, streaming one chunk at a time.
+    `windows` (see SrCapture) marks the samples as separate trigger windows.
+    """
+    path = Path(path)
+    total_samples = 0
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("version", "2")
+        for index, chunk in enumerate(chunks, start=1):
+            archive.writestr(f"logic-1-{index}", bytes(chunk))
+            total_samples += len(chunk) // unitsize
+        if windows is not None:
+            archive.writestr(WINDOWS_MEMBER, json.dumps({"windows": windows}))
+
+        probes = "\n".join(f"probe{i + 1}=D{i}" for i in range(channels))
+        archive.writestr("metadata", (
+            "[global]\n"
+            "sigrok version=0.5.2\n\n"
+            "[device 1]\n"
+            "capturefile=logic-1\n"
+            f"total probes={channels}\n"
+            f"samplerate={format_samplerate(parse_samplerate(samplerate))}\n"
+            "total analog=0\n"
+            f"{probes}\n"
+            f"unitsize={unitsize}\n"
+        ))
+    return total_samples
+
+
+def iter_transitions(chunks, unitsize=1, start=0):
+    """
+    Collapse a sample stream into (sample_index, value) transitions.
+    The first sample is always reported; afterwards only changes are.
+    Indices count from `start` so segments of a capture keep absolute positions.
+    """
+    offset = start
+    last = None
+    for chunk in chunks:
+        if unitsize == 1:
+            for match in _RUN_RE.finditer(chunk):
+                value = chunk[match.start()]
+                if value != last:
+                    yield offset + match.start(), value
+                    last = value
+            offset += len(chunk)
+        else:
+            samples = memoryview(chunk).cast("H" if unitsize == 2 else "I")
+            for i, value in enumerate(samples):
+                if value != last:
+                    yield offset + i, value
+                    last = value
+            offset += len(samples)
+
+
+class SpiDecoder:
+    """
+    Streaming SPI decoder working on sample transitions.
+    Mirrors sigrok's spi decoder: a transaction spans one CS assertion and
+    data bits are sampled on the leading (CPHA=0) or trailing (CPHA=1) edge.
+    """
+
+    def __init__(self, channel_map=None, cpol=0, cpha=0, wordsize=8, cs_active_low=True):
+        channel_map = channel_map or DEFAULT_CHANNEL_MAP
+        self.clk_bit = 1 << channel_map["clk"]
+        self.mosi_bit = 1 << channel_map["mosi"]
+        self.miso_bit = 1 << channel_map["miso"]
+        self.cs_bit = 1 << channel_map["cs"]
+        self.mask = self.clk_bit | self.mosi_bit | self.miso_bit | self.cs_bit
+        self.cs_active_low = cs_active_low
+        self.wordsize = wordsize
+        # Mode 0/3 sample on rising SCLK, mode 1/2 on falling SCLK
+        self.sample_on_rising = (cpol == cpha)
+
+        self._prev = None
+        self._start = None
+        self._mosi = bytearray()
+        self._miso = bytearray()
+        self._bits = 0
+        self._mosi_word = 0
+        self._miso_word = 0
+
+    def _cs_active(self, value):
+        return bool(value & self.cs_bit) != self.cs_active_low
+
+    def feed(self, transitions):
+        """Consume transitions, returning the transactions they complete"""
+        done = []
+        clk_bit, mosi_bit, miso_bit = self.clk_bit, self.mosi_bit, self.miso_bit
+        sample_level = clk_bit if self.sample_on_rising else 0
+        wordsize = self.wordsize
+        prev = self._prev
+
+        for index, value in transitions:
+            if prev is None:
+                prev = value
+                if self._cs_active(value):
+                    self._open(index)
+                continue
+
+            changed = prev ^ value
+            if changed & self.cs_bit:
+                if self._cs_active(value):
+                    self._open(index)
+                elif self._start is not None:
+                    done.append(self._close(index))
+            elif self._start is not None and changed & clk_bit and (value & clk_bit) == sample_level:
+                self._mosi_word = (self._mosi_word << 1) | (1 if value & mosi_bit else 0)
+                self._miso_word = (self._miso_word << 1) | (1 if value & miso_bit else 0)
+                self._bits += 1
+                if self._bits == wordsize:
+                    self._mosi.append(self._mosi_word & 0xFF)
+                    self._miso.append(self._miso_word & 0xFF)
+                    self._bits = self._mosi_word = self._miso_word = 0
+            prev = value
+
+        self._prev = prev
+        return done
+
+    def finish(self, end_sample):
+        """Flush a transaction still open when the capture (or window) ends; feeding again starts afresh"""
+        self._prev = None
+        if self._start is None:
+            return []
+        return [self._close(end_sample)]
+
+    def _open(self, index):
+        self._start = index
+        self._mosi = bytearray()
+        self._miso = bytearray()
+        self._bits = self._mosi_word = self._miso_word = 0
+
+    def _close(self, index):
+        transaction = SpiTransaction(self._start, index, bytes(self._mosi), bytes(self._miso))
+        self._start = None
+        return transaction
+
+
+def decode_spi_chunks(chunks, channel_map=None, unitsize=1, start=0, **options):
+    """Decode SPI transactions from an iterable of raw sample chunks"""
+    decoder = SpiDecoder(channel_map, **options)
+    transactions = []
+    end = start
+
+    def counted():
+        nonlocal end
+        for chunk in chunks:
+            end += len(chunk) // unitsize
+            yield chunk
+
+    transactions.extend(decoder.feed(iter_transitions(counted(), unitsize, start)))
+    transactions.extend(decoder.finish(end))
+    return transactions
+
+
+def feed_segments(capture, decoders):
+    """
+    Run decoders ({name: decoder}) over every segment of a capture, sharing
+    each batch of transitions; returns {name: records}. finish() at each
+    segment end closes open records, so a trigger-window join never stitches
+    two windows into one transaction.
+    """
+    mask = 0
+    for decoder in decoders.values():
+        mask |= decoder.mask
+    results = {name: [] for name in decoders}
+    for _, end, transitions in capture.iter_segments(mask):
+        while True:
+            batch = list(islice(transitions, BATCH))
+            if not batch:
+                break
+            for name, decoder in decoders.items():
+                results[name].extend(decoder.feed(batch))
+        for name, decoder in decoders.items():
+            results[name].extend(decoder.finish(end))
+    return results
+
+
+def decode_spi_file(capture_file, channel_map=None, **options):
+    """Decode SPI transactions from a .sr or .vcd capture file"""
+    capture = open_capture(capture_file)
+    transactions = feed_segments(capture, {"spi": SpiDecoder(channel_map, **options)})["spi"]
+    return capture, transactions
+
+
+def spi_annotations(transactions, samplerate):
+    """
+    Flatten transactions into the {'time', 'type', 'data'} rows produced by
+    AnalyzerAutomation._parse_spi_csv so existing validators can consume them
+    """
+    rows = []
+    for transaction in transactions:
+        time_s = f"{transaction.start / samplerate:.9f}"
+        for mosi, miso in zip(transaction.mosi, transaction.miso):
+            rows.append({'time': time_s, 'type': 'mosi-data', 'data': f"0x{mosi:02X}"})
+            rows.append({'time': time_s, 'type': 'miso-data', 'data': f"0x{miso:02X}"})
+    return rows
+
+
+def spi_frame_samples(mosi, miso, channel_map=None, samples_per_bit=25, idle_samples=1000):
+    """
+    Render one SPI mode-0 transfer (CS low, MSB first) as raw unitsize-1 samples,
+    framed by idle time with CS high. Used for synthetic workloads and replay.
+    """
+    channel_map = channel_map or DEFAULT_CHANNEL_MAP
+    clk = 1 << channel_map["clk"]
+    mosi_bit = 1 << channel_map["mosi"]
+    miso_bit = 1 << channel_map["miso"]
+    cs = 1 << channel_map["cs"]
+    half = max(1, samples_per_bit // 2)
+
+    frame = bytearray([cs]) * idle_samples
+    frame += bytes([0]) * half
+    for tx_byte, rx_byte in zip(mosi, miso):
+        for bit in range(7, -1, -1):
+            data = (mosi_bit if tx_byte >> bit & 1 else 0) | (miso_bit if rx_byte >> bit & 1 else 0)
+            frame += bytes([data]) * half
+            frame += bytes([data | clk]) * (samples_per_bit - half)
+    frame += bytes([0]) * half
+    return bytes(frame)
+
+
+def generate_spi_workload(total_samples, frame=None, chunk_size=4 * 1024 * 1024):
+    """Yield chunks of a repeating WHO_AM_I read pattern totalling total_samples"""
+    if frame is None:
+        frame = spi_frame_samples(b"\x8f\x00", b"\x00\x6c")
+    repeats = max(1, chunk_size // len(frame))
+    block = frame * repeats
+    remaining = total_samples
+    while remaining > 0:
+        chunk = block[:remaining]
+        remaining -= len(chunk)
+        yield chunk
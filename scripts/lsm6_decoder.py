@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+MIPE_EV1 LSM6DSO32 Register Decoder
+Maps decoded SPI transactions to LSM6DSO32 register accesses (auto-increment
+bursts included), tracks the configuration the host has written or read back,
+and measures the output data rate the firmware actually achieves from the
+timing of fresh gyro/accelerometer samples.
+"""
+
+import argparse
+import json
+import sys
+from collections import namedtuple
+
+# Register map (LSM6DSO32 datasheet, section 8)
+REGISTERS = {
+    0x01: "FUNC_CFG_ACCESS", 0x02: "PIN_CTRL",
+    0x07: "FIFO_CTRL1", 0x08: "FIFO_CTRL2", 0x09: "FIFO_CTRL3", 0x0A: "FIFO_CTRL4",
+    0x0B: "COUNTER_BDR_REG1", 0x0C: "COUNTER_BDR_REG2", 0x0D: "INT1_CTRL", 0x0E: "INT2_CTRL",
+    0x0F: "WHO_AM_I",
+    0x10: "CTRL1_XL", 0x11: "CTRL2_G", 0x12: "CTRL3_C", 0x13: "CTRL4_C", 0x14: "CTRL5_C",
+    0x15: "CTRL6_C", 0x16: "CTRL7_G", 0x17: "CTRL8_XL", 0x18: "CTRL9_XL", 0x19: "CTRL10_C",
+    0x1A: "ALL_INT_SRC", 0x1B: "WAKE_UP_SRC", 0x1C: "TAP_SRC", 0x1D: "D6D_SRC", 0x1E: "STATUS_REG",
+    0x20: "OUT_TEMP_L", 0x21: "OUT_TEMP_H",
+    0x22: "OUTX_L_G", 0x23: "OUTX_H_G", 0x24: "OUTY_L_G", 0x25: "OUTY_H_G", 0x26: "OUTZ_L_G", 0x27: "OUTZ_H_G",
+    0x28: "OUTX_L_A", 0x29: "OUTX_H_A", 0x2A: "OUTY_L_A", 0x2B: "OUTY_H_A", 0x2C: "OUTZ_L_A", 0x2D: "OUTZ_H_A",
+    0x35: "EMB_FUNC_STATUS_MAINPAGE", 0x36: "FSM_STATUS_A_MAINPAGE", 0x37: "FSM_STATUS_B_MAINPAGE",
+    0x39: "STATUS_MASTER_MAINPAGE", 0x3A: "FIFO_STATUS1", 0x3B: "FIFO_STATUS2",
+    0x40: "TIMESTAMP0", 0x41: "TIMESTAMP1", 0x42: "TIMESTAMP2", 0x43: "TIMESTAMP3",
+    0x56: "TAP_CFG0", 0x57: "TAP_CFG1", 0x58: "TAP_CFG2", 0x59: "TAP_THS_6D", 0x5A: "INT_DUR2",
+    0x5B: "WAKE_UP_THS", 0x5C: "WAKE_UP_DUR", 0x5D: "FREE_FALL", 0x5E: "MD1_CFG", 0x5F: "MD2_CFG",
+    0x62: "I3C_BUS_AVB", 0x63: "INTERNAL_FREQ_FINE",
+    0x73: "X_OFS_USR", 0x74: "Y_OFS_USR", 0x75: "Z_OFS_USR",
+    0x78: "FIFO_DATA_OUT_TAG", 0x79: "FIFO_DATA_OUT_X_L", 0x7A: "FIFO_DATA_OUT_X_H",
+    0x7B: "FIFO_DATA_OUT_Y_L", 0x7C: "FIFO_DATA_OUT_Y_H", 0x7D: "FIFO_DATA_OUT_Z_L", 0x7E: "FIFO_DATA_OUT_Z_H",
+}
+ADDRESS = {name: address for address, name in REGISTERS.items()}
+
+WHO_AM_I_VALUE = 0x6C
+CTRL1_XL, CTRL2_G, CTRL3_C, STATUS_REG = 0x10, 0x11, 0x12, 0x1E
+OUTX_L_G, OUTX_L_A = 0x22, 0x28
+# Registers a host writes to configure the device (tracked over time)
+CONFIG_REGISTERS = frozenset(range(0x01, 0x0F)) | frozenset(range(0x10, 0x1A)) | frozenset(range(0x56, 0x60)) \
+    | frozenset((0x62, 0x63, 0x73, 0x74, 0x75))
+# Power-on values that differ from zero
+RESET_VALUES = {0x0F: WHO_AM_I_VALUE, CTRL3_C: 0x04}
+
+# ODR field (bits 7:4) of CTRL1_XL / CTRL2_G in Hz; 0 is power-down
+ODR_HZ = {0: 0.0, 1: 12.5, 2: 26.0, 3: 52.0, 4: 104.0, 5: 208.0, 6: 416.0, 7: 833.0,
+          8: 1666.0, 9: 3332.0, 10: 6664.0, 11: 1.6}
+XL_FULL_SCALE_G = {0: 4, 1: 32, 2: 8, 3: 16}
+G_FULL_SCALE_DPS = {0: 250, 1: 500, 2: 1000, 3: 2000}
+
+# A fresh-sample gap this many periods long counts the samples in between as missed
+MISSED_FACTOR = 1.5
+
+Lsm6Access = namedtuple("Lsm6Access", ["time_s", "op", "address", "register", "values"])
+ConfigChange = namedtuple("ConfigChange", ["time_s", "register", "old", "new"])
+
+
+def register_name(address):
+    return REGISTERS.get(address, f"REG_0x{address:02X}")
+
+
+def describe(address, value):
+    """Decoded fields of the registers that set the data path"""
+    if address == CTRL1_XL:
+        return {"odr_hz": ODR_HZ.get(value >> 4, 0.0), "fs_g": XL_FULL_SCALE_G[(value >> 2) & 3],
+                "lpf2": bool(value & 0x02)}
+    if address == CTRL2_G:
+        fs = 125 if value & 0x02 else G_FULL_SCALE_DPS[(value >> 2) & 3]
+        return {"odr_hz": ODR_HZ.get(value >> 4, 0.0) if value >> 4 != 11 else 0.0, "fs_dps": fs}
+    if address == CTRL3_C:
+        return {"boot": bool(value & 0x80), "bdu": bool(value & 0x40), "if_inc": bool(value & 0x04),
+                "sim_3wire": bool(value & 0x08), "sw_reset": bool(value & 0x01)}
+    if address == STATUS_REG:
+        return {"xlda": bool(value & 0x01), "gda": bool(value & 0x02), "tda": bool(value & 0x04)}
+    return {}
+
+
+class RateTracker:
+    """Fresh-sample timing for one sensor while one ODR setting is active"""
+
+    def __init__(self, sensor, odr_hz, since_s):
+        self.sensor = sensor
+        self.odr_hz = odr_hz
+        self.since_s = since_s
+        self.reads = 0
+        self.fresh = 0
+        self.duplicates = 0
+        self.missed = 0
+        self.first = None
+        self.last = None
+        self.max_gap = 0
+        self.last_data = None
+
+    def result(self, samplerate):
+        achieved = None
+        if self.fresh > 1 and self.last > self.first:
+            achieved = (self.fresh - 1) * samplerate / (self.last - self.first)
+        return {
+            "sensor": self.sensor,
+            "configured_odr_hz": self.odr_hz,
+            "since_s": round(self.since_s, 6),
+            "reads": self.reads,
+            "fresh_samples": self.fresh,
+            "duplicate_reads": self.duplicates,
+            "missed_samples": self.missed,
+            "achieved_odr_hz": round(achieved, 3) if achieved else None,
+            "achieved_ratio": round(achieved / self.odr_hz, 4) if achieved and self.odr_hz else None,
+            "max_gap_ms": round(self.max_gap * 1000.0 / samplerate, 3),
+        }
+
+
+class Lsm6Decoder:
+    """
+    Streaming semantic layer over SpiTransaction records. Command byte bit 7
+    selects read, bits 6:0 the first register; further bytes auto-increment
+    while CTRL3_C.IF_INC is set. A read that covers OUTX_L_G..OUTZ_H_G (or the
+    accelerometer block) is one sensor sample; it is fresh when its bytes
+    differ from the previous read, and fresh samples give the achieved ODR.
+    """
+
+    def __init__(self, samplerate):
+        self.samplerate = samplerate
+        self.state = bytearray(128)
+        for address, value in RESET_VALUES.items():
+            self.state[address] = value
+        self.known = set()            # registers whose value was seen on the bus
+        self.changes = []
+        self.transactions = 0
+        self.reads = 0
+        self.writes = 0
+        self.register_reads = [0] * 128
+        self.register_writes = [0] * 128
+        self.who_am_i = None
+        self.status_reads = 0
+        self.status_ready = {"xl": 0, "g": 0}
+        self.segments = {"g": [RateTracker("gyro", None, 0.0)], "xl": [RateTracker("accel", None, 0.0)]}
+
+    def _time(self, sample):
+        return sample / self.samplerate
+
+    def _set(self, address, value, sample, written):
+        old = self.state[address]
+        first_seen = address not in self.known
+        self.known.add(address)
+        if old == value and not first_seen:
+            return
+        self.state[address] = value
+        if address in CONFIG_REGISTERS and old != value:
+            self.changes.append(ConfigChange(self._time(sample), register_name(address), old, value))
+        if address == CTRL1_XL:
+            self._set_odr("xl", describe(CTRL1_XL, value)["odr_hz"], sample)
+        elif address == CTRL2_G:
+            self._set_odr("g", describe(CTRL2_G, value)["odr_hz"], sample)
+        elif address == CTRL3_C and written and value & 0x81:
+            # SW_RESET / BOOT: registers return to their power-on values
+            for register in CONFIG_REGISTERS:
+                self.state[register] = RESET_VALUES.get(register, 0)
+            self._set_odr("xl", 0.0, sample)
+            self._set_odr("g", 0.0, sample)
+
+    def _set_odr(self, sensor, odr_hz, sample):
+        """Start a new rate segment when the ODR changes; an unknown ODR is filled in place"""
+        current = self.segments[sensor][-1]
+        if current.odr_hz is None:
+            current.odr_hz = odr_hz
+        elif current.odr_hz != odr_hz:
+            self.segments[sensor].append(RateTracker(current.sensor, odr_hz, self._time(sample)))
+
+    def feed(self, transactions):
+        """Consume SpiTransaction records (start, end, mosi, miso) in capture order"""
+        register_reads, register_writes = self.register_reads, self.register_writes
+        state = self.state
+        gyro = self.segments["g"][-1]
+        accel = self.segments["xl"][-1]
+        reads = writes = count = 0
+        for transaction in transactions:
+            mosi = transaction[2]
+            count += 1
+            length = len(mosi) - 1
+            if length < 1:
+                continue
+            command = mosi[0]
+            address = command & 0x7F
+            if command & 0x80:
+                reads += 1
+                register_reads[address] += 1
+                miso = transaction[3]
+                # Without IF_INC a burst re-reads one register, so only auto-increment reads are samples
+                if address <= OUTX_L_A and address + length >= OUTX_L_G + 6 and state[CTRL3_C] & 0x04:
+                    if address <= OUTX_L_G:
+                        offset = OUTX_L_G - address + 1
+                        self._sample(gyro, miso[offset:offset + 6], transaction[0])
+                    if address + length >= OUTX_L_A + 6:
+                        offset = OUTX_L_A - address + 1
+                        self._sample(accel, miso[offset:offset + 6], transaction[0])
+                if address == STATUS_REG:
+                    self.status_reads += 1
+                    status = miso[1]
+                    self.status_ready["xl"] += status & 1
+                    self.status_ready["g"] += status >> 1 & 1
+                elif address <= 0x1D or address >= 0x56:
+                    # Configuration read back: the device's real value
+                    self._read_back(address, miso[1:], transaction[0])
+                    gyro, accel = self.segments["g"][-1], self.segments["xl"][-1]
+            else:
+                writes += 1
+                register_writes[address] += 1
+                step = 1 if state[CTRL3_C] & 0x04 else 0
+                for i, value in enumerate(mosi[1:]):
+                    self._set((address + i * step) & 0x7F, value, transaction[0], True)
+                gyro, accel = self.segments["g"][-1], self.segments["xl"][-1]
+        self.reads += reads
+        self.writes += writes
+        self.transactions += count
+
+    def _read_back(self, address, values, sample):
+        step = 1 if self.state[CTRL3_C] & 0x04 else 0
+        for i, value in enumerate(values):
+            register = (address + i * step) & 0x7F
+            if register == 0x0F:
+                self.who_am_i = value
+            elif register in CONFIG_REGISTERS:
+                self._set(register, value, sample, False)
+
+    def _sample(self, tracker, data, sample):
+        tracker.reads += 1
+        if data == tracker.last_data:
+            tracker.duplicates += 1
+            return
+        tracker.last_data = data
+        tracker.fresh += 1
+        if tracker.last is not None:
+            gap = sample - tracker.last
+            if gap > tracker.max_gap:
+                tracker.max_gap = gap
+            if tracker.odr_hz:
+                periods = gap * tracker.odr_hz / self.samplerate
+                if periods > MISSED_FACTOR:
+                    tracker.missed += int(round(periods)) - 1
+        else:
+            tracker.first = sample
+        tracker.last = sample
+
+    def configuration(self):
+        """Decoded data-path configuration as last written or read back"""
+        return {register_name(address): dict(describe(address, self.state[address]),
+                                             value=f"0x{self.state[address]:02X}",
+                                             known=address in self.known)
+                for address in (CTRL1_XL, CTRL2_G, CTRL3_C)}
+
+    def summary(self):
+        rates = [tracker.result(self.samplerate) for sensor in ("xl", "g")
+                 for tracker in self.segments[sensor] if tracker.reads or tracker.odr_hz]
+        accessed = {register_name(a): {"reads": self.register_reads[a], "writes": self.register_writes[a]}
+                    for a in range(128) if self.register_reads[a] or self.register_writes[a]}
+        return {
+            "transactions": self.transactions,
+            "reads": self.reads,
+            "writes": self.writes,
+            "who_am_i": f"0x{self.who_am_i:02X}" if self.who_am_i is not None else None,
+            "who_am_i_ok": self.who_am_i == WHO_AM_I_VALUE,
+            "configuration": self.configuration(),
+            "config_changes": [dict(c._asdict(), time_s=round(c.time_s, 6), old=f"0x{c.old:02X}",
+                                    new=f"0x{c.new:02X}") for c in self.changes[:1000]],
+            "status_reads": self.status_reads,
+            "status_data_ready": dict(self.status_ready),
+            "data_rates": rates,
+            "registers": accessed,
+        }
+
+
+def iter_accesses(transactions, samplerate, if_inc=True):
+    """Readable per-transaction view: Lsm6Access(time, 'R'/'W', first address, name, values)"""
+    for transaction in transactions:
+        mosi = transaction.mosi
+        if len(mosi) < 2:
+            continue
+        command = mosi[0]
+        address = command & 0x7F
+        read = bool(command & 0x80)
+        values = bytes(transaction.miso[1:] if read else mosi[1:])
+        yield Lsm6Access(transaction.start / samplerate, "R" if read else "W", address,
+                         register_name(address) if len(values) == 1 or not if_inc
+                         else f"{register_name(address)}..{register_name((address + len(values) - 1) & 0x7F)}",
+                         values)
+
+
+def analyze_lsm6(transactions, samplerate):
+    """Register-level LSM6DSO32 summary for a list of decoded SPI transactions"""
+    decoder = Lsm6Decoder(samplerate)
+    decoder.feed(transactions)
+    return decoder.summary()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LSM6DSO32 register-level view of an SPI capture")
+    parser.add_argument("capture", help="Capture file (.sr or .vcd)")
+    parser.add_argument("--dump", type=int, default=0, metavar="N", help="Print the first N register accesses")
+    parser.add_argument("--json", help="Write the summary as JSON")
+    args = parser.parse_args()
+
+    from logic_capture import decode_spi_file
+    capture, transactions = decode_spi_file(args.capture)
+    for access in iter_accesses(transactions[:args.dump], capture.samplerate):
+        print(f"   {access.time_s:.6f}s {access.op} {access.register:<28} {access.values.hex(' ')}")
+
+    summary = analyze_lsm6(transactions, capture.samplerate)
+    print(f"🔍 {summary['transactions']} transactions: {summary['reads']} reads, {summary['writes']} writes")
+    print(f"   WHO_AM_I: {summary['who_am_i'] or 'not read'} {'✅' if summary['who_am_i_ok'] else '❌'}")
+    for name, config in summary["configuration"].items():
+        print(f"   {name}: {config}")
+    for rate in summary["data_rates"]:
+        print(f"📈 {rate['sensor']}: configured {rate['configured_odr_hz']} Hz, achieved "
+              f"{rate['achieved_odr_hz']} Hz from {rate['fresh_samples']} fresh samples "
+              f"({rate['duplicate_reads']} duplicate reads, {rate['missed_samples']} missed)")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(summary, f, indent=2)
+    return 0 if summary["who_am_i_ok"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
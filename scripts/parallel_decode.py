@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+MIPE_EV1 Parallel SPI Decode
+Splits one large capture at CS-idle boundaries and decodes the segments on
+worker processes that read the sample buffer through shared memory; the SPI
+timing analysis can run in the same workers and is joined in capture order
+"""
+
+import concurrent.futures
+import os
+from itertools import islice
+from multiprocessing import shared_memory
+
+from logic_capture import (BATCH, DEFAULT_CHANNEL_MAP, SpiDecoder, SrCapture, decode_spi_chunks,
+                           iter_transitions, open_capture)
+from spi_timing import MISO_SETUP_NS, SpiTimingAnalyzer, decode_spi_with_timing
+
+# CS must stay inactive this long for a split to be safe (~42us at 24 MHz)
+DEFAULT_MIN_IDLE = 1000
+SEARCH_WINDOW = 4 * 1024 * 1024
+SEGMENTS_PER_WORKER = 4  # oversplit so uneven traffic still balances
+
+
+def _idle_table(cs_bit, cs_active_low):
+    """bytes.translate table mapping each sample byte to 1 (CS idle) or 0"""
+    return bytes(1 if bool(value & cs_bit) == cs_active_low else 0 for value in range(256))
+
+
+def find_split_points(buffer, segments, cs_channel=3, min_idle=DEFAULT_MIN_IDLE,
+                      cs_active_low=True):
+    """
+    Pick up to segments-1 sample indices at which CS has been inactive for at
+    least min_idle samples, near evenly spaced targets. Splitting inside an idle
+    run guarantees no transaction straddles a segment boundary.
+    Only unitsize-1 buffers are supported.
+    """
+    view = memoryview(buffer)
+    total = len(view)
+    table = _idle_table(1 << cs_channel, cs_active_low)
+    needle = b"\x01" * min_idle
+    points = []
+    position = 0
+
+    for k in range(1, segments):
+        target = max(position, total * k // segments)
+        found = -1
+        search = target
+        while search < total:
+            window = bytes(view[search:search + SEARCH_WINDOW + min_idle]).translate(table)
+            hit = window.find(needle)
+            if hit >= 0:
+                found = search + hit
+                break
+            search += SEARCH_WINDOW
+        if found < 0:
+            break
+        # Split in the middle of the idle run: the CS release edge and the
+        # next CS assert are both well clear of the boundary
+        point = found + min_idle // 2
+        if point <= position or point >= total:
+            continue
+        points.append(point)
+        position = point + min_idle
+    view.release()
+    return points
+
+
+def _decode_timed(segment, start, end, channel_map, options, samplerate):
+    """Decoder and timing analyzer on the same transition batches; the analyzer is left open for join()"""
+    decoder = SpiDecoder(channel_map, **options)
+    analyzer = SpiTimingAnalyzer(samplerate, channel_map, **options)
+    transitions = iter_transitions([segment], 1, start)
+    transactions = []
+    while True:
+        batch = list(islice(transitions, BATCH))
+        if not batch:
+            break
+        transactions.extend(decoder.feed(batch))
+        analyzer.feed(batch)
+    transactions.extend(decoder.finish(end))
+    return transactions, analyzer
+
+
+def _decode_range(block, start, end, channel_map, options, samplerate=None):
+    segment = block.buf[start:end]
+    try:
+        if samplerate:
+            return _decode_timed(segment, start, end, channel_map, options, samplerate)
+        return decode_spi_chunks([segment], channel_map, 1, start, **options)
+    finally:
+        segment.release()
+
+
+def _decode_segment(name, start, end, channel_map, options, samplerate=None):
+    """Worker task: decode samples [start, end) straight out of shared memory"""
+    # Pool workers share the parent's resource tracker, so attaching here
+    # never takes ownership of (or unlinks) the block
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        return _decode_range(block, start, end, channel_map, options, samplerate)
+    finally:
+        block.close()
+
+
+def _decode_shared_segments(block, total, workers, channel_map, min_idle, options, samplerate=None):
+    """Per-segment results in capture order"""
+    samples = block.buf[:total]
+    try:
+        points = find_split_points(samples, workers * SEGMENTS_PER_WORKER, channel_map["cs"],
+                                   min_idle, options.get("cs_active_low", True))
+    finally:
+        samples.release()
+    bounds = list(zip([0] + points, points + [total]))
+
+    if workers == 1 or len(bounds) == 1:
+        return [_decode_range(block, 0, total, channel_map, options, samplerate)]
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_decode_segment, block.name, start, end, channel_map, options, samplerate)
+                   for start, end in bounds]
+        return [future.result() for future in futures]
+
+
+def decode_spi_shared(block, total, workers=None, channel_map=None, min_idle=DEFAULT_MIN_IDLE,
+                      **options):
+    """
+    Decode the first `total` unitsize-1 samples of a SharedMemory block.
+    Transactions are returned in capture order, identical to a serial decode.
+    """
+    channel_map = channel_map or DEFAULT_CHANNEL_MAP
+    workers = workers or os.cpu_count() or 1
+    transactions = []
+    # Segments are disjoint and ordered, so concatenation preserves order
+    for part in _decode_shared_segments(block, total, workers, channel_map, min_idle, options):
+        transactions.extend(part)
+    return transactions
+
+
+def decode_spi_buffer_parallel(samples, workers=None, channel_map=None, **options):
+    """Copy a sample buffer into shared memory once and decode it in parallel"""
+    block = shared_memory.SharedMemory(create=True, size=max(1, len(samples)))
+    try:
+        block.buf[:len(samples)] = samples
+        return decode_spi_shared(block, len(samples), workers, channel_map, **options)
+    finally:
+        block.close()
+        block.unlink()
+
+
+def _load_shared(capture):
+    """Inflate the .sr chunks straight into one shared memory block"""
+    block = shared_memory.SharedMemory(create=True, size=max(1, capture.total_samples))
+    offset = 0
+    for chunk in capture.iter_chunks():
+        block.buf[offset:offset + len(chunk)] = chunk
+        offset += len(chunk)
+    return block
+
+
+def _parallel_capture(capture):
+    # VCD is already a transition list: the serial decode never touches idle
+    # samples. Trigger windows are small and must be decoded one at a time
+    return capture.unitsize == 1 and isinstance(capture, SrCapture) and not capture.windows
+
+
+def decode_spi_with_timing_parallel(capture_file, channel_map=None, workers=None, setup_ns=MISO_SETUP_NS,
+                                    min_idle=DEFAULT_MIN_IDLE, **options):
+    """
+    Parallel counterpart of spi_timing.decode_spi_with_timing: every worker
+    runs the decoder and the timing analyzer over its segment, and the
+    analyzers are joined in capture order. Returns (capture, transactions, summary).
+    """
+    capture = open_capture(capture_file)
+    if not _parallel_capture(capture):
+        return decode_spi_with_timing(capture_file, channel_map, setup_ns, **options)
+
+    channel_map = channel_map or DEFAULT_CHANNEL_MAP
+    workers = workers or os.cpu_count() or 1
+    block = _load_shared(capture)
+    try:
+        segments = _decode_shared_segments(block, capture.total_samples, workers, channel_map, min_idle,
+                                           options, capture.samplerate)
+    finally:
+        block.close()
+        block.unlink()
+    transactions = []
+    analyzer = None
+    for part, segment_analyzer in segments:
+        transactions.extend(part)
+        analyzer = segment_analyzer if analyzer is None else analyzer.join(segment_analyzer)
+    analyzer.finish(capture.total_samples)
+    return capture, transactions, analyzer.summary(setup_ns)
+
+
+def decode_spi_file_parallel(capture_file, channel_map=None, workers=None, **options):
+    """
+    Parallel counterpart of logic_capture.decode_spi_file: the .sr chunks are
+    inflated straight into one shared memory block that every worker maps
+    """
+    capture = open_capture(capture_file)
+    if not _parallel_capture(capture):
+        from logic_capture import decode_spi_file
+        return decode_spi_file(capture_file, channel_map, **options)
+
+    block = _load_shared(capture)
+    try:
+        transactions = decode_spi_shared(block, capture.total_samples, workers, channel_map, **options)
+    finally:
+        block.close()
+        block.unlink()
+    return capture, transactions
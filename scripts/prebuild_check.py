@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+MIPE Pre-build Static Checks
+Millisecond checks run on a candidate tree before it costs a west build:
+DTS syntax, GPIO/pinctrl pin conflicts, &label node references, aliases and
+node labels referenced from main.c, and Kconfig symbols the sources need
+"""
+
+import argparse
+import re
+import sys
+from collections import namedtuple
+from pathlib import Path
+
+from capture_planner import board_sources
+from kconfig_resolver import resolve_config
+
+Finding = namedtuple("Finding", ["severity", "check", "message", "file", "line"])
+
+# Labels provided by the SoC .dtsi files rather than the board DTS
+_SOC_LABEL = re.compile(r"^(gpio\d+|gpiote\d+|spi\d+|i2c\d+|uart\d+|pwm\d+|adc|grtc|pinctrl|cpuapp_\w+|"
+                        r"slot\d+_partition|\w+_partition|rram_controller|uicr)$")
+_GPIO_CELL = re.compile(r"<\s*&gpio(\d+)\s+(\d+)\s+[^>]*>")
+_PSEL = re.compile(r"NRF_PSEL\(\s*(\w+)\s*,\s*(\d+)\s*,\s*(\d+)\s*\)")
+_LABEL_DEF = re.compile(r"(?:^|[\s;{])([A-Za-z_]\w*)\s*:\s*[\w,@-]+\s*\{")
+_ALIAS_BLOCK = re.compile(r"aliases\s*\{(.*?)\}\s*;", re.S)
+_ALIAS_ENTRY = re.compile(r"([\w-]+)\s*=\s*&(\w+)\s*;")
+_STATUS_OKAY = re.compile(r"&(\w+)\s*\{[^{}]*status\s*=\s*\"okay\"", re.S)
+_NODE_REF = re.compile(r"(?:^|[;{}])\s*&(\w+)\s*\{")
+
+_C_DT_ALIAS = re.compile(r"DT_ALIAS\(\s*(\w+)\s*\)")
+_C_DT_NODELABEL = re.compile(r"DT_NODELABEL\(\s*(\w+)\s*\)")
+
+# (pattern in C sources, Kconfig symbol it needs)
+C_REQUIREMENTS = [
+    (re.compile(r"#include\s*<zephyr/drivers/gpio\.h>|gpio_pin_\w+\("), "GPIO"),
+    (re.compile(r"#include\s*<zephyr/drivers/spi\.h>|spi_transceive"), "SPI"),
+    (re.compile(r"#include\s*<zephyr/drivers/i2c\.h>|i2c_(?:write|read)"), "I2C"),
+    (re.compile(r"#include\s*<zephyr/logging/log\.h>|LOG_MODULE_REGISTER"), "LOG"),
+]
+# Enabled DTS controllers and the driver they need
+DTS_REQUIREMENTS = [(re.compile(r"^spi\d+$"), "SPI"), (re.compile(r"^i2c\d+$"), "I2C")]
+
+
+def strip_dts_comments(text):
+    """Blank out comments and preprocessor lines, keeping line numbers intact"""
+    text = re.sub(r"/\*.*?\*/", lambda m: "\n" * m.group(0).count("\n"), text, flags=re.S)
+    text = re.sub(r"//[^\n]*", "", text)
+    return re.sub(r"(?m)^\s*#\s*(include|define|undef|if|ifdef|ifndef|else|endif)\b[^\n]*", "", text)
+
+
+def check_dts_syntax(text, path):
+    """Balanced braces, '};' after every node, ';' after every property"""
+    findings = []
+    code = strip_dts_comments(text)
+    depth = 0
+    opened = []
+    for number, line in enumerate(code.splitlines(), 1):
+        stripped = line.strip()
+        if stripped.count('"') % 2:
+            findings.append(Finding("error", "dts_syntax", "unterminated string", path, number))
+        for char in re.sub(r'"[^"]*"', "", stripped):
+            if char == "{":
+                depth += 1
+                opened.append(number)
+            elif char == "}":
+                depth -= 1
+                if depth < 0:
+                    findings.append(Finding("error", "dts_syntax", "unmatched '}'", path, number))
+                    depth = 0
+                elif opened:
+                    opened.pop()
+        if stripped.startswith("}") and not stripped.startswith("};"):
+            findings.append(Finding("error", "dts_syntax", "node must be closed with '};'", path, number))
+        if (stripped and depth > 0 and "=" in stripped and not stripped.endswith((";", ",", "{"))
+                and not stripped.startswith("}")):
+            findings.append(Finding("error", "dts_syntax", f"missing ';' after property: {stripped}",
+                                    path, number))
+        if re.search(r"=[^;{}]*\}", re.sub(r'"[^"]*"', '""', stripped)):
+            findings.append(Finding("error", "dts_syntax", f"missing ';' before '}}': {stripped}", path, number))
+        if stripped and depth > 0 and "=" not in stripped and re.fullmatch(r"[\w,#-]+", stripped):
+            findings.append(Finding("error", "dts_syntax", f"missing ';' after boolean property: {stripped}",
+                                    path, number))
+    for number in opened:
+        findings.append(Finding("error", "dts_syntax", "'{' never closed", path, number))
+
+    defined = {}
+    for number, line in enumerate(code.splitlines(), 1):
+        for label in _LABEL_DEF.findall(line):
+            if label in defined:
+                findings.append(Finding("error", "dts_syntax",
+                                        f"label {label} already defined on line {defined[label]}", path, number))
+            else:
+                defined[label] = number
+    return findings
+
+
+def _owners(code, path):
+    """(port, pin, owner, line) for every GPIO specifier and pinctrl psel in a DTS"""
+    uses = []
+    stack = []
+    for number, line in enumerate(code.splitlines(), 1):
+        node = re.match(r"\s*(?:([A-Za-z_]\w*)\s*:\s*)?(&?[\w,@-]+)\s*\{", line)
+        if node:
+            stack.append(node.group(1) or node.group(2).lstrip("&"))
+        owner = "/".join(stack) or "/"
+        for port, pin in _GPIO_CELL.findall(line):
+            prop = line.split("=")[0].strip()
+            uses.append((int(port), int(pin), f"{owner} {prop}", number))
+        # Sleep states repeat the default state's pins; only count the default
+        if not any(name.endswith("_sleep") for name in stack):
+            for function, port, pin in _PSEL.findall(line):
+                uses.append((int(port), int(pin), f"{owner} {function}", number))
+        for _ in range(line.count("}")):
+            if stack:
+                stack.pop()
+    return uses
+
+
+def check_pin_conflicts(dts_texts):
+    """The same Px.yy driven by two owners (e.g. cs-gpios on an LED pin)"""
+    findings = []
+    seen = {}
+    reported = set()
+    for path, text in dts_texts:
+        for port, pin, owner, line in _owners(strip_dts_comments(text), path):
+            key = (port, pin)
+            if key in seen and seen[key][0] != owner and key not in reported:
+                reported.add(key)
+                first_owner, first_path, first_line = seen[key]
+                findings.append(Finding(
+                    "error", "pin_conflict",
+                    f"P{port}.{pin:02d} used by {owner} and {first_owner} ({Path(first_path).name}:{first_line})",
+                    path, line))
+            seen.setdefault(key, (owner, path, line))
+    return findings
+
+
+def dts_symbols(dts_texts):
+    """Labels, aliases (normalised to C identifiers) and okay'd node references"""
+    labels, aliases, enabled = set(), {}, set()
+    for _, text in dts_texts:
+        code = strip_dts_comments(text)
+        labels.update(_LABEL_DEF.findall(code))
+        for block in _ALIAS_BLOCK.findall(code):
+            for name, target in _ALIAS_ENTRY.findall(block):
+                aliases[name.replace("-", "_")] = target
+        enabled.update(_STATUS_OKAY.findall(code))
+    return labels, aliases, enabled
+
+
+def check_references(dts_texts, sources):
+    """&label { } nodes, alias targets in DTS and DT_ALIAS()/DT_NODELABEL() in C must resolve"""
+    findings = []
+    labels, aliases, _ = dts_symbols(dts_texts)
+    for path, text in dts_texts:
+        for number, line in enumerate(strip_dts_comments(text).splitlines(), 1):
+            for label in _NODE_REF.findall(line):
+                if label not in labels and not _SOC_LABEL.match(label):
+                    findings.append(Finding("error", "dts_reference",
+                                            f"&{label} {{ }} references an undefined label (dtc: Label or path "
+                                            f"not found)", path, number))
+    for name, target in aliases.items():
+        if target not in labels and not _SOC_LABEL.match(target):
+            path = next((p for p, t in dts_texts if f"&{target}" in t), dts_texts[0][0] if dts_texts else "")
+            findings.append(Finding("error", "alias", f"alias {name} points to undefined label &{target}",
+                                    path, None))
+    for path, text in sources:
+        for number, line in enumerate(text.splitlines(), 1):
+            for alias in _C_DT_ALIAS.findall(line):
+                if alias not in aliases:
+                    findings.append(Finding("error", "alias", f"DT_ALIAS({alias}) has no alias in the devicetree",
+                                            path, number))
+            for label in _C_DT_NODELABEL.findall(line):
+                if label not in labels and not _SOC_LABEL.match(label):
+                    findings.append(Finding("error", "nodelabel",
+                                            f"DT_NODELABEL({label}) is not defined in the devicetree", path, number))
+    return findings
+
+
+def check_kconfig(project_dir, board, dts_texts, sources, extra_conf=()):
+    """Symbols the sources and enabled controllers need must be =y in the effective config"""
+    findings = []
+    config = resolve_config(project_dir, board, extra_conf)
+    required = {}
+    for path, text in sources:
+        for pattern, symbol in C_REQUIREMENTS:
+            if pattern.search(text):
+                required.setdefault(symbol, f"used in {Path(path).name}")
+    _, _, enabled = dts_symbols(dts_texts)
+    for node in enabled:
+        for pattern, symbol in DTS_REQUIREMENTS:
+            if pattern.match(node):
+                required.setdefault(symbol, f"&{node} is enabled in the devicetree")
+    for symbol, reason in sorted(required.items()):
+        if not config.is_enabled(symbol):
+            source = config.source(symbol)
+            where = f" (set to {source[2]} in {Path(source[0]).name}:{source[1]})" if source else ""
+            findings.append(Finding("error", "kconfig", f"CONFIG_{symbol} must be enabled: {reason}{where}",
+                                    str(Path(project_dir) / "prj.conf"), None))
+    return findings
+
+
+def validate_project(project_dir, board="mipe_ev1", extra_conf=(), extra_dts=()):
+    """All static checks for a project tree plus build-time overlays; returns a list of Findings"""
+    dts_files, source_files = board_sources(project_dir, board)
+    dts_files = list(dts_files) + [Path(p) for p in extra_dts]
+    dts_texts = [(str(p), p.read_text(encoding="utf-8", errors="replace")) for p in dts_files]
+    sources = [(str(p), p.read_text(encoding="utf-8", errors="replace")) for p in source_files]
+
+    findings = []
+    for path, text in dts_texts:
+        findings += check_dts_syntax(text, path)
+    findings += check_pin_conflicts(dts_texts)
+    findings += check_references(dts_texts, sources)
+    findings += check_kconfig(project_dir, board, dts_texts, sources, extra_conf)
+    return findings
+
+
+def errors(findings):
+    return [f for f in findings if f.severity == "error"]
+
+
+def format_finding(finding):
+    location = Path(finding.file).name if finding.file else ""
+    if finding.line:
+        location += f":{finding.line}"
+    icon = "❌" if finding.severity == "error" else "⚠️ "
+    return f"{icon} [{finding.check}] {location} {finding.message}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Static pre-build checks for a MIPE project")
+    parser.add_argument("--project-dir", default=str(Path(__file__).resolve().parent.parent))
+    parser.add_argument("--board", default="mipe_ev1")
+    parser.add_argument("--extra-conf", action="append", default=[])
+    parser.add_argument("--extra-dts", action="append", default=[], help="DTC_OVERLAY_FILE overlay (repeatable)")
+    args = parser.parse_args()
+
+    findings = validate_project(args.project_dir, args.board, args.extra_conf, args.extra_dts)
+    for finding in findings:
+        print(format_finding(finding))
+    if errors(findings):
+        print(f"\n❌ {len(errors(findings))} error(s) - this tree will not build correctly")
+        return 1
+    print("✅ Static checks passed")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
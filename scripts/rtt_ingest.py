@@ -0,0 +1,460 @@
+#!/usr/bin/env python3
+"""
+MIPE RTT Ingestion
+Bounded-memory RTT capture for long soak runs: a fixed-size ring buffer
+between the RTT reader and the consumer, backpressure to the reader while the
+ring is full, byte-exact accounting of what the host dropped, detection of
+what the target dropped (sequence gaps, Zephyr "messages dropped"), and
+spill to size-rotated log files with a loss marker wherever data is missing.
+"""
+
+import argparse
+import re
+import socket
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+
+RTT_TELNET_PORT = 19021          # J-Link RTT telnet server (JLink.exe, GDB server, RTT Viewer)
+DEFAULT_RING_BYTES = 1024 * 1024
+DEFAULT_SPILL_BYTES = 16 * 1024 * 1024
+DEFAULT_SPILL_FILES = 8
+MAX_LINE_BYTES = 4096
+LOSS_EVENTS_KEPT = 1000
+
+# Per-cycle counter the firmware logs ("Toggle event: state=HIGH, cycle=123")
+SEQUENCE_RE = re.compile(r"cycle=(\d+)")
+# Zephyr deferred logging reports its own overflow
+ZEPHYR_DROPPED_RE = re.compile(r"---\s*(\d+)\s+messages? dropped\s*---")
+
+
+class RingBuffer:
+    """
+    Fixed-capacity byte FIFO shared by one writer and one reader thread.
+    write() blocks while the ring is full (backpressure); whatever still does
+    not fit when the timeout expires is dropped and counted.
+    """
+
+    def __init__(self, capacity=DEFAULT_RING_BYTES):
+        self.capacity = capacity
+        self._buffer = bytearray(capacity)
+        self._head = 0       # next read position
+        self._size = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self.written = 0
+        self.read_bytes = 0
+        self.dropped = 0
+        self.high_water = 0
+        self.blocked_s = 0.0
+
+    def __len__(self):
+        return self._size
+
+    def _put(self, data):
+        tail = (self._head + self._size) % self.capacity
+        first = min(len(data), self.capacity - tail)
+        self._buffer[tail:tail + first] = data[:first]
+        self._buffer[:len(data) - first] = data[first:]
+        self._size += len(data)
+        self.written += len(data)
+        self.high_water = max(self.high_water, self._size)
+
+    def write(self, data, timeout=1.0):
+        """Returns the number of bytes dropped (0 when everything fit)"""
+        view = memoryview(data)
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while view:
+                free = self.capacity - self._size
+                if free:
+                    chunk = view[:free]
+                    self._put(chunk)
+                    view = view[len(chunk):]
+                    self._cond.notify_all()
+                    continue
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self._closed:
+                    break
+                started = time.monotonic()
+                self._cond.wait(remaining)
+                self.blocked_s += time.monotonic() - started
+            self.dropped += len(view)
+            return len(view)
+
+    def read(self, max_bytes=65536, timeout=0.5):
+        """Up to max_bytes; b"" on timeout, None once closed and drained"""
+        with self._cond:
+            if not self._size:
+                if self._closed:
+                    return None
+                self._cond.wait(timeout)
+                if not self._size:
+                    return None if self._closed else b""
+            count = min(max_bytes, self._size)
+            first = min(count, self.capacity - self._head)
+            data = bytes(self._buffer[self._head:self._head + first]) + bytes(self._buffer[:count - first])
+            self._head = (self._head + count) % self.capacity
+            self._size -= count
+            self.read_bytes += count
+            self._cond.notify_all()
+            return data
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+
+class RotatingSpill:
+    """<prefix>_NNN.log files of at most max_bytes; the oldest beyond max_files are deleted"""
+
+    def __init__(self, directory, prefix="rtt", max_bytes=DEFAULT_SPILL_BYTES, max_files=DEFAULT_SPILL_FILES):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.prefix = prefix
+        self.max_bytes = max_bytes
+        self.max_files = max_files
+        self.files = deque()
+        self.deleted_files = 0
+        self.deleted_bytes = 0
+        self.bytes_written = 0
+        self._index = 0
+        self._file = None
+        self._file_bytes = 0
+
+    def _rotate(self):
+        if self._file:
+            self._file.close()
+        path = self.directory / f"{self.prefix}_{self._index:04d}.log"
+        self._index += 1
+        self._file = open(path, "wb")
+        self._file_bytes = 0
+        self.files.append(path)
+        while len(self.files) > self.max_files:
+            oldest = self.files.popleft()
+            self.deleted_bytes += oldest.stat().st_size
+            oldest.unlink()
+            self.deleted_files += 1
+
+    def write(self, data):
+        if self._file is None or self._file_bytes + len(data) > self.max_bytes:
+            self._rotate()
+        self._file.write(data)
+        self._file_bytes += len(data)
+        self.bytes_written += len(data)
+
+    def mark(self, text):
+        """A '###' marker line in the log itself, so gaps are visible where they happen"""
+        self.write(f"### {datetime.now().isoformat(timespec='milliseconds')} {text}\n".encode("utf-8"))
+
+    def flush(self):
+        if self._file:
+            self._file.flush()
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+
+class LossAccounting:
+    """Totals plus a bounded history of when and where data went missing"""
+
+    def __init__(self):
+        self.host_dropped_bytes = 0
+        self.host_lost_lines = 0
+        self.target_lost_lines = 0
+        self.target_dropped_messages = 0
+        self.truncated_lines = 0
+        self.events = deque(maxlen=LOSS_EVENTS_KEPT)
+        self._last_sequence = None      # from intact lines only
+        self._drop_anchor = None        # last intact sequence before a host drop
+        self.host_gap_pending = False   # set when the host dropped bytes since the last sequence line
+
+    def record(self, kind, count, detail=""):
+        event = {"time": time.time(), "kind": kind, "count": count, "detail": detail}
+        self.events.append(event)
+        return event
+
+    def host_drop_reached(self):
+        """
+        The stream has reached a host drop: forget the sequence, so the first
+        intact line after it re-anchors instead of being compared with a
+        value that may have been cut
+        """
+        if self._drop_anchor is None:
+            self._drop_anchor = self._last_sequence
+        self._last_sequence = None
+        self.host_gap_pending = True
+
+    def observe_line(self, text, intact=True):
+        """
+        Target-side loss evident in one decoded line; returns an event or None.
+        A line that straddles a host drop (intact=False) is only a fragment of
+        two lines, so neither its sequence nor a drop notice in it is trusted.
+        """
+        if not intact:
+            return None
+        match = ZEPHYR_DROPPED_RE.search(text)
+        if match:
+            count = int(match.group(1))
+            self.target_dropped_messages += count
+            return self.record("target_dropped", count, "Zephyr log overflow")
+        match = SEQUENCE_RE.search(text)
+        if match:
+            sequence = int(match.group(1))
+            previous, self._last_sequence = self._last_sequence, sequence
+            if self.host_gap_pending:
+                # Lines between the intact anchor before the drop and this one went with the bytes
+                anchor, self._drop_anchor = self._drop_anchor, None
+                self.host_gap_pending = False
+                if anchor is not None and sequence > anchor + 1:
+                    missing = sequence - anchor - 1
+                    self.host_lost_lines += missing
+                    return self.record("host_gap", missing, f"cycle {anchor} -> {sequence}")
+                return None
+            if previous is not None and sequence > previous + 1:
+                missing = sequence - previous - 1
+                self.target_lost_lines += missing
+                return self.record("target_gap", missing, f"cycle {previous} -> {sequence}")
+        return None
+
+    def summary(self):
+        return {
+            "host_dropped_bytes": self.host_dropped_bytes,
+            "host_lost_lines": self.host_lost_lines,
+            "target_lost_lines": self.target_lost_lines,
+            "target_dropped_messages": self.target_dropped_messages,
+            "truncated_lines": self.truncated_lines,
+            "loss_events": len(self.events),
+            "data_lost": bool(self.host_dropped_bytes or self.target_lost_lines
+                              or self.target_dropped_messages),
+        }
+
+
+def telnet_source(host="localhost", port=RTT_TELNET_PORT, chunk=4096, stop=None, connect_timeout=5.0):
+    """Byte chunks from the J-Link RTT telnet server"""
+    with socket.create_connection((host, port), timeout=connect_timeout) as sock:
+        sock.settimeout(0.5)
+        while stop is None or not stop.is_set():
+            try:
+                data = sock.recv(chunk)
+            except socket.timeout:
+                continue
+            if not data:
+                return
+            yield data
+
+
+def tail_source(path, chunk=65536, stop=None, poll_s=0.1):
+    """Byte chunks appended to a file (e.g. JLinkRTTLogger output) as it grows"""
+    path = Path(path)
+    while not path.exists():
+        if stop is not None and stop.is_set():
+            return
+        time.sleep(poll_s)
+    with open(path, "rb") as f:
+        while True:
+            data = f.read(chunk)
+            if data:
+                yield data
+            elif stop is not None and stop.is_set():
+                return
+            else:
+                time.sleep(poll_s)
+
+
+class RTTIngest:
+    """
+    Reader thread: source -> ring (blocking while full). Consumer thread:
+    ring -> lines -> loss accounting, on_line callback and rotating spill
+    (spill=None when the source is already a file on disk). Memory is bounded
+    by the ring, one partial line and the loss history.
+    """
+
+    def __init__(self, source_factory, spill, ring_bytes=DEFAULT_RING_BYTES, write_timeout=1.0,
+                 on_line=None, flush_interval_s=1.0):
+        self.source_factory = source_factory   # callable(stop_event) -> iterable of bytes
+        self.spill = spill
+        self.ring = RingBuffer(ring_bytes)
+        self.write_timeout = write_timeout
+        self.on_line = on_line
+        self.flush_interval_s = flush_interval_s
+        self.loss = LossAccounting()
+        self.lines = 0
+        self.error = None
+        self._stop = threading.Event()
+        self._partial = bytearray()
+        self._cut = False       # the next line starts right after a host drop or a truncation
+        self._marks = deque()   # (stream offset, text) for host drops, written by the consumer
+        self._threads = []
+
+    def start(self):
+        self._threads = [threading.Thread(target=self._read_source, name="rtt-reader", daemon=True),
+                         threading.Thread(target=self._consume, name="rtt-consumer", daemon=True)]
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def stop(self, drain_timeout=5.0):
+        self._stop.set()
+        self._threads[0].join(drain_timeout)
+        self.ring.close()
+        self._threads[1].join(drain_timeout)
+        if self.spill:
+            self.spill.close()
+        return self.stats()
+
+    def _read_source(self):
+        try:
+            for data in self.source_factory(self._stop):
+                dropped = self.ring.write(data, self.write_timeout)
+                if dropped:
+                    self.loss.host_dropped_bytes += dropped
+                    self.loss.record("host_dropped", dropped, "ring full")
+                    # The gap sits after everything written so far
+                    self._marks.append((self.ring.written, f"HOST DROPPED {dropped} bytes (ring buffer full)"))
+                if self._stop.is_set():
+                    break
+        except OSError as e:
+            self.error = f"{type(e).__name__}: {e}"
+        finally:
+            self.ring.close()
+
+    def _consume(self):
+        last_flush = time.monotonic()
+        while True:
+            limit = 65536
+            while self._marks and self._marks[0][0] <= self.ring.read_bytes:
+                # The half-line before the drop and the first line after it are fragments
+                self._flush_partial(intact=False)
+                self._mark(self._marks.popleft()[1])
+                self.loss.host_drop_reached()
+                self._cut = True
+            if self._marks:
+                limit = min(limit, self._marks[0][0] - self.ring.read_bytes)
+            data = self.ring.read(limit)
+            if data is None:
+                break
+            if data:
+                if self.spill:
+                    self.spill.write(data)
+                self._split_lines(data)
+            if self.spill and time.monotonic() - last_flush >= self.flush_interval_s:
+                self.spill.flush()
+                last_flush = time.monotonic()
+        self._flush_partial()
+        while self._marks:
+            self._mark(self._marks.popleft()[1])
+        if self.spill:
+            self.spill.flush()
+
+    def _mark(self, text):
+        if self.spill:
+            self.spill.mark(text)
+
+    def _flush_partial(self, intact=True):
+        if self._partial:
+            self._emit(bytes(self._partial), intact)
+            self._partial.clear()
+
+    def _split_lines(self, data):
+        start = 0
+        while True:
+            end = data.find(b"\n", start)
+            if end < 0:
+                self._partial += data[start:]
+                if len(self._partial) > MAX_LINE_BYTES:
+                    self.loss.truncated_lines += 1
+                    self._emit(bytes(self._partial[:MAX_LINE_BYTES]))
+                    self._partial.clear()
+                    self._cut = True
+                return
+            if self._partial:
+                self._partial += data[start:end]
+                line = bytes(self._partial)
+                self._partial.clear()
+            else:
+                line = data[start:end]
+            self._emit(line)
+            start = end + 1
+
+    def _emit(self, raw, intact=True):
+        text = raw.decode("utf-8", errors="replace").rstrip("\r")
+        self.lines += 1
+        intact, self._cut = intact and not self._cut, False
+        event = self.loss.observe_line(text, intact)
+        if event and event["kind"] != "host_gap":
+            self._mark(f"TARGET LOST {event['count']} ({event['kind']}: {event['detail']})")
+        if self.on_line:
+            self.on_line(text)
+
+    def stats(self):
+        return dict(self.loss.summary(),
+                    lines=self.lines,
+                    bytes_in=self.ring.written + self.ring.dropped,
+                    ring_capacity=self.ring.capacity,
+                    ring_high_water=self.ring.high_water,
+                    ring_fill=len(self.ring),
+                    reader_blocked_s=round(self.ring.blocked_s, 3),
+                    spill_files=[str(p) for p in self.spill.files] if self.spill else [],
+                    spill_deleted_files=self.spill.deleted_files if self.spill else 0,
+                    spill_deleted_bytes=self.spill.deleted_bytes if self.spill else 0,
+                    error=self.error)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bounded-memory RTT capture with loss accounting")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--telnet", metavar="HOST[:PORT]", help=f"J-Link RTT telnet server (port {RTT_TELNET_PORT})")
+    source.add_argument("--tail", metavar="FILE", help="Follow a file written by JLinkRTTLogger")
+    parser.add_argument("--duration", type=float, help="Seconds to capture (default: until Ctrl+C)")
+    parser.add_argument("--spill-dir", default="rtt_logs/soak")
+    parser.add_argument("--ring-kb", type=int, default=DEFAULT_RING_BYTES // 1024)
+    parser.add_argument("--spill-mb", type=int, default=DEFAULT_SPILL_BYTES // (1024 * 1024))
+    parser.add_argument("--spill-files", type=int, default=DEFAULT_SPILL_FILES)
+    args = parser.parse_args()
+
+    if args.telnet:
+        host, _, port = args.telnet.partition(":")
+        factory = lambda stop: telnet_source(host or "localhost", int(port or RTT_TELNET_PORT), stop=stop)
+    else:
+        factory = lambda stop: tail_source(args.tail, stop=stop)
+    prefix = f"rtt_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    spill = RotatingSpill(args.spill_dir, prefix, args.spill_mb * 1024 * 1024, args.spill_files)
+    ingest = RTTIngest(factory, spill, ring_bytes=args.ring_kb * 1024).start()
+
+    print(f"📡 Capturing RTT into {spill.directory} (ring {args.ring_kb} KB, "
+          f"{args.spill_files} x {args.spill_mb} MB spill)")
+    start = time.time()
+    try:
+        while args.duration is None or time.time() - start < args.duration:
+            time.sleep(1)
+            stats = ingest.stats()
+            print(f"⏳ {time.time() - start:7.0f}s  {stats['lines']} lines  "
+                  f"ring {stats['ring_fill'] * 100 // stats['ring_capacity']}%  "
+                  f"host dropped {stats['host_dropped_bytes']} B  target lost {stats['target_lost_lines']}",
+                  end="\r")
+            if stats["error"]:
+                break
+    except KeyboardInterrupt:
+        pass
+    stats = ingest.stop()
+    print()
+    if stats["error"]:
+        print(f"❌ RTT source failed: {stats['error']}")
+    for event in ingest.loss.events:
+        stamp = datetime.fromtimestamp(event["time"]).isoformat(timespec="milliseconds")
+        print(f"⚠️  {stamp} {event['kind']}: {event['count']} {event['detail']}")
+    print(f"{'⚠️ ' if stats['data_lost'] else '✅'} {stats['lines']} lines, {stats['bytes_in']} bytes; "
+          f"host dropped {stats['host_dropped_bytes']} B, target lost {stats['target_lost_lines']} line(s) "
+          f"+ {stats['target_dropped_messages']} message(s)")
+    return 1 if stats["error"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,27 +6,96 @@ Real-time logging capture and analysis with timestamping
 
 import subprocess
 import time
-import threading
-import queue
 import json
 import os
+import re
 from datetime import datetime
 from pathlib import Path
 
+from rtt_ingest import RTT_TELNET_PORT, RotatingSpill, RTTIngest, tail_source, telnet_source
+from tracing import tracer
+
+# Bump when the detection rules in summarize_rtt_log change so stored
+# batch results are recomputed (see batch_reanalysis.py)
+ANALYZER_VERSION = "1"
+
+# "[HH:MM:SS.mmm] message" lines written by the firmware RTT logger
+RTT_LINE_RE = re.compile(r"^\[(\d+):(\d{2}):(\d{2})\.(\d{3})\]\s?(.*)$")
+
+def parse_rtt_line(line):
+    """Split an RTT log line into (timestamp_ms, message); timestamp is None if absent"""
+    match = RTT_LINE_RE.match(line.rstrip("\r\n"))
+    if not match:
+        return None, line.rstrip("\r\n")
+    hours, minutes, seconds, millis, message = match.groups()
+    timestamp_ms = ((int(hours) * 60 + int(minutes)) * 60 + int(seconds)) * 1000 + int(millis)
+    return timestamp_ms, message
+
+def iter_rtt_events(lines):
+    """Yield (timestamp_ms, message) for every line of an RTT log"""
+    for line in lines:
+        yield parse_rtt_line(line)
+
+class RTTLogSummary:
+    """The GPIO activity detection rules, fed one line at a time (live ingestion or a file)"""
+    
+    def __init__(self):
+        self.log_chars = 0
+        self.gpio_cycles_detected = 0
+        self.timing_events = 0
+    
+    def feed(self, line):
+        self.log_chars += len(line)
+        if 'Cycle' in line and 'Toggling pins' in line:
+            self.gpio_cycles_detected += 1
+        if 'Timing validation' in line:
+            self.timing_events += 1
+    
+    def result(self):
+        summary = {
+            "log_chars": self.log_chars,
+            "gpio_cycles_detected": self.gpio_cycles_detected,
+            "timing_events": self.timing_events,
+        }
+        if self.gpio_cycles_detected > 0:
+            summary["hardware_status"] = "ACTIVE"
+            summary["timing_validation"] = "VERIFIED" if self.timing_events > 0 else "PARTIAL"
+        else:
+            summary["hardware_status"] = "NO_ACTIVITY"
+            summary["timing_validation"] = "FAILED"
+        return summary
+
+def summarize_rtt_log(lines):
+    """
+    Apply the GPIO activity detection rules to an iterable of log lines.
+    Streams the input, so it runs in constant memory on any log size.
+    """
+    summary = RTTLogSummary()
+    for line in lines:
+        summary.feed(line)
+    return summary.result()
+
 class RTTMonitor:
-    def __init__(self, duration=30):
-        self.project_dir = Path(r"C:\Development\MIPE_EV1")
+    def __init__(self, duration=30, project_dir=None, rtt_source="logger"):
+        self.project_dir = Path(project_dir) if project_dir else Path(r"C:\Development\MIPE_EV1")
         self.logs_dir = self.project_dir / "rtt_logs"
         self.logs_dir.mkdir(exist_ok=True)
         
         self.duration = duration  # Monitoring duration in seconds
-        self.log_queue = queue.Queue()
         self.is_monitoring = False
         
         # RTT capture configuration
         self.jlink_rtt_logger = r"C:\Program Files\SEGGER\JLink_V874a\JLinkRTTLogger.exe"
+        self.jlink_exe = r"C:\Program Files\SEGGER\JLink_V874a\JLink.exe"
         self.device = "nRF54L15_xxAA"
         
+        # "logger": JLinkRTTLogger writes one file that is followed live.
+        # "telnet": read the J-Link RTT telnet server into rotating spill files
+        # (bounded memory and disk for multi-day soak runs)
+        self.rtt_source = rtt_source
+        self.ingest = None
+        self.live_summary = None
+        
         # Timing analysis
         self.cycle_times = []
         self.expected_cycle_time = 23  # milliseconds
@@ -72,29 +141,100 @@ class RTTMonitor:
     
     def monitor_hardware(self):
         """Monitor hardware for specified duration"""
-        log_file = self.start_rtt_capture()
-        if not log_file:
+        with tracer.span("rtt_monitor", duration=self.duration) as monitor_span:
+            passed = self._monitor_hardware_steps()
+            monitor_span.set(passed=passed)
+        return passed
+    
+    def start_telnet_capture(self):
+        """Connect J-Link (which serves RTT on its telnet port) and spill RTT into rotating files"""
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        spill_dir = self.logs_dir / f"rtt_soak_{timestamp}"
+        print(f"🚀 Starting RTT telnet capture for {self.duration} seconds...")
+        print(f"📝 Spill directory: {spill_dir}")
+        
+        cmd = [self.jlink_exe, "-device", self.device, "-if", "SWD", "-speed", "4000",
+               "-autoconnect", "1", "-RTTTelnetPort", str(RTT_TELNET_PORT)]
+        try:
+            # J-Link Commander stays connected (and serves RTT) while its stdin is open
+            self.rtt_process = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL,
+                                                stderr=subprocess.DEVNULL)
+        except FileNotFoundError:
+            print(f"❌ J-Link Commander not found at: {self.jlink_exe}")
+            return None
+        
+        def source(stop):
+            for _ in range(20):   # the telnet server comes up once the target is connected
+                try:
+                    yield from telnet_source(port=RTT_TELNET_PORT, stop=stop)
+                    return
+                except ConnectionRefusedError:
+                    if stop.is_set():
+                        return
+                    time.sleep(0.5)
+            raise ConnectionRefusedError(f"RTT telnet port {RTT_TELNET_PORT} not available")
+        
+        self._start_ingest(source, RotatingSpill(spill_dir, prefix="rtt"))
+        return spill_dir
+    
+    def _start_ingest(self, source, spill=None):
+        self.live_summary = RTTLogSummary()
+        self.ingest = RTTIngest(source, spill, on_line=lambda line: self.live_summary.feed(line + "\n")).start()
+    
+    def _monitor_hardware_steps(self):
+        with tracer.span("rtt_logger_start"):
+            if self.rtt_source == "telnet":
+                log_ref = self.start_telnet_capture()
+            else:
+                log_ref = self.start_rtt_capture()
+                if log_ref:
+                    # Follow the logger's file live for loss accounting
+                    self._start_ingest(lambda stop: tail_source(log_ref, stop=stop))
+        if not log_ref:
             return False
             
         print(f"⏱️  Monitoring hardware for {self.duration} seconds...")
         print("📊 Collecting RTT logs, GPIO timing, and hardware events...")
         
         # Monitor for specified duration
-        start_time = time.time()
-        cycle_count = 0
-        
-        while time.time() - start_time < self.duration:
-            elapsed = time.time() - start_time
-            print(f"⏳ Monitoring... {elapsed:.1f}s / {self.duration}s", end='\r')
-            time.sleep(1)
+        with tracer.span("rtt_capture_window"):
+            start_time = time.time()
+            
+            while time.time() - start_time < self.duration:
+                elapsed = time.time() - start_time
+                stats = self.ingest.stats()
+                lost = stats["host_dropped_bytes"] + stats["target_lost_lines"] + stats["target_dropped_messages"]
+                print(f"⏳ Monitoring... {elapsed:.1f}s / {self.duration}s  "
+                      f"{stats['lines']} lines{'  ⚠️ data lost' if lost else ''}", end='\r')
+                time.sleep(1)
             
         print(f"\n✅ Hardware monitoring complete!")
         
         # Stop RTT capture
-        self.stop_rtt_capture()
+        with tracer.span("rtt_logger_stop") as stop_span:
+            self.stop_rtt_capture()
+            loss = self.ingest.stop()
+            stop_span.set(lines=loss["lines"], data_lost=loss["data_lost"])
+        self._print_loss(loss)
         
         # Analyze captured logs
-        return self.analyze_rtt_logs(log_file)
+        with tracer.span("rtt_analyze"):
+            if self.rtt_source == "telnet":
+                return self.report_analysis(self.live_summary.result(), log_ref, loss)
+            return self.analyze_rtt_logs(log_ref, loss)
+    
+    def _print_loss(self, loss):
+        if loss.get("error"):
+            print(f"❌ RTT source failed: {loss['error']}")
+        if not loss["data_lost"]:
+            print(f"✅ No RTT data lost ({loss['lines']} lines)")
+            return
+        print(f"⚠️  RTT data lost: host dropped {loss['host_dropped_bytes']} bytes "
+              f"({loss['host_lost_lines']} lines), target lost {loss['target_lost_lines']} lines "
+              f"+ {loss['target_dropped_messages']} messages")
+        for event in list(self.ingest.loss.events)[-10:]:
+            stamp = datetime.fromtimestamp(event["time"]).strftime("%H:%M:%S.%f")[:-3]
+            print(f"   {stamp} {event['kind']}: {event['count']} {event['detail']}")
     
     def stop_rtt_capture(self):
         """Stop RTT capture process"""
@@ -106,7 +246,7 @@ class RTTMonitor:
         except Exception as e:
             print(f"⚠️  Error stopping RTT capture: {e}")
     
-    def analyze_rtt_logs(self, log_file):
+    def analyze_rtt_logs(self, log_file, loss=None):
         """Analyze captured RTT logs for hardware validation"""
         print(f"🔍 Analyzing RTT logs: {log_file}")
         
@@ -115,37 +255,32 @@ class RTTMonitor:
             return False
             
         try:
+            # Stream the log line by line instead of reading it into one string
             with open(log_file, 'r', encoding='utf-8', errors='ignore') as f:
-                log_content = f.read()
-                
-            print(f"📄 Log file size: {len(log_content)} characters")
+                summary = summarize_rtt_log(f)
+        except Exception as e:
+            print(f"❌ Error analyzing logs: {e}")
+            return False
+        return self.report_analysis(summary, log_file, loss)
+    
+    def report_analysis(self, summary, log_file, loss=None):
+        """Save and print an RTT summary; True when GPIO activity was seen"""
+        try:
+            print(f"📄 Log file size: {summary['log_chars']} characters")
             
             # Analysis results
             analysis = {
                 "log_file": str(log_file),
                 "capture_duration": self.duration,
                 "timestamp": datetime.now().isoformat(),
-                "gpio_cycles_detected": 0,
-                "timing_validation": "UNKNOWN",
-                "hardware_status": "UNKNOWN",
-                "logs_captured": len(log_content) > 0
+                "gpio_cycles_detected": summary["gpio_cycles_detected"],
+                "timing_validation": summary["timing_validation"],
+                "hardware_status": summary["hardware_status"],
+                "logs_captured": summary["log_chars"] > 0,
+                "timing_events": summary["timing_events"]
             }
-            
-            # Count GPIO cycles
-            cycle_lines = [line for line in log_content.split('\n') if 'Cycle' in line and 'Toggling pins' in line]
-            analysis["gpio_cycles_detected"] = len(cycle_lines)
-            
-            # Check for timing validation logs
-            timing_lines = [line for line in log_content.split('\n') if 'Timing validation' in line]
-            analysis["timing_events"] = len(timing_lines)
-            
-            # Determine hardware status
-            if analysis["gpio_cycles_detected"] > 0:
-                analysis["hardware_status"] = "ACTIVE"
-                analysis["timing_validation"] = "VERIFIED" if analysis["timing_events"] > 0 else "PARTIAL"
-            else:
-                analysis["hardware_status"] = "NO_ACTIVITY"
-                analysis["timing_validation"] = "FAILED"
+            if loss is not None:
+                analysis["rtt_loss"] = {k: v for k, v in loss.items() if k != "spill_files"}
             
             # Save analysis results
             results_file = self.logs_dir / f"analysis_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
@@ -187,6 +322,9 @@ def main():
     parser = argparse.ArgumentParser(description='RTT Hardware Monitoring for MIPE_EV1')
     parser.add_argument('--duration', type=int, default=30, help='Monitoring duration in seconds')
     parser.add_argument('--device', default='nRF54L15_xxAA', help='Target device')
+    parser.add_argument('--trace', action='store_true', help='Export a Chrome trace of the monitoring stages')
+    parser.add_argument('--rtt-source', choices=['logger', 'telnet'], default='logger',
+                        help='JLinkRTTLogger file, or the J-Link RTT telnet server with rotating spill (soak runs)')
     
     args = parser.parse_args()
     
@@ -195,9 +333,14 @@ def main():
     print(f"🎯 Target: {args.device}")
     print("-" * 50)
     
-    monitor = RTTMonitor(duration=args.duration)
+    monitor = RTTMonitor(duration=args.duration, rtt_source=args.rtt_source)
     success = monitor.monitor_hardware()
     
+    if args.trace:
+        tracer.print_summary()
+        trace_file, _ = tracer.export(monitor.project_dir / "traces", "rtt")
+        print(f"📄 Trace saved to: {trace_file}")
+    
     if success:
         print("🎉 Hardware monitoring PASSED - GPIO activity detected!")
         exit(0)
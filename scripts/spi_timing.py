@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+"""
+MIPE_EV1 SPI Timing Analyzer
+Measures what the SPI bus actually does in a capture: SCLK frequency, CS to
+first clock edge and last clock edge to CS release, gaps between transactions,
+MISO setup/hold around the sampling edges and MISO delay after the launch edge,
+plus effective bytes/s and bus utilisation. Runs on the same transition stream
+as SpiDecoder, so it costs one step per edge rather than per sample.
+
+The worst MISO delay measured after the launch edge bounds how short a half
+period can get, which gives the fix loop a measured clock it can raise to
+instead of only halving spi-max-frequency. Every figure is quantised to one
+sample period (see resolution_ns); margins of 0-1 samples are unresolved.
+"""
+
+import argparse
+import json
+import sys
+from collections import Counter, namedtuple
+from pathlib import Path
+
+from logic_capture import DEFAULT_CHANNEL_MAP, SpiDecoder, feed_segments, open_capture
+
+# LSM6DSO32 datasheet SPI clock limit
+DEVICE_MAX_HZ = 10_000_000
+# Clocks the nRF SPIM peripheral can generate
+SPIM_FREQUENCIES = [125_000, 250_000, 500_000, 1_000_000, 2_000_000, 4_000_000,
+                    8_000_000, 16_000_000, 32_000_000]
+# MISO setup the controller needs before its sampling edge (conservative default)
+MISO_SETUP_NS = 20.0
+# A sampling-edge interval this many times the median is an inter-byte gap
+BYTE_GAP_FACTOR = 1.5
+
+SpiTiming = namedtuple("SpiTiming", ["start", "end", "cs_lead", "cs_lag", "bits"])
+_HISTOGRAMS = ("periods", "cs_lead", "cs_lag", "gaps", "miso_setup", "miso_hold", "miso_delay")
+_OPEN_STATE = ("_start", "_first_edge", "_last_edge", "_sample_edge", "_launch", "_miso_change",
+               "_hold_from", "_bits")
+
+
+def _distribution(counter, ns_per_sample):
+    """min/p1/median/p99/max in ns of a Counter of sample counts"""
+    total = sum(counter.values())
+    if not total:
+        return None
+    wanted = {"p1": total * 0.01, "median": total * 0.5, "p99": total * 0.99}
+    found = {}
+    seen = 0
+    for value in sorted(counter):
+        seen += counter[value]
+        for name, rank in wanted.items():
+            if name not in found and seen >= rank:
+                found[name] = value
+    values = sorted(counter)
+    result = {"count": total, "min": values[0], **found, "max": values[-1]}
+    return {key: value if key == "count" else round(value * ns_per_sample, 1)
+            for key, value in result.items()}
+
+
+def suggest_frequency(max_delay_samples, samplerate, setup_ns=MISO_SETUP_NS, device_max_hz=DEVICE_MAX_HZ):
+    """
+    Fastest SPIM clock whose half period still covers the worst measured MISO
+    delay (rounded up by one sample for quantisation) plus the controller's
+    setup requirement. Returns (safe_hz, suggested_hz).
+    """
+    delay_s = (max_delay_samples + 1) / samplerate
+    safe_hz = min(1.0 / (2 * (delay_s + setup_ns * 1e-9)), device_max_hz)
+    suggested = [f for f in SPIM_FREQUENCIES if f <= safe_hz]
+    return safe_hz, suggested[-1] if suggested else None
+
+
+class SpiTimingAnalyzer:
+    """
+    Streaming SPI timing measurement with SpiDecoder's feed/finish interface.
+    Sampling edges follow CPOL/CPHA like the decoder; the opposite edge (or CS
+    assertion, for the first bit) is where the sensor launches MISO.
+    """
+
+    def __init__(self, samplerate, channel_map=None, cpol=0, cpha=0, wordsize=8, cs_active_low=True):
+        channel_map = channel_map or DEFAULT_CHANNEL_MAP
+        self.samplerate = samplerate
+        self.clk_bit = 1 << channel_map["clk"]
+        self.miso_bit = 1 << channel_map["miso"]
+        self.cs_bit = 1 << channel_map["cs"]
+        self.mask = self.clk_bit | self.miso_bit | self.cs_bit
+        self.cs_active_low = cs_active_low
+        self.wordsize = wordsize
+        self.sample_on_rising = (cpol == cpha)
+
+        # Histograms in samples
+        self.periods = Counter()
+        self.cs_lead = Counter()
+        self.cs_lag = Counter()
+        self.gaps = Counter()
+        self.miso_setup = Counter()
+        self.miso_hold = Counter()
+        self.miso_delay = Counter()
+        self.transactions = 0
+        self.bytes = 0
+        self.bits = 0
+        self.active = 0
+        # Summed over segments (trigger windows), so gaps between windows never count
+        self.span = 0             # first CS assert to last CS release
+        self.recorded = 0         # samples actually captured
+
+        self._prev = None
+        self._origin = None
+        self._start = None
+        self._first_start = None
+        self._last_close = None
+
+    def _cs_active(self, value):
+        return bool(value & self.cs_bit) != self.cs_active_low
+
+    def _open(self, index):
+        if self._last_close is not None:
+            self.gaps[index - self._last_close] += 1
+        if self._first_start is None:
+            self._first_start = index
+        self._start = index
+        self._first_edge = self._last_edge = None
+        self._sample_edge = None
+        self._launch = index
+        self._miso_change = None
+        self._hold_from = None
+        self._bits = 0
+
+    def _close(self, index):
+        if self._first_edge is not None:
+            self.cs_lead[self._first_edge - self._start] += 1
+            self.cs_lag[index - self._last_edge] += 1
+        clocked = self._first_edge is not None
+        timing = SpiTiming(self._start, index, self._first_edge - self._start if clocked else None,
+                           index - self._last_edge if clocked else None, self._bits)
+        self.transactions += 1
+        self.bits += self._bits
+        self.bytes += self._bits // self.wordsize
+        self.active += index - self._start
+        self._last_close = index
+        self._start = None
+        return timing
+
+    def feed(self, transitions):
+        """Consume transitions, returning a SpiTiming per completed transaction"""
+        done = []
+        clk_bit, miso_bit, cs_bit = self.clk_bit, self.miso_bit, self.cs_bit
+        sample_level = clk_bit if self.sample_on_rising else 0
+        periods, setup, hold, delay = self.periods, self.miso_setup, self.miso_hold, self.miso_delay
+        prev = self._prev
+
+        for index, value in transitions:
+            if prev is None:
+                prev = value
+                self._origin = index
+                if self._cs_active(value):
+                    self._open(index)
+                continue
+
+            changed = prev ^ value
+            prev = value
+            if changed & cs_bit:
+                if self._cs_active(value):
+                    self._open(index)
+                elif self._start is not None:
+                    done.append(self._close(index))
+                continue
+            if self._start is None:
+                continue
+            if changed & clk_bit:
+                if self._first_edge is None:
+                    self._first_edge = index
+                self._last_edge = index
+                if (value & clk_bit) == sample_level:
+                    last = self._sample_edge
+                    if last is not None:
+                        periods[index - last] += 1
+                    if changed & miso_bit:
+                        # MISO moved in the same sample as the edge: no measurable setup
+                        setup[0] += 1
+                        if self._launch is not None:
+                            delay[index - self._launch] += 1
+                        self._miso_change = index
+                        self._hold_from = None
+                    else:
+                        change = self._miso_change
+                        if change is not None and (last is None or change > last):
+                            setup[index - change] += 1
+                        self._hold_from = index
+                    self._sample_edge = index
+                    self._launch = None
+                    self._bits += 1
+                    continue
+                self._launch = index
+            if changed & miso_bit:
+                self._miso_change = index
+                if self._hold_from is not None:
+                    hold[index - self._hold_from] += 1
+                    self._hold_from = None
+                if self._launch is not None:
+                    delay[index - self._launch] += 1
+
+        self._prev = prev
+        return done
+
+    def join(self, other):
+        """
+        Append the measurements of the next contiguous stretch of the same
+        capture (a parallel decode segment, split while CS was idle). Neither
+        analyzer may have been finished; the gap across the split is counted
+        as if one analyzer had seen both stretches. Returns self.
+        """
+        for name in _HISTOGRAMS:
+            getattr(self, name).update(getattr(other, name))
+        self.transactions += other.transactions
+        self.bytes += other.bytes
+        self.bits += other.bits
+        self.active += other.active
+        self.span += other.span
+        self.recorded += other.recorded
+        if other._first_start is not None:
+            if self._last_close is not None:
+                self.gaps[other._first_start - self._last_close] += 1
+            if self._first_start is None:
+                self._first_start = other._first_start
+        if other._last_close is not None:
+            self._last_close = other._last_close
+        if self._origin is None:
+            self._origin = other._origin
+        if other._prev is not None:
+            self._prev = other._prev
+            for name in _OPEN_STATE:
+                setattr(self, name, getattr(other, name, None))
+        return self
+
+    def finish(self, end_sample):
+        """Close a transaction still open when the capture (or window) ends; feeding again starts afresh"""
+        done = [self._close(end_sample)] if self._start is not None else []
+        if self._origin is not None:
+            self.recorded += end_sample - self._origin
+        if self._first_start is not None:
+            self.span += self._last_close - self._first_start
+        self._prev = self._origin = self._first_start = self._last_close = None
+        return done
+
+    def summary(self, setup_ns=MISO_SETUP_NS):
+        samplerate = self.samplerate
+        ns = 1e9 / samplerate
+        period = _distribution(self.periods, ns)
+        measured_hz = None
+        byte_gaps = 0
+        if period:
+            median = period["median"] / ns
+            measured_hz = round(samplerate / median)
+            byte_gaps = sum(count for value, count in self.periods.items() if value > BYTE_GAP_FACTOR * median)
+
+        throughput = None
+        span = self.span
+        if self._first_start is not None and self._last_close is not None:
+            span += self._last_close - self._first_start
+        if span > 0:
+            span_s = span / samplerate
+            bit_period = period["median"] / ns if period else 0
+            throughput = {
+                "span_s": round(span_s, 6),
+                "bytes_per_s": round(self.bytes / span_s, 1),
+                "in_transaction_bytes_per_s": round(self.bytes * samplerate / self.active, 1) if self.active else None,
+                "bus_utilisation": round(self.active / span, 4),
+                "clock_utilisation": round(min(1.0, self.bits * bit_period / span), 4),
+            }
+        if throughput and self.recorded:
+            throughput["capture_s"] = round(self.recorded / samplerate, 6)
+
+        clock = {"measured_hz": measured_hz, "max_edge_hz": None, "safe_hz": None, "suggested_hz": None,
+                 "setup_violations": self.miso_setup.get(0, 0), "limited_by": None}
+        if period:
+            clock["max_edge_hz"] = round(samplerate / (period["min"] / ns))
+        if self.miso_delay:
+            safe_hz, suggested_hz = suggest_frequency(max(self.miso_delay), samplerate, setup_ns)
+            clock["safe_hz"] = round(safe_hz)
+            clock["suggested_hz"] = suggested_hz
+            clock["limited_by"] = "device_max" if safe_hz >= DEVICE_MAX_HZ else "miso_delay"
+        if clock["setup_violations"] and measured_hz:
+            # Data already moving at the sampling edge: step below the measured clock
+            lower = [f for f in SPIM_FREQUENCIES if f < measured_hz]
+            clock["suggested_hz"] = lower[-1] if lower else None
+            clock["limited_by"] = "setup_violation"
+
+        return {
+            "samplerate": samplerate,
+            "resolution_ns": round(ns, 1),
+            "transactions": self.transactions,
+            "bytes": self.bytes,
+            "sclk_period_ns": period,
+            "byte_gaps": byte_gaps,
+            "cs_lead_ns": _distribution(self.cs_lead, ns),
+            "cs_lag_ns": _distribution(self.cs_lag, ns),
+            "gap_ns": _distribution(self.gaps, ns),
+            "miso_setup_ns": _distribution(self.miso_setup, ns),
+            "miso_hold_ns": _distribution(self.miso_hold, ns),
+            "miso_delay_ns": _distribution(self.miso_delay, ns),
+            "throughput": throughput,
+            "clock": clock,
+        }
+
+
+def analyze_spi_timing(capture_file, channel_map=None, setup_ns=MISO_SETUP_NS, **options):
+    """Timing summary for one .sr or .vcd capture; returns (capture, summary)"""
+    capture = open_capture(capture_file)
+    analyzer = SpiTimingAnalyzer(capture.samplerate, channel_map, **options)
+    feed_segments(capture, {"timing": analyzer})
+    return capture, analyzer.summary(setup_ns)
+
+
+def decode_spi_with_timing(capture_file, channel_map=None, setup_ns=MISO_SETUP_NS, **options):
+    """
+    SPI transactions and the timing summary from one read of the capture: both
+    consume the same transition batches. Returns (capture, transactions, summary).
+    """
+    capture = open_capture(capture_file)
+    analyzer = SpiTimingAnalyzer(capture.samplerate, channel_map, **options)
+    results = feed_segments(capture, {"spi": SpiDecoder(channel_map, **options), "timing": analyzer})
+    return capture, results["spi"], analyzer.summary(setup_ns)
+
+
+def _hz(value):
+    return f"{value / 1e6:g} MHz" if value else "?"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure SPI bus timing margins and throughput")
+    parser.add_argument("capture", help="Capture file (.sr or .vcd)")
+    parser.add_argument("--map", default="", help="Channel map, e.g. clk=0,mosi=1,miso=2,cs=3")
+    parser.add_argument("--cpol", type=int, choices=(0, 1), default=0)
+    parser.add_argument("--cpha", type=int, choices=(0, 1), default=0)
+    parser.add_argument("--setup-ns", type=float, default=MISO_SETUP_NS,
+                        help="MISO setup the controller needs before its sampling edge")
+    parser.add_argument("--json", help="Write the summary as JSON")
+    args = parser.parse_args()
+
+    channel_map = dict(DEFAULT_CHANNEL_MAP)
+    for term in filter(None, args.map.split(",")):
+        name, _, channel = term.partition("=")
+        channel_map[name.strip()] = int(channel)
+
+    _, summary = analyze_spi_timing(args.capture, channel_map, args.setup_ns, cpol=args.cpol, cpha=args.cpha)
+    clock = summary["clock"]
+    print(f"🔍 {summary['transactions']} transactions, {summary['bytes']} bytes "
+          f"(resolution {summary['resolution_ns']} ns)")
+    if not summary["sclk_period_ns"]:
+        print("❌ No SCLK edges inside CS")
+        return 1
+    print(f"⏱️  SCLK {_hz(clock['measured_hz'])} measured (fastest edge pair {_hz(clock['max_edge_hz'])}), "
+          f"{summary['byte_gaps']} inter-byte gaps")
+    for key, label in (("cs_lead_ns", "CS -> first edge"), ("cs_lag_ns", "last edge -> CS"),
+                       ("gap_ns", "between transactions"), ("miso_setup_ns", "MISO setup"),
+                       ("miso_hold_ns", "MISO hold"), ("miso_delay_ns", "MISO delay")):
+        stats = summary[key]
+        if stats:
+            print(f"   {label}: min {stats['min']} / median {stats['median']} / max {stats['max']} ns")
+    throughput = summary["throughput"]
+    if throughput:
+        print(f"📊 {throughput['bytes_per_s']:.0f} bytes/s, bus busy {throughput['bus_utilisation']:.2%}, "
+              f"clocking {throughput['clock_utilisation']:.2%}")
+    if clock["suggested_hz"]:
+        print(f"💡 Safe up to {_hz(clock['safe_hz'])} ({clock['limited_by']}), suggest {_hz(clock['suggested_hz'])}")
+    if args.json:
+        Path(args.json).write_text(json.dumps(summary, indent=2), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
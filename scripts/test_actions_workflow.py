@@ -9,21 +9,27 @@ import sys
 from pathlib import Path
 import time
 
+from build_runner import format_diagnostic, run_build
+
 def test_build():
     """Test firmware build"""
     print("🔨 Testing build process...")
     
     try:
-        result = subprocess.run([
-            "cmd", "/c", "build_only.bat"
-        ], cwd=Path(".."), capture_output=True, text=True, timeout=60)
+        # build_only.bat exits 0 even when ninja fails, so the banner is still checked
+        result = run_build(["cmd", "/c", "build_only.bat"], cwd=Path(".."), timeout=60)
         
-        if result.returncode == 0 and "BUILD SUCCESSFUL" in result.stdout:
+        if result.success and "BUILD SUCCESSFUL" in result.output:
             print("✅ Build: PASSED")
             return True
         else:
             print("❌ Build: FAILED")
-            print(result.stderr)
+            if result.aborted_on:
+                print(f"   Stopped after {result.seconds:.1f}s at the first fatal diagnostic")
+            if result.timed_out:
+                print("   Timed out after 60s")
+            for diagnostic in result.diagnostics:
+                print(f"   {format_diagnostic(diagnostic)}")
             return False
             
     except Exception as e:
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Hardware Farm Scheduler Test
+Runs build_once_test_many on simulated slots of uneven speed and checks that
+every board verifies the image exactly `repeats` times under its own label
+"""
+
+import sys
+import threading
+import time
+from collections import Counter
+
+from hw_farm import Slot, SlotPool, SimulatedRunner, build_once_test_many
+
+
+def _slots(count):
+    return [Slot(f"10000000{i}", f"sim:{i}", f"sim-{i}") for i in range(count)]
+
+
+def test_pinned_repeats(repeats=3):
+    """Fast slots do not take jobs meant for slow ones"""
+    print(f"🧪 {repeats} repeats on 3 simulated slots of uneven speed...")
+    durations = {"sim-0": 0.005, "sim-1": 0.05, "sim-2": 0.1}
+    ran = Counter()
+    lock = threading.Lock()
+
+    def runner(job, slot):
+        time.sleep(durations[slot.name])
+        with lock:
+            ran[slot.name] += 1
+        return {"passed": True, "simulated": True}
+
+    slots = _slots(3)
+    results = build_once_test_many(lambda: "zephyr.hex", SlotPool(slots), runner, repeats)
+    assert ran == {slot.name: repeats for slot in slots}, ran
+    assert all(slot.jobs_run == repeats for slot in slots), [(s.name, s.jobs_run) for s in slots]
+    for result in results:
+        assert result["job"].split("#")[0] == result["slot"], result
+    print(f"   ✅ Each slot ran exactly {repeats} job(s) under its own label")
+
+
+def test_pinned_slot_quarantined(repeats=2):
+    """Jobs pinned to a quarantined board fail instead of moving to another board"""
+    print("🧪 Pinned jobs on a broken slot...")
+    slots = _slots(3)
+    runner = SimulatedRunner(duration=0.01, broken_slots={"sim-1"})
+    results = build_once_test_many(lambda: "zephyr.hex", SlotPool(slots), runner, repeats)
+    broken = [r for r in results if r["job"].startswith("sim-1#")]
+    assert len(broken) == repeats and all("error" in r for r in broken), broken
+    assert all(set(r.get("slots", [])) <= {"sim-1"} for r in broken), broken
+    assert [s.jobs_run for s in slots] == [repeats, 0, repeats], [(s.name, s.jobs_run) for s in slots]
+    print("   ✅ Broken board reported, healthy boards unaffected")
+
+
+def main():
+    tests = [test_pinned_repeats, test_pinned_slot_quarantined]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            failed += 1
+            print(f"   ❌ {test.__name__}: {e}")
+    print(f"\n{'✅' if not failed else '❌'} {len(tests) - failed}/{len(tests)} passed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,494 @@
+#!/usr/bin/env python3
+"""
+MIPE_EV1 RTT / Logic Timeline Correlation
+Aligns firmware RTT timestamps with logic analyzer edges on a test pin and
+merges both into one timeline, so the timing the firmware reports can be
+compared with the timing measured on the pin, cycle by cycle.
+
+Every firmware cycle toggles P1.05 once (HIGH on odd cycles), so edge k of the
+capture belongs to cycle k + K. The edge index is corrected for missing edges
+from the measured period, K is fixed by edge polarity plus an anchor (boot in
+the capture, an explicit cycle or a clock-offset hint), and logic_time =
+drift * rtt_time + offset is fitted robustly over the matched cycles. All
+passes are linear; unmatched events on either side are kept and reported.
+"""
+
+import argparse
+import csv
+import heapq
+import json
+import re
+import statistics
+import sys
+from array import array
+from bisect import bisect_left
+from collections import namedtuple
+from pathlib import Path
+
+from logic_capture import open_capture
+from rtt_monitor import parse_rtt_line
+from tracing import tracer
+
+# Test pin -> (logic channel, pin is HIGH on odd cycles); see Project_ MIPE_EV1.md pinning
+TEST_PINS = {"P1.05": (5, True), "P1.06": (6, False)}
+DEFAULT_PIN = "P1.05"
+EXPECTED_PERIOD_MS = 23.0
+
+# 'Toggle event: ... cycle=N' (every cycle, debug level) and 'Cycle N: Toggling pins' (every 10th)
+CYCLE_RE = re.compile(r"cycle=(\d+)|Cycle (\d+): Toggling pins")
+
+# Pulses shorter than this fraction of the period are glitches (e.g. the 6us boot pulse)
+GLITCH_FRACTION = 0.02
+# A lead-in without edges this many periods long means the capture saw the boot
+BOOT_QUIET_PERIODS = 4
+# Bounded work for estimators and the anchorless offset search
+ESTIMATE_SAMPLES = 20001
+SEARCH_SAMPLES = 400
+SEARCH_CANDIDATES = 4096
+OUTLIER_MADS = 5.0
+# RTT timestamps are whole milliseconds
+RTT_RESOLUTION_S = 0.001
+
+TIMELINE_FIELDS = ("kind", "cycle", "time_s", "rtt_ms", "rtt_mapped_s", "lag_us",
+                   "fw_period_ms", "hw_period_ms", "rising")
+
+Alignment = namedtuple("Alignment", ["cycle_offset", "method", "drift", "offset_s",
+                                     "ambiguous", "inliers", "residual_rms_us"])
+
+
+class RttCycles:
+    """Cycle-numbered RTT events as parallel arrays (cycle, firmware time in ms)"""
+
+    def __init__(self):
+        self.cycles = array("q")
+        self.times_ms = array("d")
+        self.out_of_order = 0
+
+    @classmethod
+    def from_lines(cls, lines):
+        """One event per cycle (first line that names it); a cycle going backwards (reset) is skipped"""
+        events = cls()
+        last = 0
+        for line in lines:
+            match = CYCLE_RE.search(line)
+            if not match:
+                continue
+            timestamp_ms, _ = parse_rtt_line(line)
+            if timestamp_ms is None:
+                continue
+            cycle = int(match.group(1) or match.group(2))
+            if cycle == last:
+                continue
+            if cycle < last:
+                events.out_of_order += 1
+                continue
+            events.cycles.append(cycle)
+            events.times_ms.append(timestamp_ms)
+            last = cycle
+        return events
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path, "r", encoding="utf-8", errors="ignore") as f:
+            return cls.from_lines(f)
+
+    def __len__(self):
+        return len(self.cycles)
+
+
+def iter_channel_edges(transitions, channel):
+    """Yield (sample_index, rising) for every change of one channel; the initial level is not an edge"""
+    bit = 1 << channel
+    last = None
+    for index, value in transitions:
+        level = bool(value & bit)
+        if last is not None and level != last:
+            yield index, level
+        last = level
+
+
+def _sampled(values, limit=ESTIMATE_SAMPLES):
+    step = max(1, len(values) // limit)
+    return values[::step]
+
+
+def _median(values):
+    return statistics.median(_sampled(values)) if len(values) else 0.0
+
+
+class EdgeTrain:
+    """
+    Pin edges as arrays (time in seconds, rising, gap-corrected index). Glitches
+    are removed and the index advances by round(interval / period), corrected to
+    the parity the edge polarity demands, so missing edges never shift cycles.
+    """
+
+    def __init__(self, samples, rising, samplerate, start_s=0.0, period_s=None):
+        self.samplerate = samplerate
+        self.start_s = start_s
+        self.times_s = array("d")
+        self.rising = array("b")
+        self.index = array("q")
+        self.glitches = 0
+        self.missing = 0
+
+        times = [s / samplerate for s in samples]
+        intervals = array("d", (b - a for a, b in zip(times, times[1:])))
+        self.period_s = period_s or _median(intervals)
+        min_pulse = self.period_s * GLITCH_FRACTION
+
+        # Glitch filter: a pulse shorter than min_pulse removes both of its edges
+        kept_t, kept_r = [], []
+        for t, r in zip(times, rising):
+            if kept_t and t - kept_t[-1] < min_pulse:
+                kept_t.pop()
+                kept_r.pop()
+                self.glitches += 1
+                continue
+            kept_t.append(t)
+            kept_r.append(r)
+
+        position = 0
+        for i, (t, r) in enumerate(zip(kept_t, kept_r)):
+            if i:
+                exact = (t - kept_t[i - 1]) / self.period_s if self.period_s else 1
+                steps = max(1, round(exact))
+                if (steps % 2 == 1) != (r != kept_r[i - 1]):
+                    steps = steps + 1 if exact > steps or steps == 1 else steps - 1
+                self.missing += steps - 1
+                position += steps
+            self.times_s.append(t)
+            self.rising.append(r)
+            self.index.append(position)
+
+    @classmethod
+    def from_capture(cls, capture_file, channel, period_s=None):
+        capture = open_capture(capture_file)
+        samples, rising = array("q"), array("b")
+        # Masked transitions: bus activity on other channels costs nothing. Each
+        # trigger window starts from its own level; the time between windows
+        # is handled like missing edges
+        for _, _, transitions in capture.iter_segments(1 << channel):
+            for index, level in iter_channel_edges(transitions, channel):
+                samples.append(index)
+                rising.append(level)
+        return cls(samples, rising, capture.samplerate, period_s=period_s)
+
+    def __len__(self):
+        return len(self.times_s)
+
+
+def iter_matches(rtt, edges, cycle_offset, stride=1):
+    """Yield (cycle, rtt_ms, edge_s) for RTT cycles whose edge (index = cycle - K) was captured; two-pointer merge"""
+    j = 0
+    n_edges = len(edges)
+    for i in range(0, len(rtt), stride):
+        target = rtt.cycles[i] - cycle_offset
+        if stride > 1:
+            # Sparse probes (offset search) jump instead of walking every edge
+            j = bisect_left(edges.index, target, j)
+        while j < n_edges and edges.index[j] < target:
+            j += 1
+        if j == n_edges:
+            return
+        if edges.index[j] == target:
+            yield rtt.cycles[i], rtt.times_ms[i], edges.times_s[j]
+
+
+def robust_fit(xs, ys, iterations=3):
+    """
+    Least-squares y = a*x + b with median-absolute-deviation outlier rejection.
+    Returns (a, b, inlier_count, rms_residual).
+    """
+    keep = list(range(len(xs)))
+    a, b = 1.0, 0.0
+    for _ in range(iterations + 1):
+        n = len(keep)
+        if n == 0:
+            return a, b, 0, float("nan")
+        mx = sum(xs[i] for i in keep) / n
+        my = sum(ys[i] for i in keep) / n
+        sxx = sum((xs[i] - mx) ** 2 for i in keep)
+        sxy = sum((xs[i] - mx) * (ys[i] - my) for i in keep)
+        a = sxy / sxx if sxx > 0 else 1.0
+        b = my - a * mx
+        residuals = [ys[i] - (a * xs[i] + b) for i in range(len(xs))]
+        mad = _median(array("d", (abs(residuals[i]) for i in keep)))
+        limit = max(OUTLIER_MADS * 1.4826 * mad, RTT_RESOLUTION_S)
+        new_keep = [i for i in range(len(xs)) if abs(residuals[i]) <= limit]
+        if new_keep == keep:
+            break
+        keep = new_keep
+    rms = (sum(residuals[i] ** 2 for i in keep) / len(keep)) ** 0.5 if keep else float("nan")
+    return a, b, len(keep), rms
+
+
+def _fit(rtt, edges, cycle_offset, stride=1):
+    matches = list(iter_matches(rtt, edges, cycle_offset, stride))
+    xs = [m[1] / 1000.0 for m in matches]
+    ys = [m[2] for m in matches]
+    if len(matches) < 2:
+        return None
+    return robust_fit(xs, ys)
+
+
+def _probe_score(rtt, edges, cycle_offset):
+    """
+    Fit quality of one candidate offset from a bounded number of probes inside
+    the overlap: inlier rms inflated by the rejected fraction, or None
+    """
+    lo = bisect_left(rtt.cycles, edges.index[0] + cycle_offset)
+    hi = bisect_left(rtt.cycles, edges.index[-1] + cycle_offset + 1)
+    if hi - lo < 3:
+        return None
+    stride = max(1, (hi - lo) // SEARCH_SAMPLES)
+    xs, ys = [], []
+    j = 0
+    for i in range(lo, hi, stride):
+        j = bisect_left(edges.index, rtt.cycles[i] - cycle_offset, j)
+        if j < len(edges) and edges.index[j] == rtt.cycles[i] - cycle_offset:
+            xs.append(rtt.times_ms[i] / 1000.0)
+            ys.append(edges.times_s[j])
+    if len(xs) < 3:
+        return None
+    _, _, inliers, rms = robust_fit(xs, ys)
+    probes = len(range(lo, hi, stride))
+    return rms * probes / inliers if inliers else None
+
+
+def _parity_offset(edges, odd_high):
+    """A cycle offset consistent with edge polarity: HIGH edges land on odd (or even) cycles"""
+    high_parity = 1 if odd_high else 0
+    first_high = edges.rising[0] == 1
+    cycle_parity = high_parity if first_high else 1 - high_parity
+    return (cycle_parity - edges.index[0]) % 2
+
+
+def align(rtt, edges, odd_high=True, first_cycle=None, offset_hint_s=None):
+    """
+    Fix the cycle offset K (cycle = edge index + K) and fit the clock model.
+    Anchors, strongest first: first_cycle, a boot visible in the capture,
+    offset_hint_s (logic_time - rtt_time, good to +/- one period), else the
+    offset whose residuals are smallest among the SEARCH_CANDIDATES nearest
+    full overlap - reported ambiguous when a strictly periodic signal leaves
+    several offsets equally good or the overlap allows more than were tried.
+    """
+    if len(rtt) < 2 or len(edges) < 2:
+        raise ValueError(f"Not enough events to align ({len(rtt)} RTT cycles, {len(edges)} edges)")
+    base = _parity_offset(edges, odd_high)
+    ambiguous = False
+    lead_in = edges.times_s[0] - edges.start_s
+
+    if first_cycle is not None:
+        cycle_offset, method = first_cycle - edges.index[0], "first_cycle"
+    elif lead_in >= BOOT_QUIET_PERIODS * edges.period_s and edges.rising[0]:
+        # Pins start LOW: the first rising edge after boot is cycle 1 (cycle 2 on the opposite-phase pin)
+        cycle_offset, method = (1 if odd_high else 2) - edges.index[0], "boot"
+    else:
+        # Candidate offsets keep the polarity parity and overlap at least half as
+        # much as the best-overlapping one; nearest the full overlap first
+        first, last = rtt.cycles[0], rtt.cycles[-1]
+        span = min(last - first, edges.index[-1] - edges.index[0])
+        low = first - edges.index[-1] + span // 2
+        high = last - edges.index[0] - span // 2
+        centre = (first + last - edges.index[0] - edges.index[-1]) // 2
+        centre += (base - centre) % 2
+        if offset_hint_s is not None:
+            # Each step of 2 in K moves the clock offset by two periods; the median
+            # period misses slow cycles, so re-measure at the new offset until it settles
+            cycle_offset, method = centre, "offset_hint"
+            for _ in range(4):
+                matches = iter_matches(rtt, edges, cycle_offset, max(1, len(rtt) // SEARCH_SAMPLES))
+                differences = array("d", (edge_s - rtt_ms / 1000.0 for _, rtt_ms, edge_s in matches))
+                if not differences:
+                    raise ValueError("RTT cycles and captured edges do not overlap")
+                shift = round((_median(differences) - offset_hint_s) / (2 * edges.period_s))
+                if not shift:
+                    break
+                cycle_offset += 2 * shift
+        else:
+            candidates = sorted(range(low + (base - low) % 2, high + 1, 2), key=lambda k: abs(k - centre))
+            scored = []
+            for candidate in candidates[:SEARCH_CANDIDATES]:
+                score = _probe_score(rtt, edges, candidate)
+                if score is not None:
+                    scored.append((score, candidate))
+            if not scored:
+                raise ValueError("RTT cycles and captured edges do not overlap")
+            scored.sort()
+            cycle_offset, method = scored[0][1], "residual_search"
+            # Also ambiguous when the overlap allows more offsets than were tried
+            ambiguous = ((len(scored) > 1 and scored[0][0] > 0.8 * scored[1][0])
+                         or len(candidates) > SEARCH_CANDIDATES)
+
+    fit = _fit(rtt, edges, cycle_offset)
+    if fit is None:
+        raise ValueError(f"No RTT cycle matches a captured edge with cycle offset {cycle_offset}")
+    drift, offset_s, inliers, rms = fit
+    return Alignment(cycle_offset, method, drift, offset_s, ambiguous, inliers, round(rms * 1e6, 1))
+
+
+def iter_timeline(rtt, edges, alignment, include_edges=True):
+    """
+    Merged events in logic-clock order. 'cycle' rows pair an RTT event with its
+    edge (lag_us = measured edge - firmware time mapped to the logic clock);
+    'rtt_only' and 'edge_only' rows are the unmatched events on either side.
+    """
+    drift, offset_s, k = alignment.drift, alignment.offset_s, alignment.cycle_offset
+
+    def rtt_rows():
+        previous = None
+        j, n_edges = 0, len(edges)
+        for cycle, rtt_ms in zip(rtt.cycles, rtt.times_ms):
+            mapped = drift * rtt_ms / 1000.0 + offset_s
+            while j < n_edges and edges.index[j] < cycle - k:
+                j += 1
+            edge_s = edges.times_s[j] if j < n_edges and edges.index[j] == cycle - k else None
+            if edge_s is None:
+                yield mapped, {"kind": "rtt_only", "cycle": cycle, "time_s": mapped, "rtt_ms": rtt_ms}
+                continue
+            row = {"kind": "cycle", "cycle": cycle, "time_s": edge_s, "rtt_ms": rtt_ms,
+                   "rtt_mapped_s": mapped, "lag_us": (edge_s - mapped) * 1e6}
+            if previous:
+                cycles = cycle - previous[0]
+                row["fw_period_ms"] = (rtt_ms - previous[1]) / cycles
+                row["hw_period_ms"] = (edge_s - previous[2]) * 1000.0 / cycles
+            previous = (cycle, rtt_ms, edge_s)
+            yield edge_s, row
+
+    def edge_rows():
+        i, n_rtt = 0, len(rtt)
+        for index, time_s, rising in zip(edges.index, edges.times_s, edges.rising):
+            while i < n_rtt and rtt.cycles[i] < index + k:
+                i += 1
+            if i < n_rtt and rtt.cycles[i] == index + k:
+                continue
+            yield time_s, {"kind": "edge_only", "cycle": index + k, "time_s": time_s, "rising": bool(rising)}
+
+    streams = [rtt_rows()]
+    if include_edges:
+        streams.append(edge_rows())
+    for _, row in heapq.merge(*streams, key=lambda item: item[0]):
+        yield row
+
+
+class _Stats:
+    """Streaming count/mean/rms/min/max"""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.squares = 0.0
+        self.low = float("inf")
+        self.high = float("-inf")
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        self.squares += value * value
+        if value < self.low:
+            self.low = value
+        if value > self.high:
+            self.high = value
+
+    def result(self, digits=3):
+        if not self.count:
+            return None
+        mean = self.total / self.count
+        return {"mean": round(mean, digits), "rms": round((self.squares / self.count) ** 0.5, digits),
+                "min": round(self.low, digits), "max": round(self.high, digits)}
+
+
+def correlate(rtt, edges, odd_high=True, first_cycle=None, offset_hint_s=None,
+              timeline_path=None, include_edges=False):
+    """Align, stream the merged timeline to CSV (optional) and return the summary"""
+    with tracer.span("timeline_correlate", rtt_cycles=len(rtt), edges=len(edges)) as span:
+        alignment = align(rtt, edges, odd_high, first_cycle, offset_hint_s)
+        lag, fw_period, hw_period, period_error = _Stats(), _Stats(), _Stats(), _Stats()
+        counts = {"cycle": 0, "rtt_only": 0, "edge_only": 0}
+
+        writer = handle = None
+        if timeline_path:
+            handle = open(timeline_path, "w", newline="", encoding="utf-8")
+            writer = csv.writer(handle)
+            writer.writerow(TIMELINE_FIELDS)
+        try:
+            for row in iter_timeline(rtt, edges, alignment, include_edges or writer is not None):
+                counts[row["kind"]] += 1
+                if row["kind"] == "cycle":
+                    lag.add(row["lag_us"])
+                    if "hw_period_ms" in row:
+                        fw_period.add(row["fw_period_ms"])
+                        hw_period.add(row["hw_period_ms"])
+                        period_error.add(row["hw_period_ms"] - row["fw_period_ms"])
+                if writer:
+                    writer.writerow([row.get(field, "") for field in TIMELINE_FIELDS])
+        finally:
+            if handle:
+                handle.close()
+
+        summary = {
+            "alignment": alignment._asdict(),
+            "drift_ppm": round((alignment.drift - 1.0) * 1e6, 1),
+            "rtt_cycles": len(rtt),
+            "rtt_out_of_order": rtt.out_of_order,
+            "edges": len(edges),
+            "edge_glitches": edges.glitches,
+            "edges_missing": edges.missing,
+            "matched_cycles": counts["cycle"],
+            "rtt_without_edge": counts["rtt_only"],
+            "edges_without_rtt": len(edges) - counts["cycle"],
+            "edge_period_ms": round(edges.period_s * 1000.0, 4),
+            "expected_period_ms": EXPECTED_PERIOD_MS,
+            "lag_us": lag.result(1),
+            "fw_period_ms": fw_period.result(),
+            "hw_period_ms": hw_period.result(),
+            "hw_minus_fw_period_ms": period_error.result(),
+            "timeline": str(timeline_path) if timeline_path else None,
+        }
+        span.set(method=alignment.method, matched=counts["cycle"], drift_ppm=summary["drift_ppm"])
+        return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Correlate RTT cycle events with logic analyzer edges")
+    parser.add_argument("--rtt", required=True, help="RTT log (rtt_capture_*.txt)")
+    parser.add_argument("--capture", required=True, help="Logic capture (.sr or .vcd)")
+    parser.add_argument("--pin", default=DEFAULT_PIN, choices=sorted(TEST_PINS))
+    parser.add_argument("--channel", type=int, help="Logic channel of the pin (default from --pin)")
+    parser.add_argument("--first-cycle", type=int, help="Firmware cycle of the first captured edge")
+    parser.add_argument("--offset-hint", type=float, help="Approx. logic time minus RTT time, seconds")
+    parser.add_argument("--timeline", help="Write the merged timeline as CSV")
+    parser.add_argument("--json", help="Write the summary as JSON")
+    args = parser.parse_args()
+
+    channel, odd_high = TEST_PINS[args.pin]
+    if args.channel is not None:
+        channel = args.channel
+    rtt = RttCycles.from_file(args.rtt)
+    edges = EdgeTrain.from_capture(args.capture, channel)
+    print(f"📥 {len(rtt)} RTT cycles, {len(edges)} edges on D{channel} "
+          f"({edges.missing} missing, {edges.glitches} glitches)")
+    try:
+        summary = correlate(rtt, edges, odd_high, args.first_cycle, args.offset_hint, args.timeline)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+
+    alignment = summary["alignment"]
+    print(f"🔗 cycle = edge + {alignment['cycle_offset']} ({alignment['method']}"
+          f"{', ambiguous' if alignment['ambiguous'] else ''})")
+    print(f"⏱️  drift {summary['drift_ppm']:+.1f} ppm, offset {alignment['offset_s']:.6f}s, "
+          f"fit rms {alignment['residual_rms_us']}us over {alignment['inliers']} cycles")
+    print(f"📊 {summary['matched_cycles']} matched, {summary['rtt_without_edge']} RTT cycles without an edge")
+    if summary["hw_period_ms"]:
+        hw, fw = summary["hw_period_ms"], summary["fw_period_ms"]
+        print(f"   pin period {hw['mean']:.3f}ms ({hw['min']:.3f}-{hw['max']:.3f}), "
+              f"firmware-reported {fw['mean']:.3f}ms, expected {EXPECTED_PERIOD_MS}ms")
+    if args.json:
+        Path(args.json).write_text(json.dumps(summary, indent=2), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
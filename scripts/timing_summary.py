@@ -4,6 +4,30 @@
 All logging and tests optimized for lightning-fast GitHub Actions
 """
 
+import json
+from pathlib import Path
+
+RESULTS_DIR = Path(__file__).resolve().parent.parent / "benchmark_results"
+
+def show_measured_results():
+    """Display the latest measured numbers from benchmark_suite.py"""
+    result_files = sorted(RESULTS_DIR.glob("results_*.json"), key=lambda f: f.stat().st_mtime)
+    if not result_files:
+        print("\nNo measured results yet - run: python benchmark_suite.py")
+        return
+    
+    latest = result_files[-1]
+    with open(latest) as f:
+        report = json.load(f)
+    
+    print(f"\nMEASURED HOT PATHS ({latest.name}):")
+    print(f"{'Case':<16} {'Size':>14} {'Time':>10} {'Throughput':>22} {'Peak RSS':>10}")
+    print("-" * 76)
+    for result in report["results"]:
+        print(f"{result['case']:<16} {result['size']:>14,} {result['seconds']:>9.3f}s "
+              f"{result['throughput']:>12,.0f} {result['unit']:<9} "
+              f"{result['peak_rss_bytes'] / 1e6:>8.1f}MB")
+
 def show_timing_summary():
     """Display the timing optimization summary"""
     
@@ -41,4 +65,5 @@ def show_timing_summary():
     print("🎯 5 seconds = light years in embedded timing!")
 
 if __name__ == "__main__":
-    show_timing_summary()
\ No newline at end of file
+    show_timing_summary()
+    show_measured_results()
\ No newline at end of file
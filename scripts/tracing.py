@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+MIPE_EV1 Iteration Tracing
+Lightweight nested timing spans for the build-flash-capture-analyze loop,
+exported as Chrome trace / Perfetto JSON and as a per-stage summary
+"""
+
+import json
+import os
+import subprocess
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Windows: child CPU time is not available
+    resource = None
+
+
+def _children_cpu():
+    """(user, system) CPU seconds consumed by reaped child processes"""
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime, usage.ru_stime
+
+
+class Span:
+    """One timed region; start/end are nanoseconds relative to the tracer epoch"""
+
+    def __init__(self, name, category, attrs, parent, thread_id):
+        self.name = name
+        self.category = category
+        self.attrs = attrs
+        self.parent = parent
+        self.thread_id = thread_id
+        self.children = []
+        self.start = 0
+        self.end = None
+
+    @property
+    def duration_ms(self):
+        end = self.end if self.end is not None else self.start
+        return (end - self.start) / 1e6
+
+    def set(self, **attrs):
+        """Attach attributes after the span has started (results, counts, ...)"""
+        self.attrs.update(attrs)
+
+
+class Tracer:
+    """Collects spans for one process; nesting is tracked per thread"""
+
+    def __init__(self):
+        self.epoch = time.perf_counter_ns()
+        self.spans = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _stack(self):
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    @contextmanager
+    def span(self, name, category="stage", **attrs):
+        """Time a block: `with tracer.span("build", board=...) as s:`"""
+        stack = self._stack()
+        parent = stack[-1] if stack else None
+        span = Span(name, category, dict(attrs), parent, threading.get_ident())
+        if parent is not None:
+            parent.children.append(span)
+        with self._lock:
+            self.spans.append(span)
+
+        stack.append(span)
+        span.start = time.perf_counter_ns() - self.epoch
+        try:
+            yield span
+        except BaseException as e:
+            span.attrs["error"] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span.end = time.perf_counter_ns() - self.epoch
+            stack.pop()
+
+    def run(self, cmd, name=None, **kwargs):
+        """subprocess.run() inside a span, recording return code and child CPU time"""
+        name = name or Path(str(cmd[0])).stem
+        with self.span(name, category="subprocess", cmd=" ".join(str(c) for c in cmd)) as span:
+            before = _children_cpu()
+            try:
+                result = subprocess.run(cmd, **kwargs)
+                span.set(returncode=result.returncode)
+                return result
+            except subprocess.CalledProcessError as e:
+                span.set(returncode=e.returncode)
+                raise
+            finally:
+                after = _children_cpu()
+                if before and after:
+                    span.set(child_user_s=round(after[0] - before[0], 6),
+                             child_sys_s=round(after[1] - before[1], 6))
+
+    def reset(self):
+        with self._lock:
+            self.spans = []
+        self.epoch = time.perf_counter_ns()
+
+    def chrome_trace(self):
+        """Spans as Chrome trace 'complete' events (loadable in Perfetto / chrome://tracing)"""
+        pid = os.getpid()
+        events = [{"name": "process_name", "ph": "M", "pid": pid, "tid": 0,
+                   "args": {"name": "MIPE_EV1 AI loop"}}]
+        for span in self.spans:
+            if span.end is None:
+                continue
+            events.append({
+                "name": span.name,
+                "cat": span.category,
+                "ph": "X",
+                "ts": span.start / 1000,
+                "dur": (span.end - span.start) / 1000,
+                "pid": pid,
+                "tid": span.thread_id,
+                "args": {k: v if isinstance(v, (int, float, bool, str)) or v is None else str(v)
+                         for k, v in span.attrs.items()},
+            })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def export_chrome_trace(self, path):
+        path = Path(path)
+        with open(path, "w") as f:
+            json.dump(self.chrome_trace(), f)
+        return path
+
+    def summary(self):
+        """
+        Aggregate finished spans by name: count, total/mean/max duration,
+        self time (excluding child spans) and share of top-level wall time
+        """
+        finished = [s for s in self.spans if s.end is not None]
+        wall_ms = sum(s.duration_ms for s in finished if s.parent is None) or 1.0
+        stages = {}
+        for span in finished:
+            stage = stages.setdefault(span.name, {
+                "stage": span.name, "category": span.category,
+                "count": 0, "total_ms": 0.0, "max_ms": 0.0, "self_ms": 0.0,
+            })
+            duration = span.duration_ms
+            stage["count"] += 1
+            stage["total_ms"] += duration
+            stage["max_ms"] = max(stage["max_ms"], duration)
+            stage["self_ms"] += duration - sum(c.duration_ms for c in span.children if c.end is not None)
+
+        rows = sorted(stages.values(), key=lambda s: s["self_ms"], reverse=True)
+        for stage in rows:
+            stage["mean_ms"] = stage["total_ms"] / stage["count"]
+            stage["share"] = stage["self_ms"] / wall_ms
+        return rows
+
+    def export_summary(self, path):
+        path = Path(path)
+        with open(path, "w") as f:
+            json.dump(self.summary(), f, indent=2)
+        return path
+
+    def print_summary(self):
+        print("\n⏱️  ITERATION TIME BREAKDOWN (by self time)")
+        print(f"{'Stage':<24} {'Count':>6} {'Total ms':>11} {'Self ms':>11} {'Max ms':>10} {'Share':>7}")
+        print("-" * 74)
+        for stage in self.summary():
+            print(f"{stage['stage']:<24} {stage['count']:>6} {stage['total_ms']:>11.1f} "
+                  f"{stage['self_ms']:>11.1f} {stage['max_ms']:>10.1f} {stage['share']:>6.1%}")
+
+    def export(self, directory, prefix="trace"):
+        """Write <prefix>_<timestamp>.json (Chrome trace) and matching _summary.json"""
+        from datetime import datetime
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        trace_file = self.export_chrome_trace(directory / f"{prefix}_{stamp}.json")
+        summary_file = self.export_summary(directory / f"{prefix}_{stamp}_summary.json")
+        return trace_file, summary_file
+
+
+# Process-wide tracer shared by the automation scripts
+tracer = Tracer()
+span = tracer.span
+run = tracer.run
@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+MIPE_EV1 VCD Capture Import/Export
+Streaming Value Change Dump writer (from sample chunks or transitions) and
+reader that presents a .vcd like an .sr capture - samplerate, channels,
+transitions and sample chunks - so the decode and timing engines read either
+format. Both directions hold one timestamp of state, never the capture.
+"""
+
+import argparse
+import os
+import re
+import sys
+from pathlib import Path
+
+from logic_capture import format_samplerate, iter_transitions, open_sr, parse_samplerate, write_sr
+
+# VCD allows only 1, 10 or 100 of these units
+_UNITS = (("s", 10 ** 15), ("ms", 10 ** 12), ("us", 10 ** 9), ("ns", 10 ** 6), ("ps", 10 ** 3), ("fs", 1))
+_TIMESCALE_RE = re.compile(r"(1|10|100)\s*(s|ms|us|ns|ps|fs)")
+_SAMPLERATE_RE = re.compile(r"samplerate\s*=?\s*([\d.]+\s*[kKmMgG]?(?:[hH][zZ])?)")
+_CHANNEL_NAME_RE = re.compile(r"^D(\d+)$")
+EXPAND_CHUNK = 4 * 1024 * 1024
+TAIL_BYTES = 64 * 1024
+CHANGE_CACHE = 65536
+
+
+def _identifier(index):
+    """Short printable VCD identifier for a variable: !, ", #, ... then two characters"""
+    chars = []
+    index += 1
+    while index:
+        index, digit = divmod(index - 1, 94)
+        chars.append(chr(33 + digit))
+    return "".join(reversed(chars))
+
+
+def choose_timescale(samplerate):
+    """(timescale text, time units per sample) - exact when the sample period allows it"""
+    period_fs = 10 ** 15 / samplerate
+    for unit, unit_fs in _UNITS:
+        for multiple in (100, 10, 1):
+            step = period_fs / (unit_fs * multiple)
+            if step >= 1 and step == int(step):
+                return f"{multiple} {unit}", int(step)
+    return "1 fs", period_fs
+
+
+class VcdWriter:
+    """Write one scalar wire per channel; transitions are streamed straight to the file"""
+
+    def __init__(self, path, samplerate, channels=8, names=None, module="mipe_ev1"):
+        self.path = Path(path)
+        self.samplerate = parse_samplerate(samplerate)
+        self.channels = channels
+        self.names = list(names) if names else [f"D{i}" for i in range(channels)]
+        self.timescale, self.step = choose_timescale(self.samplerate)
+        self._ids = [_identifier(i) for i in range(channels)]
+        self._value = None
+        self._last_index = None
+        self._changes = {}
+        self._file = open(self.path, "w", encoding="ascii", newline="\n")
+        self._file.write(
+            f"$comment samplerate={format_samplerate(self.samplerate).replace(' ', '')} $end\n"
+            f"$timescale {self.timescale} $end\n"
+            f"$scope module {module} $end\n"
+            + "".join(f"$var wire 1 {ident} {name} $end\n" for ident, name in zip(self._ids, self.names))
+            + "$upscope $end\n$enddefinitions $end\n"
+        )
+
+    def _time(self, index):
+        return int(round(index * self.step))
+
+    def write_transition(self, index, value):
+        """Record the channel levels from sample `index` on; indices must not decrease"""
+        if self._value is None:
+            bits = "".join(f"{value >> ch & 1}{ident}\n" for ch, ident in enumerate(self._ids))
+            self._file.write(f"#{self._time(index)}\n$dumpvars\n{bits}$end\n")
+        else:
+            if value == self._value:
+                return
+            # A bus repeats the same few level changes, so their text is built once
+            key = (self._value, value)
+            text = self._changes.get(key)
+            if text is None:
+                changed = self._value ^ value
+                text = "".join(f"{value >> ch & 1}{ident}\n" for ch, ident in enumerate(self._ids)
+                               if changed >> ch & 1)
+                if len(self._changes) < CHANGE_CACHE:
+                    self._changes[key] = text
+            self._file.write(f"#{self._time(index)}\n{text}")
+        self._value = value
+        self._last_index = index
+
+    def write_transitions(self, transitions):
+        for index, value in transitions:
+            self.write_transition(index, value)
+
+    def close(self, end_sample=None):
+        """Finish with a timestamp marking the capture end (total samples)"""
+        if end_sample is not None and (self._last_index is None or end_sample > self._last_index):
+            self._file.write(f"#{self._time(end_sample)}\n")
+        self._file.close()
+
+
+def write_vcd(path, chunks, samplerate, channels=8, unitsize=1, names=None):
+    """Convert raw sample chunks to VCD, one chunk at a time; returns the sample count"""
+    writer = VcdWriter(path, samplerate, channels, names)
+    total = 0
+
+    def counted():
+        nonlocal total
+        for chunk in chunks:
+            total += len(chunk) // unitsize
+            yield chunk
+
+    try:
+        writer.write_transitions(iter_transitions(counted(), unitsize))
+    finally:
+        writer.close(total)
+    return total
+
+
+def write_vcd_transitions(path, transitions, samplerate, end_sample=None, channels=8, names=None):
+    """VCD from an edge list / transition stream of (sample_index, value)"""
+    writer = VcdWriter(path, samplerate, channels, names)
+    try:
+        writer.write_transitions(transitions)
+    finally:
+        writer.close(end_sample)
+
+
+class VcdCapture:
+    """
+    Read-only view of a VCD file with the SrCapture interface. Variables named
+    D<n> map to channel n, others to the next free channels in declaration
+    order (vectors take one channel per bit, LSB first); x/z read as 0. Times
+    become sample indices at the file's samplerate comment, or at `samplerate`
+    (resampling), or one sample per timescale unit.
+    """
+
+    def __init__(self, path, samplerate=None):
+        self.path = Path(path)
+        self.timescale_fs = 1
+        self.windows = None       # a VCD timeline is always continuous
+        self.vars = {}            # identifier -> (first channel, width)
+        names = {}
+        declared = None
+        pending = []
+        with open(self.path, "rb") as f:
+            for tokens in self._header_commands(f):
+                keyword = tokens[0]
+                if keyword == "$timescale":
+                    match = _TIMESCALE_RE.search(" ".join(tokens[1:]))
+                    if match:
+                        self.timescale_fs = int(match.group(1)) * dict(_UNITS)[match.group(2)]
+                elif keyword == "$comment":
+                    match = _SAMPLERATE_RE.search(" ".join(tokens[1:]))
+                    if match and declared is None:
+                        declared = parse_samplerate(match.group(1))
+                elif keyword == "$var" and len(tokens) >= 5:
+                    width, ident, name = int(tokens[2]), tokens[3], tokens[4]
+                    if ident not in self.vars:
+                        self.vars[ident] = None
+                        pending.append((ident, width, name))
+                elif keyword == "$enddefinitions":
+                    self.body_offset = f.tell()
+                    break
+            else:
+                raise ValueError(f"{self.path}: no $enddefinitions")
+
+        used = set()
+        for ident, width, name in pending:
+            match = _CHANNEL_NAME_RE.match(name)
+            if width == 1 and match and int(match.group(1)) not in used and self.vars[ident] is None:
+                self.vars[ident] = (int(match.group(1)), 1)
+                used.add(int(match.group(1)))
+                names[int(match.group(1))] = name
+        next_free = 0
+        for ident, width, name in pending:
+            if self.vars[ident] is not None:
+                continue
+            while any(ch in used for ch in range(next_free, next_free + width)):
+                next_free += 1
+            self.vars[ident] = (next_free, width)
+            for bit in range(width):
+                used.add(next_free + bit)
+                names[next_free + bit] = name if width == 1 else f"{name}[{bit}]"
+            next_free += width
+        total = max(used) + 1 if used else 0
+        self.channels = [names.get(i, f"D{i}") for i in range(total)]
+        self.unitsize = 1 if total <= 8 else 2 if total <= 16 else 4
+
+        self.samplerate = parse_samplerate(samplerate) if samplerate else declared or (10 ** 15 // self.timescale_fs)
+        # Sample index = time * timescale / sample period
+        self._scale = self.timescale_fs * self.samplerate / 10 ** 15
+
+    @staticmethod
+    def _header_commands(f):
+        """Yield each header '$keyword ... $end' as a token list (commands may span lines)"""
+        tokens = []
+        for line in iter(f.readline, b""):
+            for token in line.decode("ascii", "replace").split():
+                if token == "$end":
+                    if tokens:
+                        yield tokens
+                    tokens = []
+                else:
+                    tokens.append(token)
+
+    def _index(self, time):
+        return int(round(time * self._scale))
+
+    def iter_transitions(self, mask=None):
+        """
+        Yield (sample_index, value) like logic_capture.iter_transitions: the
+        first sample always, then every change (of the masked channels)
+        """
+        mask = -1 if mask is None else mask
+        value = 0
+        emitted = None
+        time = None
+        ident_map = self.vars
+        in_comment = False
+        with open(self.path, "rb") as f:
+            f.seek(self.body_offset)
+            expect_ident = None
+            for line in f:
+                for token in line.decode("ascii", "replace").split():
+                    if in_comment:
+                        in_comment = token != "$end"
+                        continue
+                    if expect_ident is not None:
+                        target = ident_map.get(token)
+                        if target and expect_ident is not False:
+                            value = self._set_vector(value, target, expect_ident)
+                        expect_ident = None
+                        continue
+                    first = token[0]
+                    if first == "#":
+                        new_time = int(token[1:])
+                        if time is not None and new_time != time and (emitted is None or
+                                                                      (value ^ emitted) & mask):
+                            yield self._index(time), value & mask
+                            emitted = value
+                        time = new_time
+                    elif first in "01xXzZ":
+                        target = ident_map.get(token[1:])
+                        if target:
+                            channel = target[0]
+                            if first == "1":
+                                value |= 1 << channel
+                            else:
+                                value &= ~(1 << channel)
+                    elif first in "bB":
+                        expect_ident = token[1:]
+                    elif first in "rR":
+                        expect_ident = False
+                    elif token == "$comment":
+                        in_comment = True
+                    # $dumpvars/$dumpoff/$end carry no values of their own
+        if time is not None and (emitted is None or (value ^ emitted) & mask):
+            yield self._index(time), value & mask
+
+    def iter_segments(self, mask=None):
+        """One segment covering the whole file (SrCapture.iter_segments interface)"""
+        yield 0, self.total_samples, self.iter_transitions(mask)
+
+    @staticmethod
+    def _set_vector(value, target, bits):
+        channel, width = target
+        bits = "".join("1" if b == "1" else "0" for b in bits)
+        number = int(bits, 2) if bits else 0
+        field = ((1 << width) - 1) << channel
+        return (value & ~field) | ((number << channel) & field)
+
+    @property
+    def total_samples(self):
+        """Capture length: the last timestamp (read from the file tail, not a full scan)"""
+        size = self.path.stat().st_size
+        with open(self.path, "rb") as f:
+            f.seek(max(self.body_offset, size - TAIL_BYTES))
+            tail = f.read().split()
+        for token in reversed(tail):
+            if token.startswith(b"#") and token[1:].isdigit():
+                return self._index(int(token[1:]))
+        return 0
+
+    def iter_chunks(self, chunk_size=EXPAND_CHUNK):
+        """Expand transitions into raw samples (unitsize bytes each), chunk_size samples at a time"""
+        width = self.unitsize
+        chunk = bytearray()
+        position = 0
+        current = None
+
+        def fill(count, level):
+            nonlocal chunk
+            pattern = level.to_bytes(width, "little")
+            while count:
+                take = min(count, chunk_size - len(chunk) // width)
+                chunk += pattern * take
+                count -= take
+                if len(chunk) // width >= chunk_size:
+                    yield bytes(chunk)
+                    chunk = bytearray()
+
+        for index, value in self.iter_transitions():
+            if current is not None and index > position:
+                yield from fill(index - position, current)
+                position = index
+            current = value
+        if current is not None:
+            yield from fill(max(0, self.total_samples - position), current)
+        if chunk:
+            yield bytes(chunk)
+
+
+def open_vcd(path, samplerate=None):
+    return VcdCapture(path, samplerate)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert logic captures between .sr and .vcd")
+    parser.add_argument("input", help="Capture to convert (.sr or .vcd)")
+    parser.add_argument("output", help="Output file (.vcd or .sr)")
+    parser.add_argument("--samplerate", help="Sample rate for VCD input (default: from the file)")
+    args = parser.parse_args()
+
+    source, target = Path(args.input), Path(args.output)
+    if source.suffix == ".sr" and target.suffix == ".vcd":
+        capture = open_sr(source)
+        total = write_vcd(target, capture.iter_chunks(), capture.samplerate, len(capture.channels),
+                          capture.unitsize, capture.channels)
+    elif source.suffix == ".vcd" and target.suffix == ".sr":
+        capture = open_vcd(source, args.samplerate)
+        total = write_sr(target, capture.iter_chunks(), capture.samplerate,
+                         len(capture.channels), capture.unitsize)
+    else:
+        print("❌ Convert .sr -> .vcd or .vcd -> .sr")
+        return 1
+    print(f"✅ {source.name} -> {target.name}: {total:,} samples at {format_samplerate(capture.samplerate)}, "
+          f"{os.path.getsize(target):,} bytes")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())